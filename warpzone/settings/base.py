@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
 
     'django_json_widget',
     'huey.contrib.djhuey',
@@ -163,6 +165,24 @@ HUEY = {
     },
 }
 
+KUBE_CLIENT_CACHE_SIZE = int(os.environ.get('KUBE_CLIENT_CACHE_SIZE', '16'))
+KUBE_CLIENT_POOL_SIZE = int(os.environ.get('KUBE_CLIENT_POOL_SIZE', '24'))
+# EKS tokens last 15 minutes, clients are rebuilt well before that
+KUBE_CLIENT_MAX_AGE = int(os.environ.get('KUBE_CLIENT_MAX_AGE', '600'))
+
+# parsed pipeline envs kept per process, keyed by a hash of the stored ciphertext
+ENV_CACHE_SIZE = int(os.environ.get('ENV_CACHE_SIZE', '256'))
+
+JOB_WATCHER_ENABLED = os.environ.get('JOB_WATCHER_ENABLED', '') == '1'
+JOB_RESYNC_MINUTES = int(os.environ.get('JOB_RESYNC_MINUTES', '5'))
+JOB_RECONCILE_MODE = os.environ.get('JOB_RECONCILE_MODE', 'job')
+LOG_COLLECTOR_ENABLED = os.environ.get('LOG_COLLECTOR_ENABLED', '') == '1'
+LOG_COLLECTOR_CONCURRENCY = int(os.environ.get('LOG_COLLECTOR_CONCURRENCY', '200'))
+# pod informers run in watch_jobs and publish their index to redis, other processes read it
+# and only list pods from the API when the index is older than POD_INDEX_STALE_SECONDS
+POD_INFORMER_ENABLED = os.environ.get('POD_INFORMER_ENABLED', '1') == '1'
+POD_INDEX_STALE_SECONDS = int(os.environ.get('POD_INDEX_STALE_SECONDS', '30'))
+
 CONTAINER_REPO = os.environ.get('CONTAINER_REPO', None)
 
 SESSION_COOKIE_SAMESITE = 'Strict'
@@ -177,8 +197,66 @@ CACHES = {
     }
 }
 
+# live pod logs are kept in one redis stream per pod, each entry is a batch of lines
+LOG_STREAM_MAXLEN = int(os.environ.get('LOG_STREAM_MAXLEN', '20000'))
+LOG_STREAM_TTL = int(os.environ.get('LOG_STREAM_TTL', str(60 * 60 * 24)))
+
+# live pod logs are persisted as rolling segments of at most this size or age
+STREAM_LOG_SEGMENT_BYTES = int(os.environ.get('STREAM_LOG_SEGMENT_BYTES', str(1024 * 1024)))
+STREAM_LOG_SEGMENT_SECONDS = int(os.environ.get('STREAM_LOG_SEGMENT_SECONDS', '30'))
+
+# completed logs are stored gzip compressed, set to an empty string to store plain text
+COMPLETED_LOG_COMPRESSION = os.environ.get('COMPLETED_LOG_COMPRESSION', 'gzip')
+LOG_SPOOL_MAX_MEMORY = int(os.environ.get('LOG_SPOOL_MAX_MEMORY', str(8 * 1024 * 1024)))
+# lines between entries in the completed log offset index
+LOG_INDEX_EVERY = int(os.environ.get('LOG_INDEX_EVERY', '1000'))
+
+# full text search index over log lines, pruned by the cleanup task
+LOG_SEARCH_ENABLED = os.environ.get('LOG_SEARCH_ENABLED', '1') == '1'
+LOG_SEARCH_CHUNK_LINES = int(os.environ.get('LOG_SEARCH_CHUNK_LINES', '500'))
+LOG_SEARCH_RETENTION_DAYS = int(os.environ.get('LOG_SEARCH_RETENTION_DAYS', '7'))
+
+# cleanup deletes in short batched transactions and stops after RETENTION_MAX_SECONDS, the next run continues
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '7'))
+STREAM_LOG_RETENTION_HOURS = int(os.environ.get('STREAM_LOG_RETENTION_HOURS', '24'))
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '500'))
+RETENTION_MAX_SECONDS = int(os.environ.get('RETENTION_MAX_SECONDS', '1800'))
+RETENTION_MAX_ATTEMPTS = int(os.environ.get('RETENTION_MAX_ATTEMPTS', '10'))
+
+# expired jobs are exported to parquet in the default storage before they are deleted
+JOB_ARCHIVE_ENABLED = os.environ.get('JOB_ARCHIVE_ENABLED', '1') == '1'
+JOB_ARCHIVE_PREFIX = os.environ.get('JOB_ARCHIVE_PREFIX', 'archive/jobs')
+
+# pipeline analytics are aggregated in the database and cached for this long
+ANALYTICS_CACHE_SECONDS = int(os.environ.get('ANALYTICS_CACHE_SECONDS', '60'))
+
+ARTIFACT_FETCH_WORKERS = int(os.environ.get('ARTIFACT_FETCH_WORKERS', '8'))
+ARTIFACT_PREFETCH_MAX_SIZE = int(os.environ.get('ARTIFACT_PREFETCH_MAX_SIZE', str(4 * 1024 * 1024)))
+
+# websockets wait on redis pub/sub notifications and only re-check on their own after this long
+NOTIFY_RESYNC_SECONDS = int(os.environ.get('NOTIFY_RESYNC_SECONDS', '30'))
+
+# messages buffered per websocket client before it is dropped back to reading the stream itself
+HUB_QUEUE_SIZE = int(os.environ.get('HUB_QUEUE_SIZE', '256'))
+
+# serialized jobs cached for websockets and log polling, dropped on every save, log urls are signed per read
+JOB_SNAPSHOT_TTL = int(os.environ.get('JOB_SNAPSHOT_TTL', '3600'))
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 SHELIX_URL = os.environ.get('SHELIX_URL', None)
 SHELIX_TOKEN = os.environ.get('SHELIX_TOKEN', None)
 SHELIX_ENABLED = bool(SHELIX_URL and SHELIX_TOKEN)
+SHELIX_TIMEOUT = float(os.environ.get('SHELIX_TIMEOUT', '15'))
+SHELIX_CONNECT_TIMEOUT = float(os.environ.get('SHELIX_CONNECT_TIMEOUT', '5'))
+SHELIX_MAX_CONNECTIONS = int(os.environ.get('SHELIX_MAX_CONNECTIONS', '20'))
+# retries connection failures only, requests are not replayed once sent
+SHELIX_RETRIES = int(os.environ.get('SHELIX_RETRIES', '3'))
+# job_shelix_log chunk cache, chunks of ended logs never change
+SHELIX_CHUNK_TTL = int(os.environ.get('SHELIX_CHUNK_TTL', '2'))
+SHELIX_CHUNK_ENDED_TTL = int(os.environ.get('SHELIX_CHUNK_ENDED_TTL', '3600'))
+# Job.log messages are posted in batches from a background thread
+SHELIX_LOG_BATCH_SIZE = int(os.environ.get('SHELIX_LOG_BATCH_SIZE', '50'))
+SHELIX_LOG_FLUSH_SECONDS = float(os.environ.get('SHELIX_LOG_FLUSH_SECONDS', '1'))
+SHELIX_LOG_MAX_QUEUE = int(os.environ.get('SHELIX_LOG_MAX_QUEUE', '10000'))
+SHELIX_LOG_SPOOL_DIR = os.environ.get('SHELIX_LOG_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'warpzone-shelix-spool'))
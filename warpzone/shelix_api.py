@@ -1,10 +1,49 @@
+import asyncio
+import os
+import queue
+import threading
+import weakref
+
 from django.conf import settings
 
 import httpx
 
+
+class LogNotEnded(Exception):
+    pass
+
+
+def client_options():
+    return {
+        'base_url': settings.SHELIX_URL,
+        'timeout': httpx.Timeout(settings.SHELIX_TIMEOUT, connect=settings.SHELIX_CONNECT_TIMEOUT),
+        'limits': httpx.Limits(
+            max_connections=settings.SHELIX_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SHELIX_MAX_CONNECTIONS,
+        ),
+    }
+
+
 class StarHelixApi:
+    # one pooled client per process, rebuilt after a fork
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+
     def __init__(self):
-        self.client = httpx.Client(base_url=settings.SHELIX_URL)
+        self.client = self.shared_client()
+
+    @classmethod
+    def shared_client(cls):
+        with cls._lock:
+            if cls._client is None or cls._client_pid != os.getpid():
+                cls._client = httpx.Client(
+                    transport=httpx.HTTPTransport(retries=settings.SHELIX_RETRIES),
+                    **client_options(),
+                )
+                cls._client_pid = os.getpid()
+
+            return cls._client
 
     @classmethod
     def start_log(cls, app):
@@ -30,9 +69,117 @@ class StarHelixApi:
         resp = self.post('/stash/v1/read-log/', log_id=log_id, after=after)
         return resp.text, resp.headers['Lastchunk'], resp.headers['Endlog']
 
+    @classmethod
+    def iter_log(cls, log_id, prefetch=4):
+        # the next chunk is fetched while the caller handles the current one
+        chunks = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=1)
+                    return True
+
+                except queue.Full:
+                    pass
+
+            return False
+
+        def reader():
+            after = None
+            try:
+                while 1:
+                    text, lastchunk, endlog = cls.read_log(log_id, after)
+                    if not endlog:
+                        put(LogNotEnded(log_id))
+                        return
+
+                    if not text:
+                        break
+
+                    if not put(text):
+                        return
+
+                    if lastchunk:
+                        after = lastchunk
+
+                put(None)
+
+            except Exception as exc:
+                put(exc)
+
+        threading.Thread(target=reader, name=f'shelix-read-{log_id}', daemon=True).start()
+
+        try:
+            while 1:
+                item = chunks.get()
+                if item is None:
+                    break
+
+                if isinstance(item, Exception):
+                    raise item
+
+                yield item
+
+        finally:
+            stop.set()
+
     def post(self, url, **kwargs):
         kwargs['token'] = settings.SHELIX_TOKEN
 
         resp = self.client.post(url, data=kwargs)
 
         return resp
+
+
+class AsyncStarHelixApi:
+    # async clients are bound to the loop they were created on, each loop keeps its own
+    # and it goes away with the loop instead of being replaced by the next loop's client
+    _clients = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self.client = self.shared_client()
+
+    @classmethod
+    def shared_client(cls):
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None or client.is_closed:
+            client = cls._clients[loop] = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(retries=settings.SHELIX_RETRIES),
+                **client_options(),
+            )
+
+        return client
+
+    @classmethod
+    async def start_log(cls, app):
+        self = cls()
+        resp = await self.post('/stash/v1/start-log/', app=app)
+        return resp.json()
+
+    @classmethod
+    async def end_log(cls, log_id):
+        self = cls()
+        resp = await self.post('/stash/v1/end-log/', log_id=log_id)
+        return resp.json()
+
+    @classmethod
+    async def save_log(cls, log_id, text):
+        self = cls()
+        resp = await self.post('/stash/v1/save-log/', log_id=log_id, logs=text)
+        return resp.json()
+
+    @classmethod
+    async def read_log(cls, log_id, after=None):
+        self = cls()
+        resp = await self.post('/stash/v1/read-log/', log_id=log_id, after=after)
+        return resp.text, resp.headers['Lastchunk'], resp.headers['Endlog']
+
+    async def post(self, url, **kwargs):
+        kwargs['token'] = settings.SHELIX_TOKEN
+
+        resp = await self.client.post(url, data=kwargs)
+
+        return resp
@@ -0,0 +1,294 @@
+import atexit
+import os
+import threading
+import time
+
+from django.conf import settings
+
+import httpx
+from loguru import logger
+
+from warpzone.shelix_api import StarHelixApi
+
+
+class ShelixLogWriter:
+    # write-behind buffer for server side messages, batches are posted from a
+    # background thread and spooled to disk while Star Helix is unavailable
+    #
+    # each process appends to its own <log id>.<pid>.log files and only replays its own,
+    # a file is renamed to <log id>.<pid>.<seq>.replay before it is posted so lines spooled
+    # during the post go to a fresh file, files left by dead processes are adopted by rename
+    REPORT_INTERVAL = 60
+    REPLAY_BYTES = 256 * 1024
+    MAX_REPLAY_ATTEMPTS = 10
+    MAX_BACKOFF = 300
+
+    def __init__(self, batch_size=50, interval=1.0, max_queue=10000, spool_dir=None):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self.spool_dir = spool_dir
+
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.buffers = {}
+        self.queued = 0
+        self.thread = None
+        self.pid = None
+
+        # replay file name -> (attempts, monotonic time of the next attempt, bytes already posted)
+        self.replays = {}
+
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.errors = 0
+        self.report_time = time.monotonic()
+
+    def ensure_thread(self):
+        if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+            if self.pid != os.getpid():
+                self.replays = {}
+
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='shelix-log-writer', daemon=True)
+            self.thread.start()
+
+    def write(self, log_id, text):
+        with self.cond:
+            self.ensure_thread()
+            if self.queued >= self.max_queue:
+                self.dropped += 1
+                return
+
+            lines = self.buffers.setdefault(log_id, [])
+            lines.append(text)
+            self.queued += 1
+            if len(lines) >= self.batch_size:
+                self.cond.notify()
+
+    def take(self, log_id=None):
+        with self.cond:
+            if log_id is None:
+                buffers, self.buffers = self.buffers, {}
+
+            else:
+                buffers = {log_id: self.buffers.pop(log_id)} if log_id in self.buffers else {}
+
+            self.queued -= sum(len(lines) for lines in buffers.values())
+            return buffers
+
+    def run(self):
+        while 1:
+            with self.cond:
+                self.cond.wait(self.interval)
+
+            try:
+                self.flush()
+                self.report()
+
+            except Exception:
+                logger.exception('Star Helix Log Writer Error')
+
+    def flush(self, log_id=None):
+        with self.flush_lock:
+            for lid, lines in self.take(log_id).items():
+                self.send(lid, ''.join(lines), len(lines))
+
+            if self.spool_dir and os.path.isdir(self.spool_dir):
+                self.adopt_orphans()
+                self.replay_spool(log_id)
+
+    def send(self, log_id, text, count):
+        # keep ordering, anything newer than spooled data is spooled behind it
+        if self.has_spool(log_id):
+            self.spool(log_id, text, count)
+            return
+
+        try:
+            StarHelixApi.save_log(log_id, text)
+            self.sent += count
+            self.batches += 1
+
+        except (httpx.HTTPError, ValueError):
+            self.errors += 1
+            self.spool(log_id, text, count)
+
+    def spool_name(self, log_id):
+        return f'{log_id}.{os.getpid()}.log'
+
+    def spool_files(self, suffix, pid=None):
+        # yields (name, log id, pid, seq) for spool files of the given kind
+        try:
+            names = os.listdir(self.spool_dir)
+
+        except FileNotFoundError:
+            return
+
+        for name in names:
+            if not name.endswith(suffix):
+                continue
+
+            parts = name[:-len(suffix)].rsplit('.', 2 if suffix == '.replay' else 1)
+            try:
+                file_pid = int(parts[1])
+                seq = int(parts[2]) if suffix == '.replay' else 0
+
+            except (IndexError, ValueError):
+                continue
+
+            if pid is None or file_pid == pid:
+                yield name, parts[0], file_pid, seq
+
+    def has_spool(self, log_id):
+        if not self.spool_dir:
+            return False
+
+        if os.path.exists(os.path.join(self.spool_dir, self.spool_name(log_id))):
+            return True
+
+        return any(lid == str(log_id) for name, lid, pid, seq in self.spool_files('.replay', os.getpid()))
+
+    def spool(self, log_id, text, count):
+        if not self.spool_dir:
+            self.dropped += count
+            return
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with open(os.path.join(self.spool_dir, self.spool_name(log_id)), 'a') as fh:
+            fh.write(text)
+
+        self.spooled += count
+
+    def claim(self, name, log_id):
+        # the rename is atomic, whoever renames a file owns it
+        target = f'{log_id}.{os.getpid()}.{time.time_ns()}.replay'
+        try:
+            os.rename(os.path.join(self.spool_dir, name), os.path.join(self.spool_dir, target))
+
+        except FileNotFoundError:
+            return None
+
+        return target
+
+    def adopt_orphans(self):
+        for pattern in ['.log', '.replay']:
+            for name, log_id, pid, seq in list(self.spool_files(pattern)):
+                if pid != os.getpid() and not pid_alive(pid):
+                    if self.claim(name, log_id):
+                        logger.info('Star Helix Spool Adopted: {} from pid {}', log_id, pid)
+
+    def replay_spool(self, log_id=None):
+        pid = os.getpid()
+        for name, lid, file_pid, seq in list(self.spool_files('.log', pid)):
+            if log_id is None or lid == str(log_id):
+                self.claim(name, lid)
+
+        pending = {}
+        for name, lid, file_pid, seq in self.spool_files('.replay', pid):
+            if log_id is None or lid == str(log_id):
+                pending.setdefault(lid, []).append((seq, name))
+
+        now = time.monotonic()
+        for lid, files in pending.items():
+            # oldest first and stop at the first failure so lines stay in order
+            for seq, name in sorted(files):
+                attempts, not_before, offset = self.replays.get(name, (0, 0, 0))
+                if not_before > now or not self.replay(lid, name):
+                    break
+
+    def replay(self, log_id, name):
+        path = os.path.join(self.spool_dir, name)
+        attempts, not_before, offset = self.replays.get(name, (0, 0, 0))
+
+        try:
+            with open(path) as fh:
+                fh.seek(offset)
+                while 1:
+                    text = fh.read(self.REPLAY_BYTES)
+                    if not text:
+                        break
+
+                    # posts end on a line boundary where there is one
+                    if not text.endswith('\n'):
+                        text += fh.readline()
+
+                    StarHelixApi.save_log(log_id, text)
+                    offset = fh.tell()
+                    self.batches += 1
+
+        except (httpx.HTTPError, ValueError):
+            self.errors += 1
+            attempts += 1
+            if attempts >= self.MAX_REPLAY_ATTEMPTS:
+                os.rename(path, f'{path}.failed')
+                self.replays.pop(name, None)
+                logger.error('Star Helix Spool Failed: {} after {} attempts', name, attempts)
+                return True
+
+            delay = min(self.interval * 2 ** attempts, self.MAX_BACKOFF)
+            self.replays[name] = (attempts, time.monotonic() + delay, offset)
+            return False
+
+        os.remove(path)
+        self.replays.pop(name, None)
+        return True
+
+    def report(self):
+        now = time.monotonic()
+        if now - self.report_time >= self.REPORT_INTERVAL:
+            self.report_time = now
+            if self.batches or self.queued or self.dropped:
+                logger.info('Star Helix Log Writer Stats: {}', self.stats())
+
+    def stats(self):
+        spool_files = 0
+        if self.spool_dir:
+            pid = os.getpid()
+            spool_files = len(list(self.spool_files('.log', pid))) + len(list(self.spool_files('.replay', pid)))
+
+        return {
+            'queued': self.queued,
+            'sent': self.sent,
+            'batches': self.batches,
+            'spooled': self.spooled,
+            'spool_files': spool_files,
+            'dropped': self.dropped,
+            'errors': self.errors,
+        }
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+
+    except ProcessLookupError:
+        return False
+
+    except PermissionError:
+        pass
+
+    return True
+
+
+
+writer = None
+writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    # built on first use so importing doesn't need configured settings
+    global writer
+
+    with writer_lock:
+        if writer is None:
+            writer = ShelixLogWriter(
+                batch_size=settings.SHELIX_LOG_BATCH_SIZE,
+                interval=settings.SHELIX_LOG_FLUSH_SECONDS,
+                max_queue=settings.SHELIX_LOG_MAX_QUEUE,
+                spool_dir=settings.SHELIX_LOG_SPOOL_DIR,
+            )
+            atexit.register(writer.flush)
+
+        return writer
@@ -6,7 +6,7 @@ from django.utils.html import mark_safe
 
 from django_json_widget.widgets import JSONEditorWidget
 
-from worlds.models import Pipeline, Job, StreamLog, CompletedLog, Cluster, JobType
+from worlds.models import Pipeline, Job, JobArtifact, LogChunk, StorageDeletion, StreamLog, StreamLogSegment, CompletedLog, Cluster, JobType
 
 
 @admin.register(JobType)
@@ -45,7 +45,7 @@ class JobAdmin(admin.ModelAdmin):
     }
 
     raw_id_fields = ('pipeline',)
-    readonly_fields = ('succeeded', 'failed', 'status')
+    readonly_fields = ('succeeded', 'failed', 'status', 'pods', 'pod_watchers')
 
     def _actions(self, obj):
         if obj:
@@ -72,9 +72,37 @@ class CompletedLogAdmin(admin.ModelAdmin):
     raw_id_fields = ('job',)
 
 
+@admin.register(JobArtifact)
+class JobArtifactAdmin(admin.ModelAdmin):
+    list_display = ('key', 'job', 'size', 'last_modified')
+    search_fields = ('key', 'job__job_name')
+    raw_id_fields = ('job',)
+
+
 @admin.register(StreamLog)
 class StreamLogAdmin(admin.ModelAdmin):
     list_display= ('pod', 'job', 'lines', 'status', 'modified')
     search_fields = ('pod', 'job__job_name')
     date_hierarchy = 'modified'
     raw_id_fields = ('job',)
+
+
+@admin.register(StreamLogSegment)
+class StreamLogSegmentAdmin(admin.ModelAdmin):
+    list_display = ('log', 'index', 'start_line', 'lines', 'size', 'created')
+    search_fields = ('log__pod',)
+    raw_id_fields = ('log',)
+
+
+@admin.register(LogChunk)
+class LogChunkAdmin(admin.ModelAdmin):
+    list_display = ('pod', 'job', 'start_line', 'lines', 'created')
+    search_fields = ('pod', 'job__job_name')
+    raw_id_fields = ('job',)
+    exclude = ('search',)
+
+
+@admin.register(StorageDeletion)
+class StorageDeletionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'attempts', 'created')
+    search_fields = ('name',)
@@ -0,0 +1,92 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Func, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from worlds.models import Job
+
+WINDOWS = {
+    '1h': datetime.timedelta(hours=1),
+    '24h': datetime.timedelta(hours=24),
+    '7d': datetime.timedelta(days=7),
+}
+
+
+class Percentile(Aggregate):
+    function = 'PERCENTILE_CONT'
+    name = 'Percentile'
+    output_field = FloatField()
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=percentile, **extra)
+
+
+class EpochSeconds(Func):
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+
+def duration():
+    return EpochSeconds(F('finished') - F('started'))
+
+
+def group_stats(qs, group_by):
+    # every finished job is counted, durations only cover jobs with a recorded start
+    timed = Q(started__isnull=False)
+    rows = qs.values(group_by).annotate(
+        jobs=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        failed=Count('id', filter=Q(status='failed')),
+        killed=Count('id', filter=Q(status='killed')),
+        avg_seconds=Avg(duration(), filter=timed),
+        p50_seconds=Percentile(duration(), 0.5, filter=timed),
+        p95_seconds=Percentile(duration(), 0.95, filter=timed),
+    ).order_by(group_by)
+
+    ret = []
+    for row in rows:
+        row['name'] = row.pop(group_by)
+        row['success_rate'] = row['completed'] / row['jobs'] if row['jobs'] else None
+        ret.append(row)
+
+    return ret
+
+
+def throughput(qs):
+    rows = qs.annotate(hour=TruncHour('finished')).values('hour').annotate(
+        completed=Count('id', filter=Q(status='completed')),
+        failed=Count('id', filter=Q(status__in=['failed', 'killed'])),
+    ).order_by('hour')
+
+    return [{'hour': r['hour'].isoformat(), 'completed': r['completed'], 'failed': r['failed']} for r in rows]
+
+
+def compute(window, pipeline=None):
+    since = timezone.now() - WINDOWS[window]
+    qs = Job.objects.filter(finished__gte=since)
+    if pipeline:
+        qs = qs.filter(pipeline__slug=pipeline)
+
+    return {
+        'window': window,
+        'since': since.isoformat(),
+        'pipelines': group_stats(qs, 'pipeline__slug'),
+        'job_types': group_stats(qs, 'job_type__name'),
+        'throughput': throughput(qs),
+    }
+
+
+def summary(window='24h', pipeline=None):
+    # aggregated in postgres and cached briefly, so dashboards can refresh freely
+    key = f'analytics-{window}-{pipeline or ""}'
+    data = caches['default'].get(key)
+    if data is None:
+        data = compute(window, pipeline)
+        data['generated'] = timezone.now().isoformat()
+        caches['default'].set(key, data, settings.ANALYTICS_CACHE_SECONDS)
+
+    return data
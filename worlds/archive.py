@@ -0,0 +1,180 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+from loguru import logger
+
+from worlds.models import CompletedLog, Job
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+LOG_TYPE = pa.struct([
+    ('pod', pa.string()),
+    ('file', pa.string()),
+    ('encoding', pa.string()),
+    ('size', pa.int64()),
+    ('lines', pa.int64()),
+])
+
+JOB_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('job_name', pa.string()),
+    ('pipeline_id', pa.int64()),
+    ('job_type', pa.string()),
+    ('image', pa.string()),
+    ('command', pa.list_(pa.string())),
+    ('parallelism', pa.int32()),
+    ('status', pa.string()),
+    ('succeeded', pa.int32()),
+    ('failed', pa.int32()),
+    ('pods', pa.list_(pa.string())),
+    ('created', TIMESTAMP),
+    ('started', TIMESTAMP),
+    ('finished', TIMESTAMP),
+    ('modified', TIMESTAMP),
+    ('queued_seconds', pa.float64()),
+    ('run_seconds', pa.float64()),
+    ('logs', pa.list_(LOG_TYPE)),
+])
+
+# files are laid out as <prefix>/day=YYYY-MM-DD/pipeline=<slug>/jobs-<first id>-<last id>.parquet, each
+# file covers a fixed aligned id range so a job lands in the same file however the jobs are batched
+FILE_IDS = 10000
+PARTITIONING = ds.partitioning(pa.schema([('day', pa.string()), ('pipeline', pa.string())]), flavor='hive')
+
+
+def seconds_between(start, end):
+    if start and end:
+        return (end - start).total_seconds()
+
+
+def job_row(job, logs):
+    return {
+        'id': job.id,
+        'job_name': job.job_name,
+        'pipeline_id': job.pipeline_id,
+        'job_type': job.job_type.name if job.job_type else None,
+        'image': job.image,
+        'command': job.command,
+        'parallelism': job.parallelism,
+        'status': job.status,
+        'succeeded': job.succeeded,
+        'failed': job.failed,
+        'pods': job.pods,
+        'created': job.created,
+        'started': job.started,
+        'finished': job.finished,
+        'modified': job.modified,
+        'queued_seconds': seconds_between(job.created, job.started),
+        'run_seconds': seconds_between(job.started or job.created, job.finished),
+        'logs': logs,
+    }
+
+
+def partition_name(day, pipeline, block):
+    first = block * FILE_IDS
+    return f'{settings.JOB_ARCHIVE_PREFIX}/day={day}/pipeline={pipeline}/jobs-{first}-{first + FILE_IDS - 1}.parquet'
+
+
+def write_partition(name, rows):
+    table = pa.Table.from_pylist(rows, schema=JOB_SCHEMA)
+
+    # earlier batches in the same id range are kept, jobs archived again replace their old rows
+    if default_storage.exists(name):
+        with default_storage.open(name, 'rb') as fh:
+            existing = pq.read_table(fh, schema=JOB_SCHEMA)
+
+        existing = existing.filter(pc.invert(pc.is_in(existing['id'], value_set=table['id'].combine_chunks())))
+        table = pa.concat_tables([existing, table]).sort_by('id')
+        default_storage.delete(name)
+
+    buf = pa.BufferOutputStream()
+    pq.write_table(table, buf, compression='zstd')
+    default_storage.save(name, ContentFile(buf.getvalue().to_pybytes()))
+
+
+def archive_jobs(ids):
+    jobs = Job.objects.filter(id__in=ids).select_related('pipeline', 'job_type').defer('envs', 'job_definition').order_by('id')
+
+    logs = defaultdict(list)
+    for log in CompletedLog.objects.filter(job_id__in=ids).exclude(log_file=''):
+        logs[log.job_id].append({
+            'pod': log.pod,
+            'file': log.log_file.name,
+            'encoding': log.encoding,
+            'size': log.size,
+            'lines': log.lines,
+        })
+
+    partitions = defaultdict(list)
+    for job in jobs:
+        day = timezone.localtime(job.created, timezone.utc).date().isoformat()
+        partitions[(day, job.pipeline.slug, job.id // FILE_IDS)].append(job_row(job, logs[job.id]))
+
+    for (day, pipeline, block), rows in partitions.items():
+        write_partition(partition_name(day, pipeline, block), rows)
+
+    Job.objects.filter(id__in=ids).update(archived=timezone.now())
+    logger.info('Archived Jobs: {} files={}', len(ids), len(partitions))
+
+
+def archive_filesystem():
+    if hasattr(default_storage, 'bucket_name'):
+        fs = pafs.S3FileSystem(
+            access_key=default_storage.access_key,
+            secret_key=default_storage.secret_key,
+            region=default_storage.region_name,
+            endpoint_override=default_storage.endpoint_url,
+        )
+        root = '/'.join(p for p in [default_storage.bucket_name, default_storage.location, settings.JOB_ARCHIVE_PREFIX] if p)
+        return fs, root
+
+    return pafs.LocalFileSystem(), default_storage.path(settings.JOB_ARCHIVE_PREFIX)
+
+
+def archive_dataset():
+    fs, root = archive_filesystem()
+    return ds.dataset(root, filesystem=fs, format='parquet', partitioning=PARTITIONING, schema=dataset_schema())
+
+
+def dataset_schema():
+    return pa.schema(list(JOB_SCHEMA) + list(PARTITIONING.schema))
+
+
+def read_jobs(start=None, end=None, pipeline=None, status=None, columns=None, limit=None):
+    # day and pipeline filters prune whole directories, other filters are pushed into the parquet scan
+    conditions = []
+    if start:
+        conditions.append(ds.field('day') >= start)
+
+    if end:
+        conditions.append(ds.field('day') <= end)
+
+    if pipeline:
+        conditions.append(ds.field('pipeline') == pipeline)
+
+    if status:
+        conditions.append(ds.field('status') == status)
+
+    expr = None
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+
+    try:
+        dataset = archive_dataset()
+
+    except FileNotFoundError:
+        return dataset_schema().empty_table()
+
+    if limit:
+        return dataset.head(limit, columns=columns, filter=expr)
+
+    return dataset.to_table(columns=columns, filter=expr)
@@ -0,0 +1,36 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from worlds.logfiles import CHUNK_SIZE
+
+
+def fetch(s3, bucket, artifact):
+    body = s3.get_object(Bucket=bucket, Key=artifact.key)['Body']
+
+    # small objects are read in the pool, big ones stream through the response as they are zipped
+    if artifact.size <= settings.ARTIFACT_PREFETCH_MAX_SIZE:
+        return [body.read()]
+
+    return body.iter_chunks(CHUNK_SIZE)
+
+
+def fetch_artifacts(s3, bucket, artifacts, workers=None):
+    workers = workers or settings.ARTIFACT_FETCH_WORKERS
+    artifacts = iter(artifacts)
+    pending = collections.deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit():
+            artifact = next(artifacts, None)
+            if artifact is not None:
+                pending.append((artifact, pool.submit(fetch, s3, bucket, artifact)))
+
+        for _ in range(workers * 2):
+            submit()
+
+        while pending:
+            artifact, future = pending.popleft()
+            yield artifact, future.result()
+            submit()
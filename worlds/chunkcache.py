@@ -0,0 +1,69 @@
+import asyncio
+
+from django.conf import settings
+from django.core.cache import caches
+
+from asgiref.sync import sync_to_async
+
+from warpzone.shelix_api import AsyncStarHelixApi
+
+
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.05
+
+# reads already in flight in this process
+inflight = {}
+
+
+def in_thread(func):
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def chunk_key(log_id, after):
+    return f'shelix-chunk-{log_id}-{after}'
+
+
+async def fetch(log_id, after, key):
+    text, lastchunk, endlog = await AsyncStarHelixApi.read_log(log_id, after)
+    chunk = {'text': text, 'lastchunk': lastchunk, 'endlog': endlog}
+
+    # once the log has ended a chunk never changes
+    timeout = settings.SHELIX_CHUNK_ENDED_TTL if endlog else settings.SHELIX_CHUNK_TTL
+    await in_thread(caches['default'].set)(key, chunk, timeout)
+    return chunk
+
+
+async def read_shared(log_id, after, key):
+    cache = caches['default']
+    lock = f'{key}-lock'
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LOCK_TIMEOUT
+    while loop.time() < deadline:
+        chunk = await in_thread(cache.get)(key)
+        if chunk is not None:
+            return chunk
+
+        if await in_thread(cache.add)(lock, 1, LOCK_TIMEOUT):
+            try:
+                return await fetch(log_id, after, key)
+
+            finally:
+                await in_thread(cache.delete)(lock)
+
+        await asyncio.sleep(POLL_INTERVAL)
+
+    # the process holding the lock is stuck, don't wait on it any longer
+    return await fetch(log_id, after, key)
+
+
+async def read_log(log_id, after):
+    key = chunk_key(log_id, after)
+
+    future = inflight.get(key)
+    if future is None:
+        future = inflight[key] = asyncio.ensure_future(read_shared(log_id, after, key))
+        future.add_done_callback(lambda f: inflight.pop(key, None))
+
+    chunk = await asyncio.shield(future)
+    return chunk['text'], chunk['lastchunk'], chunk['endlog']
@@ -0,0 +1,192 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+import yaml
+from asgiref.sync import sync_to_async
+from loguru import logger
+
+from kubernetes_asyncio import client as kube_apis
+from kubernetes_asyncio.client import ApiClient, Configuration
+from kubernetes_asyncio.client.exceptions import ApiException
+from kubernetes_asyncio.config.kube_config import KubeConfigLoader
+
+from worlds.logstream import StreamLogWriter
+from worlds.models import Job, StreamLog
+
+
+def in_thread(func):
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def pending_logs(exclude):
+    close_old_connections()
+    qs = StreamLog.objects.filter(status='created').exclude(
+        job__status__in=Job.STATUS_DONE).exclude(id__in=exclude)
+    return list(qs.values_list('id', flat=True)[:500])
+
+
+def load_log(log_id):
+    close_old_connections()
+    log = StreamLog.objects.select_related('job', 'job__pipeline', 'job__pipeline__cluster').get(id=log_id)
+    writer = StreamLogWriter(log)
+    writer.start()
+    return writer
+
+
+class LogCollector:
+    DISCOVER_INTERVAL = 1
+    REPORT_INTERVAL = 30
+    ERROR_DELAY = 10
+    EMPTY_DELAY = 60
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks = {}
+        self.active = 0
+        self.not_before = {}
+        self.clients = {}
+
+        self.lines = 0
+        self.report_lines = 0
+        self.report_time = time.monotonic()
+
+    async def run(self):
+        logger.info('Log Collector Starting: concurrency={}', self.concurrency)
+
+        while 1:
+            try:
+                await self.discover()
+
+            except Exception:
+                logger.exception('Log Collector Discovery Error')
+
+            self.report()
+            await asyncio.sleep(self.DISCOVER_INTERVAL)
+
+    async def discover(self):
+        now = time.monotonic()
+        self.not_before = {lid: ts for lid, ts in self.not_before.items() if ts > now}
+
+        for log_id in await in_thread(pending_logs)(list(self.tasks) + list(self.not_before)):
+            self.tasks[log_id] = asyncio.create_task(self.collect(log_id))
+
+    def report(self):
+        now = time.monotonic()
+        elapsed = now - self.report_time
+        if elapsed < self.REPORT_INTERVAL:
+            return
+
+        rate = (self.lines - self.report_lines) / elapsed
+        logger.info(
+            'Log Collector Stats: active={} queued={} lines={} lines/sec={:.1f}',
+            self.active, len(self.tasks) - self.active, self.lines, rate,
+        )
+        self.report_lines = self.lines
+        self.report_time = now
+
+    async def kube_client(self, cluster):
+        fingerprint = cluster.config_fingerprint()
+        cached = self.clients.get(cluster.id)
+        if cached and cached[0] == fingerprint and time.monotonic() - cached[2] < settings.KUBE_CLIENT_MAX_AGE:
+            return cached[1]
+
+        client_config = type.__call__(Configuration)
+        loader = KubeConfigLoader(config_dict=yaml.load(cluster.config, Loader=yaml.SafeLoader))
+        await loader.load_and_set(client_config)
+        client = ApiClient(configuration=client_config)
+
+        if cached:
+            await cached[1].close()
+
+        self.clients[cluster.id] = (fingerprint, client, time.monotonic())
+        return client
+
+    async def collect(self, log_id):
+        try:
+            async with self.semaphore:
+                self.active += 1
+                try:
+                    delay = await self.stream(log_id)
+
+                finally:
+                    self.active -= 1
+
+            if delay:
+                self.not_before[log_id] = time.monotonic() + delay
+
+        except Exception:
+            logger.exception('Log Collector Error: {}', log_id)
+            self.not_before[log_id] = time.monotonic() + self.ERROR_DELAY
+
+        finally:
+            del self.tasks[log_id]
+
+    async def stream(self, log_id):
+        writer = await in_thread(load_log)(log_id)
+        job = writer.log.job
+        pod = writer.log.pod
+        logger.info('Starting log watch: {} {}', job, pod)
+
+        try:
+            v1 = kube_apis.CoreV1Api(await self.kube_client(job.pipeline.cluster))
+            response = await v1.read_namespaced_pod_log(
+                name=pod, namespace='default', follow=True, _preload_content=False)
+
+            async with response:
+                partial = b''
+                while 1:
+                    try:
+                        data = await asyncio.wait_for(response.content.readany(), writer.TICK_SECONDS)
+
+                    except asyncio.TimeoutError:
+                        # the pod is quiet, buffered lines are still flushed on time
+                        await in_thread(writer.tick)()
+                        continue
+
+                    if not data:
+                        if partial:
+                            self.lines += 1
+                            await in_thread(writer.write)([partial.decode(errors='replace')])
+
+                        break
+
+                    lines = (partial + data).split(b'\n')
+                    partial = lines.pop()
+                    if not lines:
+                        continue
+
+                    self.lines += len(lines)
+                    if not await in_thread(writer.write)([l.decode(errors='replace') for l in lines]):
+                        logger.info('Line limit Exiting: {} {}', job, pod)
+                        break
+
+        except ApiException as exc:
+            await in_thread(writer.close)()
+            if not await in_thread(job.pod_log_error)(exc.status, exc.body.decode()):
+                logger.info('Log watch error: {} {} status={}', job, pod, exc.status)
+
+            return await self.retry(writer, self.ERROR_DELAY)
+
+        except Exception:
+            await in_thread(writer.close)()
+            logger.exception('Log watch error: {} {}', job, pod)
+            return await self.retry(writer, self.ERROR_DELAY)
+
+        if await in_thread(writer.finish)():
+            logger.info('Completed log watch: {} {}', job, pod)
+            return None
+
+        return await self.retry(writer, self.EMPTY_DELAY)
+
+    async def retry(self, writer, delay):
+        # every failed attempt counts against the log's retries, once they run out it is marked failed
+        if await in_thread(writer.retry)():
+            logger.info('Retrying log watch: {} {} in {}s', writer.log.job, writer.log.pod, delay)
+            return delay
+
+        logger.info('Giving up log watch: {} {}', writer.log.job, writer.log.pod)
+        return None
@@ -0,0 +1,67 @@
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.encoding import force_str
+
+from fernet_fields import EncryptedTextField
+
+
+class Ciphertext(bytes):
+    pass
+
+
+# a data descriptor, so reads go through __get__ even once the value is in the instance dict
+class LazyDecryptAttribute(DeferredAttribute):
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+        if not isinstance(value, Ciphertext):
+            instance.__dict__.pop(self.field.ciphertext_attname, None)
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if isinstance(value, Ciphertext):
+            # the ciphertext is kept so it can still be used as a cache key after decrypting
+            instance.__dict__[self.field.ciphertext_attname] = value
+            value = self.field.decrypt(value)
+            instance.__dict__[self.field.attname] = value
+
+        return value
+
+
+class LazyEncryptedTextField(EncryptedTextField):
+    # rows keep the ciphertext from the database until the field is read, so
+    # list pages and bulk queries don't pay for decrypting every row
+    descriptor_class = LazyDecryptAttribute
+
+    @property
+    def ciphertext_attname(self):
+        return f'_{self.attname}_ciphertext'
+
+    def ciphertext(self, instance):
+        # the stored value as loaded from the database, None for unsaved or reassigned values
+        value = instance.__dict__.get(self.attname)
+        if isinstance(value, Ciphertext):
+            return value
+
+        return instance.__dict__.get(self.ciphertext_attname)
+
+    def from_db_value(self, value, expression, connection, *args):
+        if value is not None:
+            return Ciphertext(value)
+
+    def decrypt(self, value):
+        return self.to_python(force_str(self.fernet.decrypt(bytes(value))))
+
+    def pre_save(self, model_instance, add):
+        # unread values are written back as is instead of decrypting and encrypting again
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, Ciphertext):
+            return value
+
+        # it is encrypted again with a new token, the old ciphertext no longer matches the row
+        model_instance.__dict__.pop(self.ciphertext_attname, None)
+        return super().pre_save(model_instance, add)
+
+    def get_db_prep_save(self, value, connection):
+        if isinstance(value, Ciphertext):
+            return connection.Database.Binary(bytes(value))
+
+        return super().get_db_prep_save(value, connection)
@@ -0,0 +1,102 @@
+import asyncio
+
+from django.conf import settings
+
+from loguru import logger
+
+END = object()
+OVERFLOW = object()
+
+
+class Subscription:
+    def __init__(self, topic, maxsize):
+        self.topic = topic
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.position = topic.position
+        self.overflowed = False
+
+    def put(self, msg):
+        if self.overflowed:
+            return
+
+        try:
+            self.queue.put_nowait(msg)
+
+        except asyncio.QueueFull:
+            # slow client, drop its backlog and let it catch up from the source on its own
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+            self.queue.put_nowait(OVERFLOW)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Topic:
+    def __init__(self, key):
+        self.key = key
+        self.subscribers = set()
+        self.position = None
+        self.task = None
+
+    def publish(self, msg, position=None):
+        if position is not None:
+            self.position = position
+
+        for sub in list(self.subscribers):
+            sub.put(msg)
+
+
+class Hub:
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self.topics = {}
+
+    def subscribe(self, key, reader):
+        topic = self.topics.get(key)
+        if topic is None or topic.task.done():
+            topic = Topic(key)
+            topic.task = asyncio.create_task(self.run(topic, reader))
+            self.topics[key] = topic
+
+        sub = Subscription(topic, self.queue_size)
+        topic.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        topic = sub.topic
+        topic.subscribers.discard(sub)
+
+        if not topic.subscribers:
+            topic.task.cancel()
+            if self.topics.get(topic.key) is topic:
+                del self.topics[topic.key]
+
+    async def run(self, topic, reader):
+        logger.info('Hub Reader Started: {}', topic.key)
+        try:
+            await reader(topic)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception:
+            logger.exception('Hub Reader Error: {}', topic.key)
+
+        finally:
+            logger.info('Hub Reader Stopped: {}', topic.key)
+            if self.topics.get(topic.key) is topic:
+                del self.topics[topic.key]
+
+            topic.publish(END)
+
+    def stats(self):
+        return {
+            'topics': len(self.topics),
+            'subscribers': sum(len(t.subscribers) for t in self.topics.values()),
+        }
+
+
+hub = Hub(queue_size=settings.HUB_QUEUE_SIZE)
@@ -0,0 +1,128 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+import yaml
+from loguru import logger
+
+from kubernetes.client import ApiClient, Configuration
+from kubernetes.config.kube_config import _get_kube_config_loader
+
+
+def close_client(client):
+    # in flight requests finish on their connections, they just aren't pooled again
+    client.close()
+    client.rest_client.pool_manager.clear()
+
+
+class ClientRegistry:
+    # exec plugin and EKS tokens are copied into the client once when it is built and
+    # are never refreshed, so clients are rebuilt before the token can expire
+    def __init__(self, max_size=16, max_age=600):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.clients = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.create_count = 0
+        self.create_seconds = 0.0
+
+    @staticmethod
+    def fingerprint(config):
+        if isinstance(config, str):
+            config = config.encode()
+
+        return hashlib.sha256(config or b'').hexdigest()
+
+    @staticmethod
+    def build(config):
+        client_config = type.__call__(Configuration)
+        loader = _get_kube_config_loader(config_dict=yaml.load(config, Loader=yaml.SafeLoader))
+        loader.load_and_set(client_config)
+        client_config.connection_pool_maxsize = settings.KUBE_CLIENT_POOL_SIZE
+        return ApiClient(configuration=client_config)
+
+    def get(self, cluster_id, fingerprint, load_config):
+        # load_config is only called on a miss, so cached clients never decrypt the config
+        key = (cluster_id, fingerprint)
+        expired = None
+
+        with self.lock:
+            entry = self.clients.get(key)
+            if entry is not None:
+                client, created = entry
+                if time.monotonic() - created < self.max_age:
+                    self.clients.move_to_end(key)
+                    self.hits += 1
+                    return client
+
+                expired = self.clients.pop(key)[0]
+                self.expirations += 1
+
+            self.misses += 1
+
+        if expired is not None:
+            close_client(expired)
+
+        start = time.perf_counter()
+        client = self.build(load_config())
+        elapsed = time.perf_counter() - start
+
+        evicted = []
+        with self.lock:
+            self.create_count += 1
+            self.create_seconds += elapsed
+
+            # another thread may have built the same client while we were
+            if key in self.clients:
+                evicted.append(client)
+                client = self.clients[key][0]
+
+            else:
+                self.clients[key] = (client, time.monotonic())
+                while len(self.clients) > self.max_size:
+                    evicted.append(self.clients.popitem(last=False)[1][0])
+                    self.evictions += 1
+
+        for old in evicted:
+            close_client(old)
+
+        logger.info('Kube Client Created: cluster={} {:.3f}s', cluster_id, elapsed)
+        return client
+
+    def invalidate(self, cluster_id):
+        with self.lock:
+            evicted = [self.clients.pop(k)[0] for k in [k for k in self.clients if k[0] == cluster_id]]
+
+        for client in evicted:
+            close_client(client)
+
+    def clear(self):
+        with self.lock:
+            evicted = [client for client, created in self.clients.values()]
+            self.clients.clear()
+
+        for client in evicted:
+            close_client(client)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.clients),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'created': self.create_count,
+                'create_seconds_avg': self.create_seconds / self.create_count if self.create_count else 0.0,
+            }
+
+
+registry = ClientRegistry(max_size=settings.KUBE_CLIENT_CACHE_SIZE, max_age=settings.KUBE_CLIENT_MAX_AGE)
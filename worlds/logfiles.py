@@ -0,0 +1,200 @@
+import gzip
+import posixpath
+import struct
+import tempfile
+import zlib
+from collections import deque
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+
+CHUNK_SIZE = 64 * 1024
+# header of a gzip member with no name or mtime, the deflate stream follows it
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+# every `every` lines a new block starts and its offset is recorded. compressed logs are a
+# single gzip member so clients decoding Content-Encoding: gzip read all of it, each block
+# ends on a full flush so it can be range read and inflated on its own
+class LogWriter:
+
+    def __init__(self, compress=True, every=None, level=6):
+        self.fh = tempfile.SpooledTemporaryFile(max_size=settings.LOG_SPOOL_MAX_MEMORY)
+        self.compress = compress
+        self.every = every or settings.LOG_INDEX_EVERY
+        self.level = level
+
+        self.compressor = None
+        self.crc = 0
+        self.raw_size = 0
+        self.size = 0
+        self.lines = 0
+        self.block_lines = 0
+        self.block_open = False
+        self.offsets = []
+        self.last_byte = b'\n'
+
+    def out(self, data):
+        if data:
+            self.fh.write(data)
+            self.size += len(data)
+
+    def write_block(self, data):
+        if not data:
+            return
+
+        if self.compress and self.compressor is None:
+            self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self.out(GZIP_HEADER)
+
+        if not self.block_open:
+            self.offsets.append(self.size)
+            self.block_open = True
+
+        if self.compress:
+            self.crc = zlib.crc32(data, self.crc)
+            data = self.compressor.compress(data)
+
+        self.out(data)
+
+    def end_block(self):
+        if self.block_open and self.compress:
+            self.out(self.compressor.flush(zlib.Z_FULL_FLUSH))
+
+        self.block_open = False
+        self.block_lines = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+
+        if not data:
+            return
+
+        self.raw_size += len(data)
+        self.last_byte = data[-1:]
+
+        while data:
+            need = self.every - self.block_lines
+            if data.count(b'\n') < need:
+                self.block_lines += data.count(b'\n')
+                self.lines += data.count(b'\n')
+                self.write_block(data)
+                break
+
+            pos = -1
+            for _ in range(need):
+                pos = data.index(b'\n', pos + 1)
+
+            self.write_block(data[:pos + 1])
+            self.lines += need
+            self.end_block()
+            data = data[pos + 1:]
+
+    def close(self):
+        self.end_block()
+        if self.compressor is not None:
+            self.out(self.compressor.flush())
+            self.out(struct.pack('<II', self.crc, self.raw_size & 0xffffffff))
+
+        if self.last_byte != b'\n':
+            self.lines += 1
+
+        self.fh.seek(0)
+        content = File(self.fh)
+        content.content_type = 'text/plain'
+        return content
+
+    @property
+    def index(self):
+        return {'every': self.every, 'offsets': self.offsets, 'flushed': self.compress}
+
+
+def storage_key(storage, name):
+    # the s3 object key for a storage name, names are stored relative to AWS_LOCATION
+    return posixpath.join(storage.location or '', name).lstrip('/')
+
+
+def read_range(file_field, start, end):
+    storage = file_field.storage
+
+    if hasattr(storage, 'bucket_name'):
+        # s3, fetch only the requested bytes
+        response = storage.connection.meta.client.get_object(
+            Bucket=storage.bucket_name,
+            Key=storage_key(storage, file_field.name),
+            Range=f'bytes={start}-{end - 1}',
+        )
+        try:
+            return response['Body'].read()
+
+        finally:
+            response['Body'].close()
+
+    with file_field.open('rb') as fh:
+        fh.seek(start)
+        return fh.read(end - start)
+
+
+def index_block_range(index, size, first, last):
+    offsets = index['offsets']
+    start = offsets[first]
+    end = offsets[last + 1] if last + 1 < len(offsets) else size
+    return start, end
+
+
+def decompress_blocks(index, data):
+    if index.get('flushed'):
+        return zlib.decompressobj(-zlib.MAX_WBITS).decompress(data)
+
+    # logs written before the blocks shared one gzip member
+    return gzip.decompress(data)
+
+
+def iter_file(file_field, chunk_size=CHUNK_SIZE):
+    with file_field.open('rb') as fh:
+        while 1:
+            data = fh.read(chunk_size)
+            if not data:
+                break
+
+            yield data
+
+
+def iter_decompressed(file_field, chunk_size=CHUNK_SIZE):
+    with file_field.open('rb') as fh:
+        with gzip.GzipFile(fileobj=fh) as gz:
+            while 1:
+                data = gz.read(chunk_size)
+                if not data:
+                    break
+
+                yield data
+
+
+def iter_lines(chunks):
+    partial = b''
+    for data in chunks:
+        lines = (partial + data).split(b'\n')
+        partial = lines.pop()
+        for line in lines:
+            yield (line + b'\n').decode(errors='replace')
+
+    if partial:
+        yield partial.decode(errors='replace')
+
+
+# unindexed logs are streamed so only the requested lines are ever held in memory
+def slice_lines(chunks, start, count):
+    return list(islice(iter_lines(chunks), start, start + count))
+
+
+def tail_lines(chunks, count):
+    total = 0
+    lines = deque(maxlen=count)
+    for line in iter_lines(chunks):
+        lines.append(line)
+        total += 1
+
+    return total - len(lines), list(lines)
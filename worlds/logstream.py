@@ -0,0 +1,190 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.db import connection
+
+from loguru import logger
+
+
+def redis_client(write=False):
+    return caches['default'].get_client('default', write=write)
+
+
+def stream_key(pod):
+    return f'logstream-{pod}'
+
+
+def append(pod, lines):
+    # readers are woken by the StreamLog save that follows every append
+    if not lines:
+        return None
+
+    key = stream_key(pod)
+    pipe = redis_client(write=True).pipeline(transaction=False)
+    pipe.xadd(
+        key,
+        {'lines': ''.join(lines), 'count': len(lines)},
+        maxlen=settings.LOG_STREAM_MAXLEN,
+        approximate=True,
+    )
+    pipe.expire(key, settings.LOG_STREAM_TTL)
+    entry_id = pipe.execute()[0]
+    return entry_id.decode()
+
+
+def parse_id(entry_id):
+    ms, seq = entry_id.split('-')
+    return int(ms), int(seq)
+
+
+def read(pod, after='0-0', count=500, until=None):
+    response = redis_client().xread({stream_key(pod): after}, count=count)
+    if not response:
+        return after, ''
+
+    text = []
+    for entry_id, fields in response[0][1]:
+        entry_id = entry_id.decode()
+        if until is not None and parse_id(entry_id) > parse_id(until):
+            break
+
+        text.append(fields[b'lines'].decode())
+        after = entry_id
+
+    return after, ''.join(text)
+
+
+class StreamLogWriter:
+    LINE_LIMIT = 500000
+    BATCH_LINES = 256
+    BATCH_SECONDS = 3
+    MAX_RETRIES = 15
+    TICK_SECONDS = 1
+
+    def __init__(self, log):
+        self.log = log
+        self.lock = threading.RLock()
+        self.buffer = []
+        self.buffer_time = time.time()
+
+        self.segment = bytearray()
+        self.segment_index = 0
+        self.segment_start = 0
+        self.segment_time = time.time()
+
+    def start(self):
+        self.log.lines = 0
+        # the pod log is read again from the start, an older single file would shadow the new segments
+        self.log.clear_legacy_file()
+        self.log.save()
+
+        # the pod log is always read from the beginning, so a retry replaces what was stored
+        for segment in self.log.segments.all():
+            segment.log_file.delete(save=False)
+
+        self.log.segments.all().delete()
+
+        if settings.LOG_SEARCH_ENABLED:
+            from worlds.search import LogIndexer
+
+            LogIndexer(self.log.job_id, self.log.pod).reset()
+
+    def write(self, lines):
+        with self.lock:
+            for line in lines:
+                self.segment += (line + '\n').encode()
+                self.buffer.append(line + '\n')
+                self.log.lines += 1
+
+            self.tick()
+            return self.log.lines <= self.LINE_LIMIT
+
+    def tick(self):
+        # called on every write and on a timer, so a quiet pod's tail is still stored on time
+        with self.lock:
+            if len(self.buffer) >= self.BATCH_LINES or (time.time() - self.buffer_time) > self.BATCH_SECONDS:
+                self.flush()
+
+            if len(self.segment) >= settings.STREAM_LOG_SEGMENT_BYTES or \
+                    (time.time() - self.segment_time) > settings.STREAM_LOG_SEGMENT_SECONDS:
+                self.flush_segment()
+
+    def heartbeat(self):
+        # for blocking readers that can't call tick themselves, set the returned event to stop it
+        stop = threading.Event()
+
+        def run():
+            try:
+                while not stop.wait(self.TICK_SECONDS):
+                    try:
+                        self.tick()
+
+                    except Exception:
+                        logger.exception('Log Heartbeat Error: {}', self.log.pod)
+
+            finally:
+                connection.close()
+
+        threading.Thread(target=run, name=f'log-heartbeat-{self.log.pod}', daemon=True).start()
+        return stop
+
+    def flush_segment(self):
+        if self.segment:
+            segment = self.log.segments.model(
+                log=self.log,
+                index=self.segment_index,
+                start_line=self.segment_start,
+                lines=self.log.lines - self.segment_start,
+                size=len(self.segment),
+            )
+            name = f'{self.log.pod}.{self.segment_index:05d}.log'
+            segment.log_file.save(name, content=ContentFile(bytes(self.segment)), save=False)
+            segment.save()
+
+            if settings.LOG_SEARCH_ENABLED:
+                # indexed by a worker, so a slow or failing index never holds up the pod's log
+                from worlds.tasks import index_log_segment
+
+                index_log_segment(segment.id)
+
+            self.segment_index += 1
+            self.segment_start = self.log.lines
+
+        self.segment = bytearray()
+        self.segment_time = time.time()
+
+    def flush(self):
+        if self.buffer:
+            append(self.log.pod, self.buffer)
+            self.log.save()
+
+        self.buffer = []
+        self.buffer_time = time.time()
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.flush_segment()
+
+    def finish(self):
+        with self.lock:
+            self.close()
+            if self.log.lines:
+                self.log.status = 'completed'
+                self.log.save()
+                return True
+
+            return False
+
+    def retry(self):
+        if self.log.retries < self.MAX_RETRIES:
+            self.log.retries += 1
+            self.log.save()
+            return True
+
+        self.log.status = 'failed'
+        self.log.save()
+        return False
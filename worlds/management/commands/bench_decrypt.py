@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from fernet_fields import EncryptedTextField
+
+from worlds.fields import Ciphertext
+from worlds.models import Job
+
+FIELD_NAMES = ['id', 'envs', 'status']
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-row cost of loading jobs with the eager EncryptedTextField and the lazy field'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--table', action='store_true', help='load rows from the jobs table instead of building them in memory')
+
+    def handle(self, *args, **options):
+        limit = options['rows']
+        field = Job._meta.get_field('envs')
+
+        # the field the envs columns used before, it decrypts every row as it is loaded
+        eager_field = EncryptedTextField()
+        eager_field.set_attributes_from_name('envs')
+
+        if options['table']:
+            load_rows = lambda: self.table_rows(limit)
+
+        else:
+            value = memoryview(field.fernet.encrypt(b'API_KEY=secret\nDEBUG=0\n' * 4))
+            values = [(i, value, 'completed') for i in range(limit)]
+            load_rows = lambda: values
+
+        rows = len(load_rows())
+        if not rows:
+            self.stdout.write('no rows to load')
+            return
+
+        assert isinstance(field.from_db_value(load_rows()[0][1], None, connection), Ciphertext)
+
+        eager = self.time_load(load_rows, eager_field, read=True)
+        lazy = self.time_load(load_rows, field, read=False)
+        lazy_read = self.time_load(load_rows, field, read=True)
+
+        self.stdout.write(f'rows={rows}')
+        self.stdout.write(f'eager:       {eager:.3f}s {eager / rows * 1e6:.1f}us/row')
+        self.stdout.write(f'lazy:        {lazy:.3f}s {lazy / rows * 1e6:.1f}us/row')
+        self.stdout.write(f'lazy + read: {lazy_read:.3f}s {lazy_read / rows * 1e6:.1f}us/row')
+
+    def table_rows(self, rows):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id, envs, status FROM {Job._meta.db_table} LIMIT %s', [rows])
+            return cursor.fetchall()
+
+    def time_load(self, load_rows, field, read):
+        # rows are built the way the queryset iterator builds them, with the field's database converter
+        start = time.perf_counter()
+        for pk, envs, status in load_rows():
+            job = Job.from_db('default', FIELD_NAMES, [pk, field.from_db_value(envs, None, connection), status])
+            if read:
+                job.envs
+
+        return time.perf_counter() - start
@@ -0,0 +1,16 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from worlds.collector import LogCollector
+
+
+class Command(BaseCommand):
+    help = 'Stream logs for every watched pod concurrently on one asyncio event loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.LOG_COLLECTOR_CONCURRENCY)
+
+    def handle(self, *args, **options):
+        asyncio.run(LogCollector(options['concurrency']).run())
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from worlds.models import Job, Pipeline
+
+SEED_PREFIX = 'query-plan-seed-'
+
+
+class Command(BaseCommand):
+    help = 'Print query plans for the job list and running job lookups, optionally seeding synthetic jobs first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='insert this many synthetic jobs before explaining')
+        parser.add_argument('--cleanup', action='store_true', help='delete the synthetic jobs afterwards')
+
+    def handle(self, *args, **options):
+        pipeline = Pipeline.objects.first()
+        if pipeline is None:
+            self.stderr.write('At least one pipeline is needed')
+            return
+
+        if options['seed']:
+            self.seed(pipeline, options['seed'])
+
+        # seeded jobs use images image:0 to image:199, the running ones are all image:0
+        queries = [
+            ('job list first page', Job.objects.order_by('-created', '-id')[:51]),
+            ('running job by pipeline and image', Job.objects.filter(
+                pipeline=pipeline, image='image:0', status__in=Job.STATUS_RUNNING).order_by('-created')[:1]),
+            ('running job by pipeline', Job.objects.filter(
+                pipeline=pipeline, status__in=Job.STATUS_RUNNING).order_by('-created')[:1]),
+        ]
+
+        # a cursor deep into the list, the same filter KeysetPage builds
+        job = Job.objects.order_by('-created', '-id')[1000:1001].first()
+        if job:
+            queries.insert(1, ('job list keyset page', Job.objects.order_by('-created', '-id').filter(
+                created__lte=job.created).exclude(created=job.created, id__gte=job.id)[:51]))
+
+        for name, qs in queries:
+            self.stdout.write(f'-- {name}')
+            self.stdout.write(qs.explain(analyze=True, buffers=True))
+            self.stdout.write('')
+
+        if options['cleanup']:
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM worlds_job WHERE job_name LIKE %s', [f'{SEED_PREFIX}%'])
+                self.stdout.write(f'Deleted seeded jobs: {cursor.rowcount}')
+
+    def seed(self, pipeline, count):
+        # generate_series keeps millions of rows fast, about 1 in 10000 jobs is left running
+        with connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                INSERT INTO worlds_job (
+                    command, image, parallelism, succeeded, failed, job_name, pipeline_id,
+                    status, created, modified
+                )
+                SELECT
+                    ARRAY['run'], 'image:' || (n %% 200), 1, 1, 0, %s || n, %s,
+                    CASE WHEN n %% 10000 = 0 THEN 'active' ELSE 'completed' END,
+                    now() - n * interval '1 second', now() - n * interval '1 second'
+                FROM generate_series(1, %s) AS n
+                ''',
+                [SEED_PREFIX, pipeline.id, count],
+            )
+            cursor.execute('ANALYZE worlds_job')
+
+        self.stdout.write(f'Seeded jobs: {count}')
@@ -0,0 +1,36 @@
+import functools
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from loguru import logger
+
+from worlds.watchers import JobWatcher, WatcherSet, assign_pod, pod_informers
+
+
+class Command(BaseCommand):
+    help = 'Watch Kubernetes Jobs and Pods on every active cluster and update Job rows as events arrive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-interval', type=int, default=60, help='seconds between cluster list refreshes')
+
+    def handle(self, *args, **options):
+        watcher_sets = [WatcherSet(JobWatcher)]
+        if settings.POD_INFORMER_ENABLED:
+            # new pods get their log watchers as soon as the informer sees them
+            watcher_sets.append(WatcherSet(functools.partial(pod_informers.create, on_added=assign_pod)))
+
+        try:
+            while 1:
+                for watchers in watcher_sets:
+                    watchers.sync()
+
+                time.sleep(options['sync_interval'])
+
+        except KeyboardInterrupt:
+            logger.info('Stopping Job Watchers')
+
+        finally:
+            for watchers in watcher_sets:
+                watchers.stop()
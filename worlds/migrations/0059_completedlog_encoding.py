@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worlds', '0058_remove_pipeline_config_old'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='completedlog',
+            name='encoding',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('gzip', 'gzip')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='completedlog',
+            name='size',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worlds', '0059_completedlog_encoding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='manifest_created',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='JobArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=1024)),
+                ('size', models.PositiveBigIntegerField()),
+                ('etag', models.CharField(max_length=255)),
+                ('last_modified', models.DateTimeField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='worlds.job')),
+            ],
+            options={
+                'ordering': ['key'],
+                'unique_together': {('job', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worlds', '0060_jobartifact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StreamLogSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('start_line', models.PositiveIntegerField()),
+                ('lines', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('log_file', models.FileField(upload_to='warpzone/%Y/%m/%d/')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('log', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='worlds.streamlog')),
+            ],
+            options={
+                'ordering': ['log', 'index'],
+                'unique_together': {('log', 'index')},
+            },
+        ),
+    ]
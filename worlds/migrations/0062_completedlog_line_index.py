@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worlds', '0061_streamlogsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='completedlog',
+            name='line_index',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='completedlog',
+            name='lines',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worlds', '0062_completedlog_line_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pod', models.CharField(max_length=255)),
+                ('start_line', models.PositiveIntegerField()),
+                ('lines', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('search', django.contrib.postgres.search.SearchVectorField()),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='worlds.job')),
+            ],
+            options={
+                'ordering': ['job', 'pod', 'start_line'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='logchunk',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search'], name='worlds_logc_search_496d6b_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='logchunk',
+            index=models.Index(fields=['job', 'pod'], name='worlds_logc_job_id_4a8b60_idx'),
+        ),
+    ]
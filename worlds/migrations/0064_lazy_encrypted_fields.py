@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:57
+
+from django.db import migrations
+import worlds.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worlds', '0063_logchunk'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cluster',
+            name='config',
+            field=worlds.fields.LazyEncryptedTextField(blank=True, help_text='kube config file', null=True),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='envs',
+            field=worlds.fields.LazyEncryptedTextField(blank=True, help_text='use .env format', null=True),
+        ),
+        migrations.AlterField(
+            model_name='pipeline',
+            name='envs',
+            field=worlds.fields.LazyEncryptedTextField(blank=True, help_text='use .env format', null=True),
+        ),
+    ]
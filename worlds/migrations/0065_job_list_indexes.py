@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:59
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the job table is large, build the indexes without locking writes
+    atomic = False
+
+    dependencies = [
+        ('worlds', '0064_lazy_encrypted_fields'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='job',
+            index=models.Index(fields=['-created', '-id'], name='job_created_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='job',
+            index=models.Index(condition=models.Q(('status__in', ['active', 'created', 'submitted', 'downloading'])), fields=['pipeline', 'image'], name='job_running_idx'),
+        ),
+    ]
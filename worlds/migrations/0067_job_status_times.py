@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worlds', '0066_storagedeletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='archived',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='finished',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='started',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
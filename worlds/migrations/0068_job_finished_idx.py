@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:03
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('worlds', '0067_job_status_times'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='job',
+            index=models.Index(fields=['finished'], name='job_finished_idx'),
+        ),
+    ]
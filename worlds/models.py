@@ -1,30 +1,40 @@
 import datetime
+import hashlib
 import io
+import os
 import json
 import time
 import random
+import threading
+from collections import OrderedDict
+from contextlib import closing
 
 from django.conf import settings
 from django.core.cache import caches
-from django.core.files.base import ContentFile
 from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.postgres.fields import ArrayField
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
 from django.utils import timezone
 
-import yaml
 from cloudpathlib import S3Client
 from dotenv import dotenv_values
 from loguru import logger
-from fernet_fields import EncryptedTextField
+from redis.exceptions import RedisError
 
 from kubernetes import client as kube_apis
 from kubernetes import watch as kube_watch
-from kubernetes.client import ApiClient, Configuration
 from kubernetes.client.exceptions import ApiException
-from kubernetes.config.kube_config import _get_kube_config_loader
 
 from warpzone.shelix_api import StarHelixApi
+from warpzone.shelix_log import get_log_writer
+from worlds.fields import LazyEncryptedTextField
+from worlds.logfiles import (
+    CHUNK_SIZE, LogWriter, decompress_blocks, index_block_range, iter_decompressed, iter_file, read_range, slice_lines,
+    tail_lines)
+from worlds.kube import registry as kube_registry
+from worlds import notify
 import worlds.integrations.eks as eks
 
 
@@ -40,16 +50,117 @@ class Cluster(models.Model):
     ctype = models.CharField('Cluster Type', max_length=5, choices=CLUSTER_TYPES)
     active = models.BooleanField(default=True)
 
-    config = EncryptedTextField(help_text='kube config file', blank=True, null=True)
+    config = LazyEncryptedTextField(help_text='kube config file', blank=True, null=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        kube_registry.invalidate(self.id)
+
+    def delete(self, *args, **kwargs):
+        cid = self.id
+        ret = super().delete(*args, **kwargs)
+        kube_registry.invalidate(cid)
+        return ret
+
+    def config_fingerprint(self):
+        ciphertext = self._meta.get_field('config').ciphertext(self)
+        return kube_registry.fingerprint(ciphertext if ciphertext is not None else self.config)
+
     def kube_client(self):
-        client_config = type.__call__(Configuration)
-        loader = _get_kube_config_loader(config_dict=yaml.load(self.config, Loader=yaml.SafeLoader))
-        loader.load_and_set(client_config)
-        return ApiClient(configuration=client_config)
+        return kube_registry.get(self.id, self.config_fingerprint(), lambda: self.config)
+
+    def list_kube_jobs(self, client=None, page_size=500):
+        if client is None:
+            client = self.kube_client()
+
+        batch_v1 = kube_apis.BatchV1Api(client)
+        kwargs = {}
+
+        while 1:
+            response = batch_v1.list_namespaced_job(
+                namespace='default', label_selector=Job.KUBE_LABEL_SELECTOR, limit=page_size, **kwargs)
+            yield from response.items
+
+            if not response.metadata._continue:
+                break
+
+            kwargs['_continue'] = response.metadata._continue
+
+    def reconcile_jobs(self, client=None):
+        kube_jobs = {kjob.metadata.name: kjob for kjob in self.list_kube_jobs(client)}
+        jobs = Job.objects.filter(
+            pipeline__cluster=self,
+            job_name__isnull=False,
+        ).exclude(status__in=Job.STATUS_DONE).only(
+            'id', 'job_name', 'status', 'succeeded', 'failed', 'parallelism', 'pod_watchers', 'started', 'finished')
+
+        now = timezone.now()
+        changed = []
+        finished = []
+        recheck = []
+
+        for job in jobs:
+            kjob = kube_jobs.get(job.job_name)
+            if kjob is None or kjob.status is None:
+                # deleted or unlabelled jobs go through the per job path which handles the 404
+                recheck.append(job.id)
+                continue
+
+            if job.apply_kube_status(kjob.status):
+                job.modified = now
+                changed.append(job)
+
+                if job.status in Job.STATUS_DONE:
+                    finished.append(job.id)
+                    continue
+
+            if (kjob.status.active or 0) > len(job.pod_watchers or []):
+                recheck.append(job.id)
+
+        Job.objects.bulk_update(changed, Job.STATUS_FIELDS, batch_size=500)
+        for job in changed:
+            job.notify()
+
+        logger.info('Reconciled Cluster: {} jobs={} changed={}', self.name, len(kube_jobs), len(changed))
+        return finished, recheck
+
+
+def parse_envs(envs):
+    if not envs:
+        return {}
+
+    return dotenv_values(stream=io.StringIO(envs))
+
+
+class EnvCache:
+    # parsed pipeline envs keyed by a hash of the stored ciphertext, hits skip decrypting as well
+    # as parsing, a saved change is encrypted with a new token so old entries just age out
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, ciphertext, load):
+        key = hashlib.sha256(ciphertext).digest()
+        with self.lock:
+            envs = self.entries.get(key)
+            if envs is not None:
+                self.entries.move_to_end(key)
+                return dict(envs)
+
+        envs = parse_envs(load())
+        with self.lock:
+            self.entries[key] = envs
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return dict(envs)
+
+
+env_cache = EnvCache(settings.ENV_CACHE_SIZE)
 
 
 class Pipeline(models.Model):
@@ -66,7 +177,7 @@ class Pipeline(models.Model):
     post_command = models.CharField(max_length=512, blank=True, null=True)
     workers = models.PositiveSmallIntegerField()
 
-    envs = EncryptedTextField(help_text='use .env format', blank=True, null=True)
+    envs = LazyEncryptedTextField(help_text='use .env format', blank=True, null=True)
 
     force_scaling = models.JSONField(blank=True, null=True)
 
@@ -144,38 +255,40 @@ class Pipeline(models.Model):
         return qjob
 
 
+    def parsed_envs(self):
+        ciphertext = self._meta.get_field('envs').ciphertext(self)
+        if ciphertext is None:
+            return parse_envs(self.envs)
+
+        return env_cache.get(ciphertext, lambda: self.envs)
+
     def env_list(self, local_envs_dict=None, job_envs=None):
         ret = []
         if local_envs_dict:
             for key, value in local_envs_dict.items():
                 ret.append({'name': key, 'value': value})
 
-        if self.envs:
-            stream = io.StringIO(self.envs)
-            for name, value in dotenv_values(stream=stream).items():
-                ret.append({'name': name, 'value': value})
+        for name, value in self.parsed_envs().items():
+            ret.append({'name': name, 'value': value})
 
         if job_envs:
-            stream = io.StringIO(job_envs)
-            for name, value in dotenv_values(stream=stream).items():
+            for name, value in parse_envs(job_envs).items():
                 ret.append({'name': name, 'value': value})
 
         return ret
 
     def s3_storage_args(self):
         ret = {}
-        if self.envs:
-            stream = io.StringIO(self.envs)
-            envs = dotenv_values(stream=stream)
+        envs = self.parsed_envs()
 
-            if 'AWS_ACCESS_KEY_ID' in envs:
-                ret['aws_access_key_id'] = envs['AWS_ACCESS_KEY_ID']
+        if 'AWS_ACCESS_KEY_ID' in envs:
+            ret['aws_access_key_id'] = envs['AWS_ACCESS_KEY_ID']
 
-            if 'AWS_SECRET_ACCESS_KEY' in envs:
-                ret['aws_secret_access_key'] = envs['AWS_SECRET_ACCESS_KEY']
+        if 'AWS_SECRET_ACCESS_KEY' in envs:
+            ret['aws_secret_access_key'] = envs['AWS_SECRET_ACCESS_KEY']
 
-            if 'AWS_S3_ENDPOINT_URL' in envs:
-                ret['endpoint_url'] = envs['AWS_S3_ENDPOINT_URL']
+        if 'AWS_S3_ENDPOINT_URL' in envs:
+            ret['endpoint_url'] = envs['AWS_S3_ENDPOINT_URL']
 
         return ret
 
@@ -211,9 +324,13 @@ class Job(models.Model):
     STATUS_RUNNING = ['active', 'created', 'submitted', 'downloading']
     STATUS_DONE = ['completed', 'killed', 'failed']
 
+    KUBE_LABELS = {'app.kubernetes.io/managed-by': 'warpzone'}
+    KUBE_LABEL_SELECTOR = 'app.kubernetes.io/managed-by=warpzone'
+    STATUS_FIELDS = ['status', 'succeeded', 'failed', 'started', 'finished', 'modified']
+
     command = ArrayField(models.CharField(max_length=255))
     image = models.CharField(max_length=255)
-    envs = EncryptedTextField(help_text='use .env format', blank=True, null=True)
+    envs = LazyEncryptedTextField(help_text='use .env format', blank=True, null=True)
     parallelism = models.PositiveSmallIntegerField(default=1)
 
     succeeded = models.PositiveSmallIntegerField(default=0)
@@ -231,11 +348,27 @@ class Job(models.Model):
     pods = ArrayField(models.CharField(max_length=255), blank=True, null=True)
     pod_watchers = ArrayField(models.CharField(max_length=255), blank=True, null=True)
 
+    manifest_created = models.DateTimeField(blank=True, null=True)
+
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+    archived = models.DateTimeField(blank=True, null=True)
+
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['-created', '-id'], name='job_created_id_idx'),
+            models.Index(fields=['finished'], name='job_finished_idx'),
+            # running job lookups by pipeline and image, only a handful of rows are ever running
+            models.Index(
+                fields=['pipeline', 'image'],
+                name='job_running_idx',
+                condition=models.Q(status__in=['active', 'created', 'submitted', 'downloading']),
+            ),
+        ]
 
     @property
     def name(self):
@@ -247,10 +380,86 @@ class Job(models.Model):
     def __str__(self):
         return self.name
 
+    def save_status(self, *fields):
+        # pods and pod_watchers are only written by claim_pods under a row lock, status saves
+        # name their fields so a stale instance never writes them back
+        self.track_status_times()
+        self.save(update_fields=[*fields, *self.STATUS_FIELDS])
+        self.notify()
+
+    def track_status_times(self):
+        # jobs that finish between two status checks are never seen active, they still get a start time
+        if (self.status == 'active' or self.status in self.STATUS_DONE) and self.started is None:
+            self.started = timezone.now()
+
+        if self.status in self.STATUS_DONE and self.finished is None:
+            self.finished = timezone.now()
+
+    def notify(self):
+        jid = self.id
+
+        def publish():
+            Job.clear_snapshot(jid)
+            notify.publish(notify.job_channel(jid))
+
+        transaction.on_commit(publish)
+
+    @staticmethod
+    def snapshot_key(jid):
+        return f'job-snapshot-{jid}'
+
+    @classmethod
+    def clear_snapshot(cls, jid):
+        # dropped on save and rebuilt by the next reader, saves don't pay for serializing the job
+        try:
+            caches['default'].delete(cls.snapshot_key(jid))
+
+        except RedisError:
+            logger.exception('Job Snapshot Clear Error: {}', jid)
+
+    @classmethod
+    def refresh_snapshot(cls, jid):
+        job = cls.objects.filter(id=jid).select_related('pipeline').defer('envs', 'job_definition').first()
+        data = job.snapshot_data() if job else {}
+        try:
+            caches['default'].set(cls.snapshot_key(jid), data, settings.JOB_SNAPSHOT_TTL)
+
+        except RedisError:
+            logger.exception('Job Snapshot Save Error: {}', jid)
+
+        return data
+
+    @classmethod
+    def snapshot(cls, jid):
+        # serialized job kept in redis, an empty dict when the job does not exist
+        try:
+            data = caches['default'].get(cls.snapshot_key(jid))
+
+        except RedisError:
+            logger.exception('Job Snapshot Read Error: {}', jid)
+            data = None
+
+        if data is None:
+            data = cls.refresh_snapshot(jid)
+
+        return data
+
+    @staticmethod
+    def snapshot_json(data):
+        # the snapshot holds storage names, urls are signed per request so they never outlive the cache entry
+        if not data:
+            return data
+
+        data = dict(data)
+        storage = CompletedLog._meta.get_field('log_file').storage
+        data['log_data'] = {pod: storage.url(name) for pod, name in data.pop('log_files').items() if name}
+        return data
+
     @property
     def downloadable(self):
+        # get_job_storage returns a path whenever a storage url is set, no need to build the client
         if self.status in self.STATUS_DONE:
-            if self.pipeline.get_job_storage():
+            if self.pipeline.s3_storage_url:
                 return True
 
         return False
@@ -271,20 +480,39 @@ class Job(models.Model):
 
         return self.image
 
-    def to_json(self):
+    def snapshot_data(self):
+        # decrypted envs are kept out of the cached snapshot
         return {
             'job_name': self.job_name,
             'id': self.id,
             'status': self.get_status_display(),
             'pipeline': self.pipeline.to_json(),
             'pods': self.pods,
-            'log_data': self.complete_logs,
+            'log_files': self.completed_log_files,
             'modified': self.modified.isoformat(),
             'created': self.created.isoformat(),
             'downloadable': self.downloadable,
-            'envs': self.envs,
+            'shelix_log_id': self.shelix_log_id,
         }
 
+    def list_json(self):
+        return {
+            'job_name': self.job_name,
+            'id': self.id,
+            'status': self.get_status_display(),
+            'pipeline': self.pipeline.to_json(),
+            'image': self.image,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'modified': self.modified.isoformat(),
+            'created': self.created.isoformat(),
+        }
+
+    def to_json(self):
+        data = self.snapshot_json(self.snapshot_data())
+        data['envs'] = self.envs
+        return data
+
     @property
     def cmd(self):
         if self.command:
@@ -293,15 +521,19 @@ class Job(models.Model):
         return ''
 
     @property
-    def complete_logs(self):
+    def completed_log_files(self):
         if self.status in self.STATUS_DONE:
             logs = {}
             for log in CompletedLog.objects.filter(job=self):
+                # a log row can exist before its file is saved
+                if not log.log_file:
+                    continue
+
                 if log.pod is None:
-                    logs['all'] = log.log_file.url
+                    logs['all'] = log.log_file.name
 
                 else:
-                    logs[log.pod] = log.log_file.url
+                    logs[log.pod] = log.log_file.name
 
             return logs
 
@@ -314,7 +546,7 @@ class Job(models.Model):
         if settings.SHELIX_ENABLED and self.pipeline.logging == 'shelix':
             data = StarHelixApi.start_log(self.job_name)
             self.shelix_log_id = str(data['log_id'])
-            self.save()
+            self.save(update_fields=['shelix_log_id', 'modified'])
             local_envs['SHELIX_LOGID'] = self.shelix_log_id
             local_envs['SHELIX_TOKEN'] = settings.SHELIX_TOKEN
             local_envs['SHELIX_PREFIX'] = 'worker'
@@ -383,6 +615,8 @@ class Job(models.Model):
                 # 'completions': self.parallelism,
                 'ttlSecondsAfterFinished': 60 * 60, # cleanup pod after 1 hour
                 'template': {
+                    # job labels default to the template labels, keeping controller-uid on the job
+                    'metadata': {'labels': self.KUBE_LABELS},
                     'spec': self.pod_spec()
                 },
                 'backoffLimit': 4
@@ -395,13 +629,17 @@ class Job(models.Model):
 
         self.job_definition = response.to_dict()
         self.status = 'submitted'
-        self.save()
+        self.save_status('job_definition')
 
         self.update_status(client, wait=wait)
 
     def job_status(self, api):
         response = api.read_namespaced_job_status(name=self.job_name, namespace="default")
-        status = response.status
+        self.apply_kube_status(response.status)
+        return response.status
+
+    def apply_kube_status(self, status):
+        before = (self.status, self.succeeded, self.failed, self.started, self.finished)
 
         logger.info("Job Status: {}: Active={}, Succeeded={}, Failed={}", self.id, status.active, status.succeeded, status.failed)
         if status.active:
@@ -423,31 +661,24 @@ class Job(models.Model):
             if status.conditions:
                 self.status = 'failed'
 
-        return status
+        # kubernetes' own times are exact, the fallbacks in track_status_times are when we noticed
+        if self.started is None and status.start_time:
+            self.started = status.start_time
 
-    def update_status(self, client=None, logs=False, wait=False):
-        from worlds.tasks import watch_log
+        if self.finished is None and status.completion_time and self.status in self.STATUS_DONE:
+            self.finished = status.completion_time
+
+        self.track_status_times()
+        return before != (self.status, self.succeeded, self.failed, self.started, self.finished)
 
+    def update_status(self, client=None, logs=False, wait=False):
         if client is None:
             client = self.pipeline.kube_client()
 
         batch_v1 = kube_apis.BatchV1Api(client)
 
         while 1:
-            if not self.pods:
-                self.pods = []
-
-            for p in self.get_pods(client):
-                if p not in self.pods:
-                    self.pods.append(p)
-
-            if not self.pod_watchers:
-                self.pod_watchers = []
-
-            for p in self.pods:
-                if p not in self.pod_watchers:
-                    watch_log(self.id, p)
-                    self.pod_watchers.append(p)
+            self.claim_pods(self.get_pods(client))
 
             try:
                 stats = self.job_status(batch_v1)
@@ -455,23 +686,17 @@ class Job(models.Model):
             except ApiException as exc:
                 if exc.status == 404:
                     self.status = 'killed'
-                    self.save()
+                    self.save_status()
                     self.save_logs(client)
                     break
 
                 else:
                     raise
 
-            self.save()
+            self.save_status()
 
             if self.status in self.STATUS_DONE:
-                try:
-                    self.save_logs(client)
-
-                except:
-                    pass
-
-                self.fix_logs()
+                self.finish(client)
                 break
 
             if not wait:
@@ -479,16 +704,63 @@ class Job(models.Model):
 
             time.sleep(3)
 
+    def finish(self, client):
+        from worlds.tasks import build_artifact_manifest
+
+        try:
+            self.save_logs(client)
+
+        except:
+            pass
+
+        self.fix_logs()
+
+        if self.pipeline.s3_storage_url:
+            build_artifact_manifest(self.id)
+
+    def artifact_prefix(self, base_path):
+        return f'{base_path.key}/{self.job_name}/'.lstrip('/')
+
+    def list_artifacts(self, base_path):
+        prefix = self.artifact_prefix(base_path)
+        paginator = base_path.client.client.get_paginator('list_objects_v2')
+
+        for page in paginator.paginate(Bucket=base_path.bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                yield JobArtifact(
+                    job=self,
+                    key=obj['Key'],
+                    size=obj['Size'],
+                    etag=obj['ETag'].strip('"'),
+                    last_modified=obj['LastModified'],
+                )
+
+    def build_artifact_manifest(self):
+        base_path = self.pipeline.get_job_storage()
+        if not base_path or not self.job_name:
+            return []
+
+        artifacts = list(self.list_artifacts(base_path))
+        with transaction.atomic():
+            JobArtifact.objects.filter(job=self).delete()
+            JobArtifact.objects.bulk_create(artifacts, batch_size=1000)
+            self.manifest_created = timezone.now()
+            Job.objects.filter(id=self.id).update(manifest_created=self.manifest_created)
+
+        logger.info('Artifact Manifest: {} files={}', self.job_name, len(artifacts))
+        return artifacts
+
     def log(self, text):
         if self.shelix_log_id:
             now = datetime.datetime.now(datetime.timezone.utc)
-            StarHelixApi.save_log(
+            get_log_writer().write(
                 self.shelix_log_id,
                 f'warpzone[server]: {now.isoformat()}: {text}'
             )
 
     def end_logs(self):
         if self.shelix_log_id:
+            get_log_writer().flush(self.shelix_log_id)
             StarHelixApi.end_log(self.shelix_log_id)
 
             from worlds.tasks import end_shelix_log
@@ -501,27 +773,51 @@ class Job(models.Model):
         for p in self.pods:
             log = CompletedLog.objects.filter(job=self, pod=p).first()
             if log and log.log_file:
-                streamed = None
-                with log.log_file.open('r') as fh:
-                    line = fh.readline()
-                    if line.startswith('unable to retrieve container logs for docker://'):
-                        streamlog = StreamLog.objects.filter(job=self, pod=p).first()
-                        if streamlog:
-                            streamed = streamlog.log_file
-
-                if streamed:
-                    with streamed.open('r') as rh:
-                        with log.log_file.open('w') as wh:
-                            while 1:
-                                data = rh.read(1024)
-                                if data:
-                                    wh.write(data)
-
-                                else:
-                                    break
+                with closing(log.iter_content(1024)) as chunks:
+                    first = next(chunks, b'')
+
+                if first.startswith(b'unable to retrieve container logs for docker://'):
+                    streamlog = StreamLog.objects.filter(job=self, pod=p).first()
+                    if streamlog and streamlog.has_content:
+                        log.log_file.delete(save=False)
+                        log.save_content(streamlog.iter_content(), f'{p}.completed.log')
+                        log.save()
+
+    def claim_pods(self, pods):
+        with transaction.atomic():
+            locked = Job.objects.select_for_update().only('pods', 'pod_watchers').get(id=self.id)
+            self.pods = locked.pods or []
+            self.pod_watchers = locked.pod_watchers or []
+
+            for p in pods:
+                if p not in self.pods:
+                    self.pods.append(p)
+
+            new = [p for p in self.pods if p not in self.pod_watchers]
+            if new:
+                self.pod_watchers += new
+                Job.objects.filter(id=self.id).update(
+                    pods=self.pods, pod_watchers=self.pod_watchers, modified=timezone.now())
+                self.notify()
+
+        for p in new:
+            self.start_log_watch(p)
+
+        return new
+
+    def start_log_watch(self, pod):
+        from worlds.tasks import watch_log
 
+        if settings.LOG_COLLECTOR_ENABLED:
+            # the collect_logs process picks up created StreamLogs
+            StreamLog.objects.get_or_create(job=self, pod=pod)
+
+        else:
+            watch_log(self.id, pod)
 
     def get_pods(self, client):
+        from worlds.watchers import get_pods
+
         core_v1 = kube_apis.CoreV1Api(client)
         try:
             uid = self.job_definition['metadata']['labels']["controller-uid"]
@@ -529,6 +825,10 @@ class Job(models.Model):
         except TypeError:
             return []
 
+        pods = get_pods(self.pipeline.cluster, uid)
+        if pods is not None:
+            return pods
+
         pods_list = core_v1.list_namespaced_pod(
             namespace="default", label_selector=f"controller-uid={uid}", timeout_seconds=10)
         logger.info('Pod Count: {}', len(pods_list.items))
@@ -549,21 +849,40 @@ class Job(models.Model):
                 if not log:
                     log = CompletedLog(job=self, pod=slog.pod)
 
-                log.log_file = slog.log_file
+                if slog.has_content:
+                    log.save_content(slog.iter_content(), f'{slog.pod}.completed.log')
+
                 log.save()
 
         else:
+            from worlds.search import LogIndexer
+
             core_v1 = kube_apis.CoreV1Api(client)
             for pod_name in self.get_pods(client):
                 log_response = core_v1.read_namespaced_pod_log(
                     name=pod_name, namespace="default", _return_http_data_only=True, _preload_content=False)
 
-                log = CompletedLog.objects.filter(job=self, pod=pod_name).first()
-                if not log:
-                    log = CompletedLog(job=self, pod=pod_name)
+                try:
+                    log = CompletedLog.objects.filter(job=self, pod=pod_name).first()
+                    if not log:
+                        log = CompletedLog(job=self, pod=pod_name)
+
+                    chunks = log_response.stream(CHUNK_SIZE)
+                    streamed = StreamLogSegment.objects.filter(log__job=self, log__pod=pod_name).exists()
+                    if settings.LOG_SEARCH_ENABLED and not streamed:
+                        # pods that were never streamed are indexed as they are stored
+                        chunks = LogIndexer(self.id, pod_name).feed(chunks)
+
+                    log.save_content(chunks, f'{pod_name}.completed.log')
+                    log.save()
+
+                except BaseException:
+                    # a partly read response can't go back in the pool as is
+                    log_response.close()
+                    raise
 
-                log.log_file.save(f'{pod_name}.completed.log', content=ContentFile(log_response.data), save=False)
-                log.save()
+                finally:
+                    log_response.release_conn()
 
     def kill(self):
         client = self.pipeline.kube_client()
@@ -588,27 +907,33 @@ class Job(models.Model):
                 yield e
 
         except ApiException as exc:
-            msg = exc.body.decode()
-
-            if exc.status == 400:
-                if 'ContainerCreating' in json.loads(msg)['message']:
-                    self.status = 'downloading'
-                    self.save()
-                    self.log('Waiting for container creation\n')
+            if not self.pod_log_error(exc.status, exc.body.decode()):
+                raise
 
-                else:
-                    self.log(f'Error: {msg}\n')
-                    raise
+    def pod_log_error(self, status, msg):
+        if status == 400 and 'ContainerCreating' in json.loads(msg)['message']:
+            self.status = 'downloading'
+            self.save_status()
+            self.log('Waiting for container creation\n')
+            return True
 
-            else:
-                self.log(f'Error: {msg}\n')
-                raise
+        self.log(f'Error: {msg}\n')
+        return False
 
 
 class CompletedLog(models.Model):
+    ENCODINGS = (
+        ('', 'None'),
+        ('gzip', 'gzip'),
+    )
+
     job = models.ForeignKey(Job, on_delete=models.CASCADE)
     pod = models.CharField(max_length=255, blank=True, null=True)
     log_file = models.FileField(upload_to='warpzone/%Y/%m/%d/', blank=True, null=True)
+    encoding = models.CharField(max_length=10, choices=ENCODINGS, blank=True, default='')
+    size = models.PositiveBigIntegerField(blank=True, null=True)
+    lines = models.PositiveIntegerField(blank=True, null=True)
+    line_index = models.JSONField(blank=True, null=True)
     created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -618,6 +943,11 @@ class CompletedLog(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # log_data in the job snapshot changes
+        Job(id=self.job_id).notify()
+
     @property
     def name(self):
         if self.pod is None:
@@ -625,6 +955,88 @@ class CompletedLog(models.Model):
 
         return self.pod
 
+    @property
+    def file_name(self):
+        name = os.path.basename(self.log_file.name)
+        if self.encoding == 'gzip' and name.endswith('.gz'):
+            return name[:-3]
+
+        return name
+
+    def save_content(self, chunks, name):
+        compress = settings.COMPLETED_LOG_COMPRESSION == 'gzip'
+        writer = LogWriter(compress=compress)
+        for data in chunks:
+            writer.write(data)
+
+        content = writer.close()
+        if compress:
+            self.encoding = 'gzip'
+            name = f'{name}.gz'
+
+        else:
+            self.encoding = ''
+
+        self.log_file.save(name, content=content, save=False)
+        self.size = writer.size
+        self.lines = writer.lines
+        self.line_index = writer.index
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        if self.encoding == 'gzip':
+            return iter_decompressed(self.log_file, chunk_size)
+
+        return iter_file(self.log_file, chunk_size)
+
+    def tail_lines(self, count):
+        if not self.line_index or self.lines is None:
+            return tail_lines(self.iter_content(), count)
+
+        start = max(self.lines - count, 0)
+        return start, self.read_lines(start, count)
+
+    def read_lines(self, start, count):
+        if not self.line_index:
+            # logs stored before indexing can only be read from the start
+            return slice_lines(self.iter_content(), start, count)
+
+        every = self.line_index['every']
+        first = start // every
+        last = (start + count - 1) // every
+        if first >= len(self.line_index['offsets']):
+            return []
+
+        data = read_range(self.log_file, *index_block_range(self.line_index, self.size, first, last))
+        if self.encoding == 'gzip':
+            data = decompress_blocks(self.line_index, data)
+
+        lines = data.decode(errors='replace').splitlines(keepends=True)
+        skip = start - first * every
+        return lines[skip:skip + count]
+
+
+class JobArtifact(models.Model):
+    job = models.ForeignKey(Job, on_delete=models.CASCADE)
+    key = models.CharField(max_length=1024)
+    size = models.PositiveBigIntegerField()
+    etag = models.CharField(max_length=255)
+    last_modified = models.DateTimeField()
+
+    class Meta:
+        ordering = ['key']
+        unique_together = [['job', 'key']]
+
+    def __str__(self):
+        return self.key
+
+    def to_json(self):
+        return {
+            'key': self.key,
+            'size': self.size,
+            'etag': self.etag,
+            'last_modified': self.last_modified.isoformat(),
+        }
+
 
 class StreamLog(models.Model):
     STATUS = (
@@ -649,3 +1061,120 @@ class StreamLog(models.Model):
 
     def __str__(self):
         return self.pod
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        notify.publish(notify.log_channel(self.pod))
+
+    def clear_legacy_file(self):
+        if self.log_file:
+            storage = self.log_file.storage
+            name = self.log_file.name
+            self.log_file = None
+
+            # completed logs of killed jobs may point at the same file
+            if not CompletedLog.objects.filter(log_file=name).exists():
+                storage.delete(name)
+
+    @property
+    def has_content(self):
+        return bool(self.log_file) or self.segments.exists()
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        # logs written before segments existed are a single file
+        if self.log_file:
+            yield from iter_file(self.log_file, chunk_size)
+            return
+
+        for segment in self.segments.all():
+            yield from iter_file(segment.log_file, chunk_size)
+
+    def tail_lines(self, count):
+        if self.log_file:
+            return tail_lines(self.iter_content(), count)
+
+        start = max(self.lines - count, 0)
+        return start, self.read_lines(start, count)
+
+    def read_lines(self, start, count):
+        if self.log_file:
+            return slice_lines(self.iter_content(), start, count)
+
+        # segments double as the line index while the pod is running
+        segments = self.segments.filter(
+            start_line__lt=start + count,
+        ).exclude(start_line__lte=start - models.F('lines'))
+
+        ret = []
+        for segment in segments:
+            lines = b''.join(iter_file(segment.log_file)).decode(errors='replace').splitlines(keepends=True)
+            skip = max(start - segment.start_line, 0)
+            ret += lines[skip:skip + count - len(ret)]
+
+        return ret
+
+
+class StreamLogSegment(models.Model):
+    log = models.ForeignKey(StreamLog, on_delete=models.CASCADE, related_name='segments')
+    index = models.PositiveIntegerField()
+    start_line = models.PositiveIntegerField()
+    lines = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    log_file = models.FileField(upload_to='warpzone/%Y/%m/%d/')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['log', 'index']
+        unique_together = [['log', 'index']]
+
+    def __str__(self):
+        return f'{self.log.pod}.{self.index}'
+
+
+class LogChunk(models.Model):
+    # logs are not prose, so no stemming or stop words
+    SEARCH_CONFIG = 'simple'
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE)
+    pod = models.CharField(max_length=255)
+    start_line = models.PositiveIntegerField()
+    lines = models.PositiveIntegerField()
+    text = models.TextField()
+    search = SearchVectorField()
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['job', 'pod', 'start_line']
+        indexes = [
+            GinIndex(fields=['search']),
+            models.Index(fields=['job', 'pod']),
+        ]
+
+    def __str__(self):
+        return f'{self.pod}:{self.start_line}'
+
+    def matches(self, query, limit=5):
+        query = query.lower()
+        ret = []
+        for i, line in enumerate(self.text.split('\n')):
+            if query in line.lower():
+                ret.append({'pod': self.pod, 'line': self.start_line + i, 'text': line})
+                if len(ret) >= limit:
+                    break
+
+        return ret
+
+
+
+class StorageDeletion(models.Model):
+    # files whose rows are already gone, removed from storage by the retention task
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import threading
+import time
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from worlds.logstream import redis_client
+
+PREFIX = 'warpzone-notify'
+
+
+def job_channel(jid):
+    return f'job-{jid}'
+
+
+def log_channel(pod):
+    return f'log-{pod}'
+
+
+def publish(channel, data=None):
+    # best effort, listeners resync on a timer and the database write already happened
+    try:
+        redis_client(write=True).publish(f'{PREFIX}:{channel}', json.dumps(data))
+
+    except RedisError:
+        logger.exception('Notify Publish Error: {}', channel)
+
+
+def wakeup(queue, data):
+    # queues only hold one pending wake up, readers always fetch the latest state
+    try:
+        queue.put_nowait(data)
+
+    except asyncio.QueueFull:
+        pass
+
+
+async def wait(queue, timeout):
+    try:
+        return await asyncio.wait_for(queue.get(), timeout)
+
+    except asyncio.TimeoutError:
+        return None
+
+
+class Listener:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.thread = None
+
+    def subscribe(self, channel):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+
+        with self.lock:
+            self.queues.setdefault(channel, set()).add((loop, queue))
+
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='notify-listener', daemon=True)
+                self.thread.start()
+
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        with self.lock:
+            subscribers = self.queues.get(channel, set())
+            subscribers.difference_update([s for s in subscribers if s[1] is queue])
+            if not subscribers:
+                self.queues.pop(channel, None)
+
+    def dispatch(self, channel, data):
+        with self.lock:
+            subscribers = list(self.queues.get(channel, ()))
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(wakeup, queue, data)
+
+    def run(self):
+        while 1:
+            try:
+                pubsub = redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f'{PREFIX}:*')
+                logger.info('Notify Listener Subscribed')
+
+                for message in pubsub.listen():
+                    if message['type'] != 'pmessage':
+                        continue
+
+                    channel = message['channel'].decode()[len(PREFIX) + 1:]
+                    self.dispatch(channel, json.loads(message['data']))
+
+            except Exception:
+                logger.exception('Notify Listener Error')
+                time.sleep(1)
+
+
+listener = Listener()
@@ -0,0 +1,61 @@
+import base64
+import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(obj):
+    value = f'{obj.created.isoformat()}|{obj.id}'
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created, pk = value.split('|')
+        return datetime.datetime.fromisoformat(created), int(pk)
+
+    except ValueError:
+        return None
+
+
+class KeysetPage:
+    # pages through (created, id) descending without COUNT(*) or OFFSET scans
+    def __init__(self, qs, size=50, after=None, before=None):
+        self.size = size
+        self.next_cursor = None
+        self.prev_cursor = None
+
+        qs = qs.order_by('-created', '-id')
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before else None
+
+        if before:
+            created, pk = before
+            qs = qs.filter(created__gte=created).exclude(Q(created=created) & Q(id__lte=pk))
+            rows = list(qs.reverse()[:size + 1])
+            more = len(rows) > size
+            self.object_list = list(reversed(rows[:size]))
+            if self.object_list:
+                self.next_cursor = encode_cursor(self.object_list[-1])
+                if more:
+                    self.prev_cursor = encode_cursor(self.object_list[0])
+
+        else:
+            if after:
+                created, pk = after
+                qs = qs.filter(created__lte=created).exclude(Q(created=created) & Q(id__gte=pk))
+
+            rows = list(qs[:size + 1])
+            self.object_list = rows[:size]
+            if len(rows) > size:
+                self.next_cursor = encode_cursor(self.object_list[-1])
+
+            if after and self.object_list:
+                self.prev_cursor = encode_cursor(self.object_list[0])
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
@@ -0,0 +1,163 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from loguru import logger
+
+from worlds.archive import archive_jobs
+from worlds.logfiles import storage_key
+from worlds.models import CompletedLog, Job, JobArtifact, LogChunk, StorageDeletion, StreamLog, StreamLogSegment
+
+S3_DELETE_BATCH = 1000
+
+
+def queue_files(qs, sized=True):
+    fields = ['log_file', 'size'] if sized else ['log_file']
+    qs = qs.exclude(log_file='').exclude(log_file__isnull=True)
+    if qs.model is not CompletedLog:
+        # a completed log can keep the file of the stream log it came from, the
+        # file is deleted with the completed log instead
+        qs = qs.filter(~Exists(CompletedLog.objects.filter(log_file=OuterRef('log_file'))))
+
+    rows = qs.values_list(*fields)
+    StorageDeletion.objects.bulk_create([
+        StorageDeletion(name=row[0], size=row[1] if sized else None) for row in rows
+    ])
+
+
+def delete_stream_logs(ids):
+    queue_files(StreamLogSegment.objects.filter(log_id__in=ids))
+    queue_files(StreamLog.objects.filter(id__in=ids), sized=False)
+    StreamLogSegment.objects.filter(log_id__in=ids).delete()
+
+
+def delete_jobs(ids):
+    stream_logs = list(StreamLog.objects.filter(job_id__in=ids).values_list('id', flat=True))
+    delete_stream_logs(stream_logs)
+    StreamLog.objects.filter(id__in=stream_logs).delete()
+
+    queue_files(CompletedLog.objects.filter(job_id__in=ids))
+    CompletedLog.objects.filter(job_id__in=ids).delete()
+    JobArtifact.objects.filter(job_id__in=ids).delete()
+    LogChunk.objects.filter(job_id__in=ids).delete()
+
+
+class RetentionRun:
+    # every batch commits on its own, so a run cut short by the deadline or a crash
+    # loses nothing and the next run picks up where it stopped
+    def __init__(self, batch_size=None, max_seconds=None):
+        self.batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        self.deadline = time.monotonic() + (max_seconds or settings.RETENTION_MAX_SECONDS)
+        self.started = time.monotonic()
+        self.stats = {'stream_logs': 0, 'log_chunks': 0, 'archived': 0, 'jobs': 0, 'files': 0, 'bytes': 0, 'failed_files': 0}
+
+    @property
+    def expired(self):
+        return time.monotonic() > self.deadline
+
+    def delete_batches(self, qs, key, before_delete=None):
+        while not self.expired:
+            ids = list(qs.order_by().values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                break
+
+            with transaction.atomic():
+                if before_delete:
+                    before_delete(ids)
+
+                qs.model.objects.filter(id__in=ids).delete()
+
+            self.stats[key] += len(ids)
+
+    def archive_batches(self, qs):
+        while not self.expired:
+            ids = list(qs.order_by('id').values_list('id', flat=True)[:self.batch_size])
+            if not ids:
+                break
+
+            archive_jobs(ids)
+            self.stats['archived'] += len(ids)
+
+    def purge_storage(self):
+        bucket = getattr(default_storage, 'bucket_name', None)
+        last_id = 0
+
+        while not self.expired:
+            pending = list(StorageDeletion.objects.filter(
+                id__gt=last_id,
+                attempts__lt=settings.RETENTION_MAX_ATTEMPTS,
+            )[:S3_DELETE_BATCH])
+            if not pending:
+                break
+
+            last_id = pending[-1].id
+            if bucket:
+                failed = self.delete_s3(bucket, pending)
+
+            else:
+                failed = self.delete_files(pending)
+
+            done = [p for p in pending if p.name not in failed]
+            StorageDeletion.objects.filter(id__in=[p.id for p in done]).delete()
+            StorageDeletion.objects.filter(id__in=[p.id for p in pending if p.name in failed]).update(
+                attempts=F('attempts') + 1)
+
+            self.stats['files'] += len(done)
+            self.stats['bytes'] += sum(p.size or 0 for p in done)
+            self.stats['failed_files'] += len(pending) - len(done)
+
+    def delete_s3(self, bucket, pending):
+        keys = {storage_key(default_storage, p.name): p.name for p in pending}
+        response = default_storage.connection.meta.client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': k} for k in keys], 'Quiet': True},
+        )
+
+        failed = set()
+        for error in response.get('Errors', []):
+            logger.error('Storage Delete Error: {} {}', error['Key'], error.get('Message'))
+            failed.add(keys.get(error['Key']))
+
+        return failed
+
+    def delete_files(self, pending):
+        failed = set()
+        for p in pending:
+            try:
+                default_storage.delete(p.name)
+
+            except OSError:
+                logger.exception('Storage Delete Error: {}', p.name)
+                failed.add(p.name)
+
+        return failed
+
+    def run(self):
+        now = timezone.now()
+
+        old = now - datetime.timedelta(hours=settings.STREAM_LOG_RETENTION_HOURS)
+        self.delete_batches(StreamLog.objects.filter(modified__lt=old), 'stream_logs', delete_stream_logs)
+
+        old = now - datetime.timedelta(days=settings.LOG_SEARCH_RETENTION_DAYS)
+        self.delete_batches(LogChunk.objects.filter(created__lt=old), 'log_chunks')
+
+        old = now - datetime.timedelta(days=settings.JOB_RETENTION_DAYS)
+        jobs = Job.objects.filter(modified__lt=old)
+        if settings.JOB_ARCHIVE_ENABLED:
+            # jobs are only pruned once they are in the cold archive
+            self.archive_batches(jobs.filter(archived__isnull=True))
+            jobs = jobs.filter(archived__isnull=False)
+
+        self.delete_batches(jobs, 'jobs', delete_jobs)
+
+        self.purge_storage()
+
+        self.stats['seconds'] = round(time.monotonic() - self.started, 1)
+        self.stats['finished'] = not self.expired
+        logger.info('Retention Run: {}', self.stats)
+        return self.stats
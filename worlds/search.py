@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F, Max, TextField, Value, Window
+from django.db.models.functions import RowNumber
+
+from loguru import logger
+
+from worlds.models import Job, LogChunk
+
+
+class LogIndexer:
+    # tsvectors are limited to 1MB and can be about 2.5x the size of the text, so chunks
+    # are cut by size and very long lines are only indexed up to MAX_LINE_BYTES
+    MAX_CHUNK_BYTES = 192 * 1024
+    MAX_LINE_BYTES = 64 * 1024
+
+    def __init__(self, job_id, pod, start_line=0):
+        self.job_id = job_id
+        self.pod = pod
+        self.line = start_line
+        self.lines = []
+        self.size = 0
+        self.partial = b''
+        self.chunks = []
+
+    def reset(self):
+        LogChunk.objects.filter(job_id=self.job_id, pod=self.pod).delete()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()[:self.MAX_LINE_BYTES]
+        for line in lines:
+            self.add_line(line[:self.MAX_LINE_BYTES].decode(errors='replace'))
+
+    def add_line(self, line):
+        self.lines.append(line)
+        self.size += len(line) + 1
+        if len(self.lines) >= settings.LOG_SEARCH_CHUNK_LINES or self.size >= self.MAX_CHUNK_BYTES:
+            self.cut()
+
+    def cut(self):
+        if self.lines:
+            text = '\n'.join(self.lines)
+            self.chunks.append(LogChunk(
+                job_id=self.job_id,
+                pod=self.pod,
+                start_line=self.line,
+                lines=len(self.lines),
+                text=text,
+                search=SearchVector(Value(text, output_field=TextField()), config=LogChunk.SEARCH_CONFIG),
+            ))
+            self.line += len(self.lines)
+
+        self.lines = []
+        self.size = 0
+
+    def flush(self):
+        # search is best effort, a chunk that can't be indexed never fails the log it came from
+        if self.chunks:
+            try:
+                with transaction.atomic():
+                    LogChunk.objects.bulk_create(self.chunks)
+
+            except DatabaseError:
+                logger.exception('Log Index Error: {} {}', self.job_id, self.pod)
+
+        self.chunks = []
+
+    def close(self):
+        if self.partial:
+            self.add_line(self.partial.decode(errors='replace'))
+            self.partial = b''
+
+        self.cut()
+        self.flush()
+
+    def feed(self, chunks):
+        for data in chunks:
+            self.write(data)
+            self.flush()
+            yield data
+
+        self.close()
+
+
+def search_logs(query, pipeline_id=None, since=None, limit=100, chunks_per_job=5):
+    # one result per job, newest match first, with lines from its first few matching chunks
+    qs = LogChunk.objects.filter(search=SearchQuery(query, config=LogChunk.SEARCH_CONFIG, search_type='phrase'))
+
+    if pipeline_id:
+        qs = qs.filter(job__pipeline_id=pipeline_id)
+
+    if since:
+        qs = qs.filter(created__gte=since)
+
+    ranked = list(qs.values('job_id').annotate(last=Max('created'), chunks=Count('id')).order_by('-last')[:limit])
+    ids = [r['job_id'] for r in ranked]
+
+    keep = [
+        pk for pk, rank in qs.filter(job_id__in=ids).annotate(
+            rank=Window(RowNumber(), partition_by=[F('job_id')], order_by=[F('pod').asc(), F('start_line').asc()]),
+        ).values_list('id', 'rank')
+        if rank <= chunks_per_job
+    ]
+
+    chunks = {}
+    for chunk in LogChunk.objects.filter(id__in=keep).order_by('pod', 'start_line'):
+        chunks.setdefault(chunk.job_id, []).append(chunk)
+
+    jobs = Job.objects.filter(id__in=ids).select_related('pipeline').defer('envs', 'job_definition').in_bulk()
+
+    ret = []
+    for row in ranked:
+        job = jobs.get(row['job_id'])
+        if job:
+            ret.append({
+                'job': job.list_json(),
+                'matched_chunks': row['chunks'],
+                'matches': [m for c in chunks.get(job.id, []) for m in c.matches(query)],
+            })
+
+    return ret
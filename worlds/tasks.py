@@ -1,19 +1,22 @@
-import datetime
 import json
 import time
 
-from django.core.cache import caches
-from django.core.files.base import ContentFile
+from django.conf import settings
 from django.utils import timezone
 
-from huey.contrib.djhuey import db_periodic_task, db_task
+from huey.contrib.djhuey import db_periodic_task, db_task, lock_task
 from huey import crontab
 
 from loguru import logger
 from kubernetes.client.exceptions import ApiException
 
-from warpzone.shelix_api import StarHelixApi
-from worlds.models import Job, Pipeline, StreamLog, CompletedLog
+from warpzone.shelix_api import LogNotEnded, StarHelixApi
+from worlds.kube import registry as kube_registry
+import worlds.logstream as logstream
+from worlds.logfiles import iter_file
+from worlds.models import Cluster, Job, StreamLog, StreamLogSegment, CompletedLog
+from worlds.retention import RetentionRun
+from worlds.search import LogIndexer
 
 
 @db_task()
@@ -32,7 +35,7 @@ def update_job_status(jid):
             if exc.status == 400:
                 if 'ContainerCreating' in json.loads(msg)['message']:
                     job.status = 'downloading'
-                    job.save()
+                    job.save_status()
                     job.log('Waiting for container creation\n')
 
                 else:
@@ -46,13 +49,54 @@ def update_job_status(jid):
 
 @db_periodic_task(crontab(minute='*'))
 def init_job_checks_launcher():
+    logger.info('Kube Client Stats: {}', kube_registry.stats())
+
+    if settings.JOB_WATCHER_ENABLED:
+        # status changes arrive from the watch_jobs process, this is only a safety resync
+        if timezone.now().minute % settings.JOB_RESYNC_MINUTES == 0:
+            init_job_checks()
+
+        return
+
     init_job_checks()
     init_job_checks.schedule(delay=20)
     init_job_checks.schedule(delay=40)
 
 
+@db_task()
+def finish_job(jid):
+    job = Job.objects.filter(id=jid).first()
+    if job:
+        job.finish(job.pipeline.kube_client())
+
+
+@db_task(retries=3, retry_delay=30)
+def build_artifact_manifest(jid):
+    job = Job.objects.filter(id=jid).first()
+    if job:
+        job.build_artifact_manifest()
+
+
+@db_task()
+def reconcile_cluster(cid):
+    cluster = Cluster.objects.filter(id=cid).first()
+    if cluster:
+        finished, recheck = cluster.reconcile_jobs()
+        for jid in finished:
+            finish_job(jid)
+
+        for jid in recheck:
+            update_job_status(jid)
+
+
 @db_task()
 def init_job_checks():
+    if settings.JOB_RECONCILE_MODE == 'cluster':
+        for cid in Cluster.objects.filter(active=True).values_list('id', flat=True):
+            reconcile_cluster(cid)
+
+        return
+
     for jid in Job.objects.exclude(status__in=Job.STATUS_DONE).values_list('id', flat=True):
         update_job_status(jid)
 
@@ -61,7 +105,6 @@ def init_job_checks():
 def watch_log(jid, pod):
     time.sleep(5)
     job = Job.objects.filter(id=jid).first()
-    client = caches['default'].get_client('default')
 
     if job:
         if job.status in job.STATUS_DONE:
@@ -72,93 +115,66 @@ def watch_log(jid, pod):
         if not log:
             log = StreamLog(job=job, pod=pod)
 
-        log.lines = 0
-        if not log.log_file:
-            log.log_file.save(f'{pod}.log', content=ContentFile(b''), save=False)
-
-        log.save()
+        writer = logstream.StreamLogWriter(log)
+        writer.start()
+        heartbeat = writer.heartbeat()
 
-        buffer = {}
-        buffer_time = time.time()
-        with log.log_file.open('w') as fh:
+        try:
             for event in job.watch_pod(pod):
-                fh.write(event + '\n')
-                buffer[f'{pod}-{log.lines}'] = event + '\n'
-                log.lines += 1
+                if not writer.write([event]):
+                    writer.finish()
+                    logger.info('Line limit Exiting: {} {}', job, pod)
+                    return
 
-                if len(buffer) > 32 or (time.time() - buffer_time) > 3:
-                    caches['default'].set_many(buffer, 180)
-                    log.save()
+        except:
+            writer.close()
+            raise
 
-                    if log.lines > 500000:
-                        log.status = 'completed'
-                        log.save()
-                        logger.info('Line limit Exiting: {} {}', job, pod)
-                        return
+        finally:
+            heartbeat.set()
 
-                    buffer = {}
-                    buffer_time = time.time()
+        if writer.finish():
+            logger.info('Completed log watch: {} {}', job, pod)
 
-            if buffer:
-                caches['default'].set_many(buffer, 180)
-                log.save()
+        elif writer.retry():
+            watch_log.schedule((job.id, pod), delay=60)
+            logger.info('Retrying log watch: {} {}', job, pod)
 
-            if log.lines:
-                log.status = 'completed'
-                log.save()
-                logger.info('Completed log watch: {} {}', job, pod)
-
-            else:
-                if log.retries < 15:
-                    log.retries += 1
-                    log.save()
-                    watch_log.schedule((job.id, pod), delay=60)
-                    logger.info('Retrying log watch: {} {}', job, pod)
 
+@db_task()
+def index_log_segment(segment_id):
+    segment = StreamLogSegment.objects.filter(id=segment_id).select_related('log').first()
+    if segment:
+        indexer = LogIndexer(segment.log.job_id, segment.log.pod, segment.start_line)
+        for data in iter_file(segment.log_file):
+            indexer.write(data)
 
-                else:
-                    log.status = 'failed'
-                    log.save()
+        indexer.close()
 
 
 @db_task(retries=3, retry_delay=10)
 def end_shelix_log(job_id):
     job = Job.objects.filter(id=job_id).first()
-    content = ''
-    after = None
 
     if job:
-        while 1:
-            text, lastchunk, endlog = StarHelixApi.read_log(job.shelix_log_id, after)
-            if not endlog:
-                end_shelix_log.schedule(delay=10, args=(job_id,))
-                return
+        chunks = StarHelixApi.iter_log(job.shelix_log_id)
+        if settings.LOG_SEARCH_ENABLED:
+            indexer = LogIndexer(job.id, job.job_name)
+            indexer.reset()
+            chunks = indexer.feed(chunks)
 
-            if not text:
-                break
-
-            content += text
-            if lastchunk:
-                after = lastchunk
+        log = CompletedLog(job=job)
+        try:
+            log.save_content(chunks, f'{job.job_name}.completed.log')
 
-            time.sleep(0.1)
+        except LogNotEnded:
+            end_shelix_log.schedule(delay=10, args=(job_id,))
+            return
 
-        content = content.encode()
-        log = CompletedLog(job=job)
-        log.log_file.save(f'{job.job_name}.completed.log', content=ContentFile(content), save=False)
         log.save()
 
 
 @db_periodic_task(crontab(hour='*/4', minute="0"))
+@lock_task('retention-cleanup')
 def cleanup():
-    old = timezone.now() - datetime.timedelta(hours=24)
-    qs = StreamLog.objects.filter(modified__lt=old)
-    cnt = qs.count()
-    qs.delete()
-    logger.info('Deleted StreamLogs: {}', cnt)
-
-    old = timezone.now() - datetime.timedelta(days=7)
-    qs = Job.objects.filter(modified__lt=old)
-    cnt = qs.count()
-    qs.delete()
-    logger.info('Deleted Jobs: {}', cnt)
+    RetentionRun().run()
@@ -0,0 +1,59 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from worlds import analytics
+from worlds.models import Job
+from worlds.tests.utils import make_job, make_pipeline
+
+
+class ComputeTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        pipeline = make_pipeline('etl')
+        other = make_pipeline('other')
+
+        # etl: four timed jobs of 10, 20, 30 and 40 seconds plus a killed job that never started
+        for i, status in enumerate(['completed', 'completed', 'completed', 'failed']):
+            self.add(pipeline, status, seconds=(i + 1) * 10)
+
+        self.add(pipeline, 'killed', seconds=None)
+        self.add(other, 'completed', seconds=60)
+
+        # outside the window and still running, neither is counted
+        self.add(pipeline, 'completed', seconds=5, ago=datetime.timedelta(days=2))
+        make_job(pipeline, status='active')
+
+    def add(self, pipeline, status, seconds, ago=datetime.timedelta(minutes=5)):
+        job = make_job(pipeline, status=status)
+        finished = self.now - ago
+        started = finished - datetime.timedelta(seconds=seconds) if seconds is not None else None
+        Job.objects.filter(id=job.id).update(started=started, finished=finished)
+
+    def test_pipeline_aggregates(self):
+        stats = {row['name']: row for row in analytics.compute('24h')['pipelines']}
+        etl = stats['etl']
+
+        self.assertEqual((etl['jobs'], etl['completed'], etl['failed'], etl['killed']), (5, 3, 1, 1))
+        self.assertEqual(etl['success_rate'], 3 / 5)
+        self.assertAlmostEqual(etl['avg_seconds'], 25)
+        self.assertAlmostEqual(etl['p50_seconds'], 25)
+        self.assertAlmostEqual(etl['p95_seconds'], 38.5)
+        self.assertEqual(stats['other']['jobs'], 1)
+        self.assertAlmostEqual(stats['other']['avg_seconds'], 60)
+
+    def test_untimed_groups_have_no_durations(self):
+        Job.objects.update(started=None)
+        [etl] = [row for row in analytics.compute('24h', 'etl')['pipelines']]
+        self.assertEqual(etl['jobs'], 5)
+        self.assertIsNone(etl['avg_seconds'])
+        self.assertIsNone(etl['p95_seconds'])
+
+    def test_window_and_throughput(self):
+        data = analytics.compute('1h', 'etl')
+        self.assertEqual(sum(row['jobs'] for row in data['pipelines']), 5)
+        self.assertEqual(sum(row['completed'] for row in data['throughput']), 3)
+        self.assertEqual(sum(row['failed'] for row in data['throughput']), 2)
+
+        self.assertEqual(analytics.compute('7d', 'etl')['pipelines'][0]['jobs'], 6)
@@ -0,0 +1,84 @@
+import datetime
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from worlds.archive import archive_jobs, read_jobs
+from worlds.models import CompletedLog, Job
+from worlds.retention import RetentionRun
+from worlds.tests.utils import TempMediaMixin, make_job, make_pipeline
+
+
+@override_settings(JOB_ARCHIVE_PREFIX='archive/jobs')
+class ArchiveTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.etl = make_pipeline('etl')
+        self.other = make_pipeline('other')
+        self.day = timezone.now().replace(hour=12) - datetime.timedelta(days=10)
+
+        self.jobs = []
+        for pipeline, status, days in [(self.etl, 'completed', 0), (self.etl, 'failed', 1), (self.other, 'completed', 0)]:
+            job = make_job(pipeline, job_name=f'{pipeline.slug}-{status}', status=status)
+            created = self.day + datetime.timedelta(days=days)
+            Job.objects.filter(id=job.id).update(
+                created=created, started=created + datetime.timedelta(seconds=30),
+                finished=created + datetime.timedelta(seconds=90), modified=created)
+            self.jobs.append(job)
+
+        CompletedLog.objects.create(job=self.jobs[0], pod='pod-a', log_file='warpzone/a.log', size=10, lines=2)
+
+    def test_round_trip(self):
+        archive_jobs([job.id for job in self.jobs])
+        self.assertEqual(Job.objects.filter(archived__isnull=False).count(), 3)
+
+        rows = {row['job_name']: row for row in read_jobs().to_pylist()}
+        self.assertEqual(set(rows), {'etl-completed', 'etl-failed', 'other-completed'})
+
+        row = rows['etl-completed']
+        self.assertEqual((row['queued_seconds'], row['run_seconds']), (30, 60))
+        self.assertEqual(row['pipeline'], 'etl')
+        self.assertEqual(row['day'], self.day.date().isoformat())
+        self.assertEqual(row['logs'], [{'pod': 'pod-a', 'file': 'warpzone/a.log', 'encoding': '', 'size': 10, 'lines': 2}])
+
+    def test_filters(self):
+        archive_jobs([job.id for job in self.jobs])
+        day = self.day.date()
+
+        def names(**kwargs):
+            return sorted(row['job_name'] for row in read_jobs(columns=['job_name'], **kwargs).to_pylist())
+
+        self.assertEqual(names(pipeline='etl'), ['etl-completed', 'etl-failed'])
+        self.assertEqual(names(status='failed'), ['etl-failed'])
+        self.assertEqual(names(start=(day + datetime.timedelta(days=1)).isoformat()), ['etl-failed'])
+        self.assertEqual(names(end=day.isoformat()), ['etl-completed', 'other-completed'])
+        self.assertEqual(len(read_jobs(limit=2)), 2)
+
+    def test_rearchiving_replaces_files(self):
+        archive_jobs([self.jobs[0].id])
+        archive_jobs([self.jobs[0].id])
+        self.assertEqual(len(read_jobs()), 1)
+
+    def test_rebatching_does_not_duplicate_jobs(self):
+        for i in range(4):
+            job = make_job(self.etl, job_name=f'etl-{i}', status='completed')
+            Job.objects.filter(id=job.id).update(created=self.day)
+            self.jobs.append(job)
+
+        ids = [job.id for job in self.jobs]
+        for size in [2, 3]:
+            for i in range(0, len(ids), size):
+                archive_jobs(ids[i:i + size])
+
+        self.assertEqual(sorted(read_jobs(columns=['id'])['id'].to_pylist()), sorted(ids))
+
+    def test_empty_archive(self):
+        self.assertEqual(len(read_jobs()), 0)
+
+    @override_settings(JOB_ARCHIVE_ENABLED=True, JOB_RETENTION_DAYS=7)
+    def test_retention_archives_before_deleting(self):
+        stats = RetentionRun().run()
+
+        self.assertEqual((stats['archived'], stats['jobs']), (3, 3))
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(len(read_jobs()), 3)
@@ -0,0 +1,110 @@
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from worlds.artifacts import fetch_artifacts
+from worlds.models import JobArtifact
+from worlds.tests.utils import make_job, make_pipeline
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def iter_chunks(self, size):
+        return iter([self.data[i:i + size] for i in range(0, len(self.data), size)])
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+        self.lock = threading.Lock()
+        self.requested = []
+
+    def get_object(self, Bucket, Key):
+        with self.lock:
+            self.requested.append(Key)
+
+        return {'Body': FakeBody(self.objects[Key])}
+
+
+@override_settings(ARTIFACT_PREFETCH_MAX_SIZE=10)
+class FetchArtifactsTests(SimpleTestCase):
+    def artifacts(self, objects):
+        return [SimpleNamespace(key=key, size=len(data)) for key, data in objects.items()]
+
+    def test_order_is_kept_and_big_objects_stream(self):
+        objects = {f'key-{i}': (b'x' * i * 3) for i in range(10)}
+        s3 = FakeS3(objects)
+
+        results = list(fetch_artifacts(s3, 'bucket', self.artifacts(objects), workers=3))
+        self.assertEqual([(a.key, b''.join(chunks)) for a, chunks in results], list(objects.items()))
+
+        # objects up to the prefetch size are read in the pool, bigger ones are left to stream
+        self.assertIsInstance(results[3][1], list)
+        self.assertNotIsInstance(results[4][1], list)
+
+    def test_fetches_run_ahead_a_bounded_amount(self):
+        objects = {f'key-{i}': b'x' for i in range(20)}
+        s3 = FakeS3(objects)
+
+        results = fetch_artifacts(s3, 'bucket', iter(self.artifacts(objects)), workers=2)
+        next(results)
+        self.assertLessEqual(len(s3.requested), 5)
+        results.close()
+
+
+class ArtifactManifestTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('tester', password='x')
+        self.client.force_login(user)
+        self.job = make_job(make_pipeline(s3_storage_url='s3://bucket/jobs'), job_name='job-1', status='completed')
+
+    def test_manifest_is_built_from_listing_pages(self):
+        now = timezone.now()
+        pages = [
+            {'Contents': [{'Key': f'jobs/job-1/{i}.txt', 'Size': i, 'ETag': f'"{i}"', 'LastModified': now} for i in range(3)]},
+            {'Contents': [{'Key': 'jobs/job-1/3.txt', 'Size': 3, 'ETag': '"3"', 'LastModified': now}]},
+            {},
+        ]
+        paginator = mock.Mock(paginate=mock.Mock(return_value=pages))
+        base_path = SimpleNamespace(
+            key='jobs', bucket='bucket',
+            client=SimpleNamespace(client=mock.Mock(get_paginator=mock.Mock(return_value=paginator))),
+        )
+
+        with mock.patch('worlds.models.Pipeline.get_job_storage', return_value=base_path):
+            self.assertEqual(len(self.job.build_artifact_manifest()), 4)
+            self.assertEqual(len(self.job.build_artifact_manifest()), 4)
+
+        paginator.paginate.assert_called_with(Bucket='bucket', Prefix='jobs/job-1/')
+        self.assertEqual(JobArtifact.objects.filter(job=self.job).count(), 4)
+        self.job.refresh_from_db()
+        self.assertIsNotNone(self.job.manifest_created)
+
+    def test_artifact_listing_pages_by_key(self):
+        now = timezone.now()
+        JobArtifact.objects.bulk_create([
+            JobArtifact(job=self.job, key=f'jobs/job-1/{i}.txt', size=i, etag=str(i), last_modified=now)
+            for i in range(5)
+        ])
+        self.job.manifest_created = now
+        self.job.save()
+
+        url = f'/worlds/job/{self.job.id}/artifacts/'
+        first = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual([a['key'] for a in first['artifacts']], [f'jobs/job-1/{i}.txt' for i in range(3)])
+
+        second = self.client.get(url, {'limit': 3, 'after': first['next']}).json()
+        self.assertEqual([a['key'] for a in second['artifacts']], ['jobs/job-1/3.txt', 'jobs/job-1/4.txt'])
+        self.assertIsNone(second['next'])
+
+    def test_listing_needs_a_manifest(self):
+        self.assertEqual(self.client.get(f'/worlds/job/{self.job.id}/artifacts/').status_code, 404)
@@ -0,0 +1,96 @@
+import asyncio
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from worlds import chunkcache
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'chunkcache-tests'}}
+
+
+def in_loop(func):
+    async def call(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return call
+
+
+@override_settings(CACHES=LOCMEM, SHELIX_CHUNK_TTL=2, SHELIX_CHUNK_ENDED_TTL=3600)
+class ReadLogTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.calls = 0
+        self.endlog = False
+
+        patchers = [
+            mock.patch('worlds.chunkcache.in_thread', in_loop),
+            mock.patch('worlds.chunkcache.AsyncStarHelixApi.read_log', side_effect=self.read_upstream),
+            mock.patch('worlds.chunkcache.POLL_INTERVAL', 0.01),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def read_upstream(self, log_id, after):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return f'text-{after}', 'chunk-2', self.endlog
+
+    def test_concurrent_readers_share_one_request(self):
+        async def run():
+            return await asyncio.gather(*[chunkcache.read_log('log', 'chunk-1') for _ in range(10)])
+
+        results = asyncio.run(run())
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(set(results), {('text-chunk-1', 'chunk-2', False)})
+        self.assertEqual(chunkcache.inflight, {})
+        self.assertIsNone(caches['default'].get(chunkcache.chunk_key('log', 'chunk-1') + '-lock'))
+
+    def test_cached_chunk_skips_upstream(self):
+        asyncio.run(chunkcache.read_log('log', 'chunk-1'))
+        asyncio.run(chunkcache.read_log('log', 'chunk-1'))
+        self.assertEqual(self.calls, 1)
+
+    def test_waits_for_another_process_holding_the_lock(self):
+        key = chunkcache.chunk_key('log', 'chunk-1')
+        caches['default'].add(f'{key}-lock', 1, chunkcache.LOCK_TIMEOUT)
+
+        async def run():
+            async def other_process():
+                await asyncio.sleep(0.05)
+                caches['default'].set(key, {'text': 'theirs', 'lastchunk': 'chunk-2', 'endlog': False})
+
+            _, result = await asyncio.gather(other_process(), chunkcache.read_log('log', 'chunk-1'))
+            return result
+
+        self.assertEqual(asyncio.run(run()), ('theirs', 'chunk-2', False))
+        self.assertEqual(self.calls, 0)
+
+    def test_stuck_lock_holder_is_not_waited_on_forever(self):
+        key = chunkcache.chunk_key('log', 'chunk-1')
+        caches['default'].add(f'{key}-lock', 1, 60)
+
+        with mock.patch('worlds.chunkcache.LOCK_TIMEOUT', 0.05):
+            result = asyncio.run(chunkcache.read_log('log', 'chunk-1'))
+
+        self.assertEqual(result, ('text-chunk-1', 'chunk-2', False))
+        self.assertEqual(self.calls, 1)
+
+    def test_ended_chunks_are_kept_longer(self):
+        self.endlog = True
+        with mock.patch.object(caches['default'], 'set', wraps=caches['default'].set) as cache_set:
+            asyncio.run(chunkcache.read_log('log', 'chunk-1'))
+
+        self.assertEqual(cache_set.call_args[0][2], 3600)
+
+    def test_failed_reads_are_not_shared_afterwards(self):
+        async def fail(log_id, after):
+            raise ValueError('upstream')
+
+        with mock.patch('worlds.chunkcache.AsyncStarHelixApi.read_log', side_effect=fail):
+            with self.assertRaises(ValueError):
+                asyncio.run(chunkcache.read_log('log', 'chunk-1'))
+
+        self.assertEqual(chunkcache.inflight, {})
+        self.assertEqual(asyncio.run(chunkcache.read_log('log', 'chunk-1'))[0], 'text-chunk-1')
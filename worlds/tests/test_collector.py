@@ -0,0 +1,107 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import TestCase
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from kubernetes_asyncio.client.exceptions import ApiException
+
+from worlds.collector import LogCollector
+from worlds.logstream import StreamLogWriter
+from worlds.models import StreamLog
+from worlds.tests.utils import make_job, make_pipeline
+
+
+def api_error(status, message):
+    exc = ApiException(status=status)
+    exc.body = json.dumps({'message': message}).encode()
+    return exc
+
+
+def in_test_thread(func):
+    return sync_to_async(func, thread_sensitive=True)
+
+
+@mock.patch('worlds.collector.in_thread', in_test_thread)
+@mock.patch('worlds.collector.close_old_connections', mock.Mock())
+class CollectorRetryTests(TestCase):
+    def setUp(self):
+        job = make_job(make_pipeline(), job_name='job-1', status='active')
+        self.log = StreamLog.objects.create(job=job, pod='collector-test-pod')
+        self.collector = LogCollector(1)
+
+    def stream(self, error):
+        core = mock.Mock()
+        core.read_namespaced_pod_log = mock.AsyncMock(side_effect=error)
+
+        async def kube_client(cluster):
+            return None
+
+        with mock.patch.object(self.collector, 'kube_client', kube_client), \
+                mock.patch('worlds.collector.kube_apis.CoreV1Api', return_value=core), \
+                mock.patch('worlds.models.Job.log'):
+            return async_to_sync(self.collector.stream)(self.log.id)
+
+    def test_pod_errors_count_as_retries(self):
+        self.assertEqual(self.stream(api_error(404, 'pods "collector-test-pod" not found')), LogCollector.ERROR_DELAY)
+
+        log = StreamLog.objects.get(id=self.log.id)
+        self.assertEqual((log.status, log.retries), ('created', 1))
+
+    def test_container_creating_counts_as_retries(self):
+        error = api_error(400, 'container "main" is waiting to start: ContainerCreating')
+        self.assertEqual(self.stream(error), LogCollector.ERROR_DELAY)
+        self.assertEqual(StreamLog.objects.get(id=self.log.id).retries, 1)
+
+    def test_log_fails_once_retries_run_out(self):
+        StreamLog.objects.filter(id=self.log.id).update(retries=StreamLogWriter.MAX_RETRIES)
+
+        self.assertIsNone(self.stream(RuntimeError('connection reset')))
+        self.assertEqual(StreamLog.objects.get(id=self.log.id).status, 'failed')
+
+
+class QuietPodResponse:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.content = self
+
+    async def readany(self):
+        chunk = self.chunks.pop(0)
+        if chunk is None:
+            await asyncio.sleep(10)
+
+        return chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+@mock.patch('worlds.collector.in_thread', in_test_thread)
+@mock.patch('worlds.collector.close_old_connections', mock.Mock())
+class CollectorTickTests(TestCase):
+    def test_quiet_pod_ticks_the_writer(self):
+        job = make_job(make_pipeline(), job_name='job-1', status='active')
+        log = StreamLog.objects.create(job=job, pod='collector-tick-pod')
+        collector = LogCollector(1)
+
+        core = mock.Mock()
+        core.read_namespaced_pod_log = mock.AsyncMock(return_value=QuietPodResponse([b'one\ntw', None, b'o', b'']))
+
+        async def kube_client(cluster):
+            return None
+
+        with mock.patch.object(collector, 'kube_client', kube_client), \
+                mock.patch('worlds.collector.kube_apis.CoreV1Api', return_value=core), \
+                mock.patch.object(StreamLogWriter, 'TICK_SECONDS', 0.01), \
+                mock.patch.object(StreamLogWriter, 'tick', autospec=True) as tick, \
+                mock.patch.object(StreamLogWriter, 'finish', autospec=True, return_value=True):
+            self.assertIsNone(async_to_sync(collector.stream)(log.id))
+
+        # once for the timeout and once for each write
+        self.assertEqual(tick.call_count, 3)
+        self.assertEqual(collector.lines, 2)
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from worlds.models import EnvCache, Pipeline
+from worlds.tests.utils import make_pipeline
+
+
+class EnvCacheTests(TestCase):
+    def setUp(self):
+        make_pipeline(envs='A=1\nAWS_ACCESS_KEY_ID=key\n')
+        self.cache = EnvCache(2)
+        patcher = mock.patch('worlds.models.env_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hits_skip_decrypting(self):
+        self.assertEqual(Pipeline.objects.get().parsed_envs(), {'A': '1', 'AWS_ACCESS_KEY_ID': 'key'})
+
+        pipeline = Pipeline.objects.get()
+        field = Pipeline._meta.get_field('envs')
+        with mock.patch.object(field, 'decrypt') as decrypt:
+            self.assertEqual(pipeline.s3_storage_args(), {'aws_access_key_id': 'key'})
+
+        decrypt.assert_not_called()
+        self.assertEqual(len(self.cache.entries), 1)
+
+    def test_saved_change_is_not_served_stale(self):
+        pipeline = Pipeline.objects.get()
+        pipeline.parsed_envs()
+
+        pipeline.envs = 'A=2\n'
+        self.assertEqual(pipeline.parsed_envs(), {'A': '2'})
+        pipeline.save()
+
+        self.assertEqual(Pipeline.objects.get().parsed_envs(), {'A': '2'})
+        self.assertEqual(len(self.cache.entries), 2)
+
+    def test_cache_is_bounded(self):
+        pipeline = Pipeline.objects.get()
+        for i in range(4):
+            pipeline.envs = f'A={i}\n'
+            pipeline.save()
+            self.assertEqual(Pipeline.objects.get().parsed_envs(), {'A': str(i)})
+
+        self.assertEqual(len(self.cache.entries), 2)
+
+    def test_cached_values_are_copied(self):
+        Pipeline.objects.get().parsed_envs()['A'] = 'changed'
+        self.assertEqual(Pipeline.objects.get().parsed_envs()['A'], '1')
+
+    def test_empty_envs(self):
+        pipeline = Pipeline.objects.get()
+        pipeline.envs = None
+        pipeline.save()
+        self.assertEqual(Pipeline.objects.get().env_list(), [])
@@ -0,0 +1,87 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from worlds.hub import END, OVERFLOW, Hub
+
+
+class HubTests(SimpleTestCase):
+    def test_viewers_share_one_reader(self):
+        started = []
+
+        async def reader(topic):
+            started.append(topic.key)
+            topic.publish('line', position='1-0')
+            await asyncio.Event().wait()
+
+        async def run():
+            hub = Hub(queue_size=8)
+            first = hub.subscribe('pod', reader)
+            second = hub.subscribe('pod', reader)
+            messages = [await first.get(), await second.get()]
+
+            late = hub.subscribe('pod', reader)
+            hub.unsubscribe(first)
+            hub.unsubscribe(second)
+            self.assertIn('pod', hub.topics)
+
+            hub.unsubscribe(late)
+            self.assertEqual(hub.topics, {})
+            return messages, late.position
+
+        messages, position = asyncio.run(run())
+        self.assertEqual(started, ['pod'])
+        self.assertEqual(messages, ['line', 'line'])
+        # a late subscriber knows where the shared reader is, so it can catch up from the source
+        self.assertEqual(position, '1-0')
+
+    def test_slow_subscriber_overflows(self):
+        async def reader(topic):
+            for i in range(5):
+                topic.publish(i)
+
+            await asyncio.Event().wait()
+
+        async def run():
+            hub = Hub(queue_size=2)
+            sub = hub.subscribe('pod', reader)
+            await asyncio.sleep(0)
+            message = await sub.get()
+            hub.unsubscribe(sub)
+            return message, sub.queue.empty()
+
+        self.assertEqual(asyncio.run(run()), (OVERFLOW, True))
+
+    def test_reader_ending_ends_subscribers_and_restarts(self):
+        runs = []
+
+        async def reader(topic):
+            runs.append(1)
+            raise RuntimeError('reader failed')
+
+        async def run():
+            hub = Hub()
+            sub = hub.subscribe('pod', reader)
+            self.assertIs(await sub.get(), END)
+            self.assertNotIn('pod', hub.topics)
+
+            again = hub.subscribe('pod', reader)
+            self.assertIs(await again.get(), END)
+
+        asyncio.run(run())
+        self.assertEqual(len(runs), 2)
+
+    def test_stats(self):
+        async def reader(topic):
+            await asyncio.Event().wait()
+
+        async def run():
+            hub = Hub()
+            subs = [hub.subscribe('a', reader), hub.subscribe('a', reader), hub.subscribe('b', reader)]
+            stats = hub.stats()
+            for sub in subs:
+                hub.unsubscribe(sub)
+
+            return stats
+
+        self.assertEqual(asyncio.run(run()), {'topics': 2, 'subscribers': 3})
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from worlds.fields import Ciphertext
+from worlds.kube import ClientRegistry
+from worlds.models import Cluster
+
+
+class ClientRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = ClientRegistry(max_size=2, max_age=60)
+        patcher = mock.patch.object(ClientRegistry, 'build', side_effect=lambda config: mock.Mock())
+        self.build = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 1000.0
+        clock = mock.patch('worlds.kube.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_hit_does_not_load_config(self):
+        load = mock.Mock(return_value='config')
+        first = self.registry.get(1, 'abc', load)
+        second = self.registry.get(1, 'abc', load)
+
+        self.assertIs(first, second)
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(self.registry.stats()['hits'], 1)
+
+    def test_expired_client_is_rebuilt_and_closed(self):
+        first = self.registry.get(1, 'abc', lambda: 'config')
+        self.now += 61
+        second = self.registry.get(1, 'abc', lambda: 'config')
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+        first.rest_client.pool_manager.clear.assert_called_once()
+        self.assertEqual(self.registry.stats()['expirations'], 1)
+
+    def test_evicted_client_is_closed(self):
+        first = self.registry.get(1, 'a', lambda: 'config')
+        self.registry.get(2, 'b', lambda: 'config')
+        self.registry.get(3, 'c', lambda: 'config')
+
+        first.close.assert_called_once()
+        self.assertEqual(self.registry.stats()['evictions'], 1)
+
+    def test_invalidate_closes_cluster_clients(self):
+        first = self.registry.get(1, 'a', lambda: 'config')
+        other = self.registry.get(2, 'b', lambda: 'config')
+        self.registry.invalidate(1)
+
+        first.close.assert_called_once()
+        other.close.assert_not_called()
+        self.assertEqual(self.registry.stats()['size'], 1)
+
+
+class ClusterFingerprintTests(TestCase):
+    def test_fingerprint_does_not_decrypt(self):
+        cluster = Cluster.objects.create(name='c', slug='c', external_id='c', ctype='do', config='apiVersion: v1')
+        cluster = Cluster.objects.get(id=cluster.id)
+
+        fingerprint = cluster.config_fingerprint()
+        self.assertIsInstance(cluster.__dict__['config'], Ciphertext)
+
+        # reading the config keeps the fingerprint stable
+        self.assertEqual(cluster.config, 'apiVersion: v1')
+        self.assertEqual(cluster.config_fingerprint(), fingerprint)
+
+    def test_fingerprint_changes_with_config(self):
+        cluster = Cluster.objects.create(name='c', slug='c', external_id='c', ctype='do', config='one')
+        before = Cluster.objects.get(id=cluster.id).config_fingerprint()
+
+        cluster.config = 'two'
+        cluster.save()
+        self.assertNotEqual(Cluster.objects.get(id=cluster.id).config_fingerprint(), before)
@@ -0,0 +1,153 @@
+import gzip
+import zlib
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from worlds.logfiles import LogWriter, iter_decompressed, slice_lines, tail_lines
+from worlds.models import CompletedLog
+from worlds.tests.utils import TempMediaMixin, make_job, make_pipeline
+
+
+class LogWriterTests(SimpleTestCase):
+    def test_gzip_blocks_are_indexed(self):
+        writer = LogWriter(compress=True, every=2)
+        writer.write(b'one\ntwo\nthr')
+        writer.write('ee\nfour\nfive')
+        content = writer.close()
+
+        self.assertEqual(writer.lines, 5)
+        self.assertEqual(writer.raw_size, len(b'one\ntwo\nthree\nfour\nfive'))
+        self.assertEqual(len(writer.index['offsets']), 3)
+        self.assertEqual(writer.index['offsets'][0], 10)
+        self.assertEqual(len(content.read()), writer.size)
+
+    def test_gzip_log_is_one_member(self):
+        writer = LogWriter(compress=True, every=2)
+        writer.write(b''.join(b'line %d\n' % i for i in range(7)))
+        data = writer.close().read()
+
+        # decoded the way HTTP clients decode Content-Encoding: gzip, which stop after the first member
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decoder.decompress(data), b''.join(b'line %d\n' % i for i in range(7)))
+        self.assertTrue(decoder.eof)
+        self.assertEqual(decoder.unused_data, b'')
+
+        # every block inflates on its own from its offset
+        offsets = writer.index['offsets']
+        block = zlib.decompressobj(-zlib.MAX_WBITS).decompress(data[offsets[2]:offsets[3]])
+        self.assertEqual(block, b'line 4\nline 5\n')
+
+
+class CompletedLogStorageTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = make_job(make_pipeline(), job_name='job-1', status='completed')
+
+    def test_round_trip(self):
+        log = CompletedLog(job=self.job, pod='pod-a')
+        with self.settings(COMPLETED_LOG_COMPRESSION='gzip'):
+            log.save_content([b'hello\n', b'world\n'], 'pod-a.completed.log')
+        log.save()
+
+        log = CompletedLog.objects.get(id=log.id)
+        self.assertEqual(log.encoding, 'gzip')
+        self.assertEqual(b''.join(iter_decompressed(log.log_file)), b'hello\nworld\n')
+        self.assertEqual(b''.join(log.iter_content()), b'hello\nworld\n')
+
+    def test_fix_logs_closes_the_log_file(self):
+        log = CompletedLog(job=self.job, pod='pod-a')
+        log.save_content([b'hello\n'], 'pod-a.completed.log')
+        log.save()
+        self.job.pods = ['pod-a']
+
+        opened = []
+        iter_content = CompletedLog.iter_content
+
+        def track(log, chunk_size):
+            opened.append(iter_content(log, chunk_size))
+            return opened[-1]
+
+        with mock.patch.object(CompletedLog, 'iter_content', autospec=True, side_effect=track):
+            self.job.fix_logs()
+
+        self.assertIsNone(opened[0].gi_frame)
+
+    def test_failed_pod_log_read_releases_connection(self):
+        response = mock.Mock()
+        response.stream.side_effect = IOError('reset')
+        core = mock.Mock()
+        core.read_namespaced_pod_log.return_value = response
+
+        with mock.patch('worlds.models.kube_apis.CoreV1Api', return_value=core), \
+                mock.patch.object(self.job, 'get_pods', return_value=['pod-a']):
+            with self.assertRaises(IOError):
+                self.job.save_logs(None)
+
+        response.close.assert_called_once()
+        response.release_conn.assert_called_once()
+
+
+class LineReaderTests(SimpleTestCase):
+    chunks = [b'l0\nl', b'1\nl2\n', b'l3\nl4']
+
+    def test_slice_lines_across_chunks(self):
+        self.assertEqual(slice_lines(self.chunks, 1, 3), ['l1\n', 'l2\n', 'l3\n'])
+        self.assertEqual(slice_lines(self.chunks, 4, 10), ['l4'])
+        self.assertEqual(slice_lines(self.chunks, 9, 10), [])
+
+    def test_tail_lines(self):
+        self.assertEqual(tail_lines(self.chunks, 2), (3, ['l3\n', 'l4']))
+        self.assertEqual(tail_lines(self.chunks, 10), (0, ['l0\n', 'l1\n', 'l2\n', 'l3\n', 'l4']))
+
+    def test_only_requested_lines_are_kept(self):
+        def chunks():
+            for i in range(100000):
+                yield b'%d\n' % i
+
+        self.assertEqual(tail_lines(chunks(), 1), (99999, ['99999\n']))
+
+
+class CompletedLogLineTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = make_job(make_pipeline(), job_name='job-1', status='completed')
+        self.text = [b'line %d\n' % i for i in range(25)]
+
+    def make_log(self, compression, indexed=True):
+        CompletedLog.objects.filter(job=self.job).delete()
+        log = CompletedLog(job=self.job, pod='pod-a')
+        with self.settings(COMPLETED_LOG_COMPRESSION=compression, LOG_INDEX_EVERY=10):
+            log.save_content(self.text, 'pod-a.completed.log')
+
+        if not indexed:
+            log.line_index = None
+            log.lines = None
+
+        log.save()
+        return CompletedLog.objects.get(id=log.id)
+
+    def test_indexed_ranges(self):
+        for compression in ['gzip', '']:
+            with self.subTest(compression=compression):
+                log = self.make_log(compression)
+                self.assertEqual(log.read_lines(8, 4), ['line 8\n', 'line 9\n', 'line 10\n', 'line 11\n'])
+                self.assertEqual(log.read_lines(24, 5), ['line 24\n'])
+                self.assertEqual(log.read_lines(30, 5), [])
+                self.assertEqual(log.tail_lines(2), (23, ['line 23\n', 'line 24\n']))
+
+    def test_logs_with_a_member_per_block_are_read(self):
+        log = self.make_log('gzip')
+        members = [gzip.compress(b''.join(self.text[i:i + 10])) for i in range(0, 25, 10)]
+        with open(log.log_file.path, 'wb') as fh:
+            fh.write(b''.join(members))
+
+        log.size = sum(map(len, members))
+        log.line_index = {'every': 10, 'offsets': [0, len(members[0]), len(members[0]) + len(members[1])]}
+        self.assertEqual(log.read_lines(8, 4), ['line 8\n', 'line 9\n', 'line 10\n', 'line 11\n'])
+        self.assertEqual(log.tail_lines(2), (23, ['line 23\n', 'line 24\n']))
+
+    def test_unindexed_logs_are_streamed(self):
+        log = self.make_log('gzip', indexed=False)
+        self.assertEqual(log.read_lines(3, 2), ['line 3\n', 'line 4\n'])
+        self.assertEqual(log.tail_lines(2), (23, ['line 23\n', 'line 24\n']))
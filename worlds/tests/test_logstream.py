@@ -0,0 +1,111 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase
+
+from worlds import logstream
+from worlds.logstream import StreamLogWriter
+from worlds.models import CompletedLog, StreamLog
+from worlds.tests.utils import TempMediaMixin, make_job, make_pipeline
+
+
+class StreamLogWriterTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = make_job(make_pipeline(), job_name='job-1', status='active')
+        self.log = StreamLog.objects.create(job=self.job, pod='stream-test-pod')
+
+    def test_tick_flushes_an_aged_segment_without_new_lines(self):
+        writer = StreamLogWriter(self.log)
+        writer.start()
+        writer.write(['one', 'two'])
+        self.assertFalse(self.log.segments.exists())
+
+        writer.segment_time -= 3600
+        writer.tick()
+
+        segment = self.log.segments.get()
+        self.assertEqual((segment.start_line, segment.lines), (0, 2))
+        self.assertEqual(b''.join(self.log.iter_content()), b'one\ntwo\n')
+
+    def test_retry_clears_a_legacy_file(self):
+        self.log.log_file.save('legacy.log', ContentFile(b'old\n'))
+        storage, name = self.log.log_file.storage, self.log.log_file.name
+
+        writer = StreamLogWriter(self.log)
+        writer.start()
+        writer.write(['new'])
+        writer.finish()
+
+        log = StreamLog.objects.get(id=self.log.id)
+        self.assertFalse(log.log_file)
+        self.assertFalse(storage.exists(name))
+        self.assertEqual(b''.join(log.iter_content()), b'new\n')
+
+    def test_retry_keeps_a_legacy_file_used_by_a_completed_log(self):
+        self.log.log_file.save('legacy.log', ContentFile(b'old\n'))
+        CompletedLog.objects.create(job=self.job, pod=self.log.pod, log_file=self.log.log_file.name)
+        storage, name = self.log.log_file.storage, self.log.log_file.name
+
+        StreamLogWriter(self.log).start()
+
+        self.assertFalse(StreamLog.objects.get(id=self.log.id).log_file)
+        self.assertTrue(storage.exists(name))
+
+
+class HeartbeatTests(SimpleTestCase):
+    def test_heartbeat_ticks_until_stopped(self):
+        writer = StreamLogWriter(mock.Mock(pod='pod-a'))
+        ticked = threading.Event()
+
+        with mock.patch.object(StreamLogWriter, 'TICK_SECONDS', 0.01), \
+                mock.patch.object(writer, 'tick', side_effect=ticked.set):
+            stop = writer.heartbeat()
+            self.assertTrue(ticked.wait(1))
+            stop.set()
+            time.sleep(0.05)
+            calls = writer.tick.call_count
+            time.sleep(0.05)
+            self.assertEqual(writer.tick.call_count, calls)
+
+
+class StreamTransportTests(SimpleTestCase):
+    pod = 'logstream-transport-test'
+
+    def setUp(self):
+        logstream.redis_client(write=True).delete(logstream.stream_key(self.pod))
+        self.addCleanup(logstream.redis_client(write=True).delete, logstream.stream_key(self.pod))
+
+    def test_batches_are_read_in_order(self):
+        first = logstream.append(self.pod, ['a\n', 'b\n'])
+        second = logstream.append(self.pod, ['c\n'])
+
+        self.assertEqual(logstream.read(self.pod), (second, 'a\nb\nc\n'))
+        self.assertEqual(logstream.read(self.pod, first), (second, 'c\n'))
+        self.assertEqual(logstream.read(self.pod, second), (second, ''))
+
+    def test_read_stops_at_until(self):
+        first = logstream.append(self.pod, ['a\n'])
+        logstream.append(self.pod, ['b\n'])
+        self.assertEqual(logstream.read(self.pod, until=first), (first, 'a\n'))
+
+    def test_read_pages_by_count(self):
+        ids = [logstream.append(self.pod, [f'{i}\n']) for i in range(3)]
+        self.assertEqual(logstream.read(self.pod, count=2), (ids[1], '0\n1\n'))
+
+    def test_empty_appends_are_skipped(self):
+        self.assertIsNone(logstream.append(self.pod, []))
+        self.assertEqual(logstream.read(self.pod), ('0-0', ''))
+
+    def test_streams_expire(self):
+        with self.settings(LOG_STREAM_TTL=60):
+            logstream.append(self.pod, ['a\n'])
+
+        ttl = logstream.redis_client().ttl(logstream.stream_key(self.pod))
+        self.assertTrue(0 < ttl <= 60)
+
+    def test_ids_compare_numerically(self):
+        self.assertLess(logstream.parse_id('9-0'), logstream.parse_id('10-0'))
+        self.assertLess(logstream.parse_id('10-2'), logstream.parse_id('10-10'))
@@ -0,0 +1,55 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from redis.exceptions import ConnectionError
+
+from worlds import notify
+from worlds.logstream import StreamLogWriter
+from worlds.models import StreamLog
+from worlds.tests.utils import make_job, make_pipeline
+
+
+class PublishTests(SimpleTestCase):
+    def test_redis_errors_are_logged(self):
+        client = mock.Mock()
+        client.publish.side_effect = ConnectionError('down')
+
+        with mock.patch('worlds.notify.redis_client', return_value=client):
+            notify.publish(notify.job_channel(1))
+
+        client.publish.assert_called_once()
+
+
+class ListenerTests(SimpleTestCase):
+    def test_dispatch_keeps_one_pending_wakeup(self):
+        async def run():
+            listener = notify.Listener()
+            listener.thread = mock.Mock(is_alive=lambda: True)
+            queue = listener.subscribe('job-1')
+
+            listener.dispatch('job-1', 1)
+            listener.dispatch('job-1', 2)
+            listener.dispatch('job-2', 3)
+            await asyncio.sleep(0)
+
+            first = await notify.wait(queue, 0.1)
+            second = await notify.wait(queue, 0.01)
+            listener.unsubscribe('job-1', queue)
+            return first, second, listener.queues
+
+        self.assertEqual(asyncio.run(run()), (1, None, {}))
+
+
+class StreamLogNotifyTests(TestCase):
+    def test_flush_notifies_once(self):
+        job = make_job(make_pipeline())
+        log = StreamLog.objects.create(job=job, pod='notify-test-pod')
+        writer = StreamLogWriter(log)
+
+        with mock.patch('worlds.models.notify.publish') as publish:
+            writer.write(['one', 'two'])
+            writer.flush()
+
+        publish.assert_called_once_with(notify.log_channel('notify-test-pod'))
@@ -0,0 +1,63 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from worlds.models import Job
+from worlds.pagination import KeysetPage, decode_cursor, encode_cursor
+from worlds.tests.utils import make_job, make_pipeline
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        pipeline = make_pipeline()
+        now = timezone.now()
+        # three jobs share each timestamp so page edges fall inside a tie
+        for i in range(9):
+            job = make_job(pipeline, job_name=f'job-{i}')
+            Job.objects.filter(id=job.id).update(created=now - datetime.timedelta(seconds=i // 3))
+
+        self.expected = list(Job.objects.order_by('-created', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [job.id for job in page]
+
+    def test_walks_forward_and_back_through_ties(self):
+        pages = []
+        page = KeysetPage(Job.objects.all(), 2)
+        self.assertIsNone(page.prev_cursor)
+        while 1:
+            pages.append(self.ids(page))
+            if not page.next_cursor:
+                break
+
+            page = KeysetPage(Job.objects.all(), 2, after=page.next_cursor)
+
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual(pages[-1], self.expected[8:])
+
+        back = []
+        while page.prev_cursor:
+            page = KeysetPage(Job.objects.all(), 2, before=page.prev_cursor)
+            back.insert(0, self.ids(page))
+
+        self.assertEqual(back, pages[:-1])
+        self.assertIsNone(page.prev_cursor)
+
+    def test_exact_page_has_no_next(self):
+        page = KeysetPage(Job.objects.all(), 9)
+        self.assertEqual(self.ids(page), self.expected)
+        self.assertIsNone(page.next_cursor)
+
+    def test_before_the_first_row_is_empty(self):
+        first = Job.objects.get(id=self.expected[0])
+        page = KeysetPage(Job.objects.all(), 2, before=encode_cursor(first))
+        self.assertEqual(len(page), 0)
+        self.assertIsNone(page.next_cursor)
+        self.assertIsNone(page.prev_cursor)
+
+    def test_bad_cursors_start_from_the_top(self):
+        for cursor in ['!!!', 'bm90IGEgY3Vyc29y']:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                self.assertEqual(self.ids(KeysetPage(Job.objects.all(), 3, after=cursor)), self.expected[:3])
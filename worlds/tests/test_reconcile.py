@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from kubernetes.client.models import V1JobStatus
+
+from worlds.models import Job
+from worlds.tests.utils import make_job, make_pipeline
+
+
+def kube_job(name, **status):
+    return SimpleNamespace(metadata=SimpleNamespace(name=name), status=V1JobStatus(**status))
+
+
+class ReconcileJobsTests(TestCase):
+    def setUp(self):
+        self.pipeline = make_pipeline()
+        self.cluster = self.pipeline.cluster
+
+    def reconcile(self, kube_jobs):
+        with mock.patch.object(type(self.cluster), 'list_kube_jobs', return_value=kube_jobs), \
+                self.captureOnCommitCallbacks(execute=True):
+            return self.cluster.reconcile_jobs(client=object())
+
+    def test_statuses_are_applied_in_bulk(self):
+        done = make_job(self.pipeline, job_name='done', status='active', parallelism=1)
+        running = make_job(self.pipeline, job_name='running', status='submitted', parallelism=1, pod_watchers=['pod-a'])
+        same = make_job(self.pipeline, job_name='same', status='active', parallelism=1, pod_watchers=['pod-b'])
+        Job.objects.filter(id=same.id).update(started=same.created)
+
+        with CaptureQueriesContext(connection) as queries:
+            finished, recheck = self.reconcile([
+                kube_job('done', succeeded=1),
+                kube_job('running', active=1),
+                kube_job('same', active=1),
+            ])
+
+        # one select and one batched update, however many jobs changed
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(finished, [done.id])
+        self.assertEqual(recheck, [])
+        self.assertEqual(Job.objects.get(id=done.id).status, 'completed')
+        self.assertEqual(Job.objects.get(id=running.id).status, 'active')
+        self.assertIsNotNone(Job.objects.get(id=running.id).started)
+
+    def test_missing_and_unwatched_jobs_are_rechecked(self):
+        missing = make_job(self.pipeline, job_name='missing', status='active')
+        unwatched = make_job(self.pipeline, job_name='unwatched', status='active', parallelism=2)
+
+        finished, recheck = self.reconcile([kube_job('unwatched', active=2)])
+        self.assertEqual(finished, [])
+        self.assertEqual(sorted(recheck), sorted([missing.id, unwatched.id]))
+
+    def test_done_and_other_cluster_jobs_are_skipped(self):
+        make_job(self.pipeline, job_name='old', status='completed')
+        make_job(make_pipeline('other'), job_name='elsewhere', status='active')
+
+        finished, recheck = self.reconcile([kube_job('old', failed=1), kube_job('elsewhere', succeeded=1)])
+        self.assertEqual((finished, recheck), ([], []))
+        self.assertEqual(Job.objects.get(job_name='old').status, 'completed')
+        self.assertEqual(Job.objects.get(job_name='elsewhere').status, 'active')
@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from worlds.logfiles import storage_key
+from worlds.models import CompletedLog, StorageDeletion, StreamLog, StreamLogSegment
+from worlds.retention import delete_jobs, delete_stream_logs
+from worlds.tests.utils import make_job, make_pipeline
+
+
+class QueueFilesTests(TestCase):
+    def setUp(self):
+        self.job = make_job(make_pipeline(), status='completed')
+        self.log = StreamLog.objects.create(job=self.job, pod='pod-a', log_file='warpzone/shared.log')
+        StreamLogSegment.objects.create(
+            log=self.log, index=0, start_line=0, lines=1, size=5, log_file='warpzone/segment.log')
+        CompletedLog.objects.create(job=self.job, pod='pod-a', log_file='warpzone/shared.log', size=5)
+
+    def queued(self):
+        return sorted(StorageDeletion.objects.values_list('name', flat=True))
+
+    def test_files_kept_by_a_completed_log_are_not_queued(self):
+        delete_stream_logs([self.log.id])
+        self.assertEqual(self.queued(), ['warpzone/segment.log'])
+
+    def test_job_deletion_queues_shared_files_once(self):
+        delete_jobs([self.job.id])
+        self.assertEqual(self.queued(), ['warpzone/segment.log', 'warpzone/shared.log'])
+
+    def test_null_completed_log_files_do_not_block_deletion(self):
+        CompletedLog.objects.update(log_file=None)
+        delete_stream_logs([self.log.id])
+        self.assertEqual(self.queued(), ['warpzone/segment.log', 'warpzone/shared.log'])
+
+
+class StorageKeyTests(SimpleTestCase):
+    def test_key_includes_location(self):
+        self.assertEqual(storage_key(mock.Mock(location=''), 'warpzone/a.log'), 'warpzone/a.log')
+        self.assertEqual(storage_key(mock.Mock(location='media'), 'warpzone/a.log'), 'media/warpzone/a.log')
+        self.assertEqual(storage_key(mock.Mock(location='/media/'), 'warpzone/a.log'), 'media/warpzone/a.log')
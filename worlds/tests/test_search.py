@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.db import DataError
+from django.test import TestCase
+
+from worlds.models import LogChunk, StreamLog, StreamLogSegment
+from worlds.search import LogIndexer, search_logs
+from worlds.tasks import index_log_segment
+from worlds.tests.utils import TempMediaMixin, make_job, make_pipeline
+
+
+def index(job, pod, text, start_line=0):
+    indexer = LogIndexer(job.id, pod, start_line)
+    indexer.write(text)
+    indexer.close()
+
+
+class LogIndexerTests(TestCase):
+    def setUp(self):
+        self.job = make_job(make_pipeline(), job_name='job-1', status='active')
+
+    def test_chunks_track_line_numbers(self):
+        with self.settings(LOG_SEARCH_CHUNK_LINES=2):
+            index(self.job, 'pod-a', b'a\nb\nc\nd\ne')
+
+        chunks = list(LogChunk.objects.filter(job=self.job).values_list('start_line', 'lines', 'text'))
+        self.assertEqual(chunks, [(0, 2, 'a\nb'), (2, 2, 'c\nd'), (4, 1, 'e')])
+
+    def test_huge_lines_stay_under_the_tsvector_limit(self):
+        words = b' '.join(b'%06d' % i for i in range(400000))
+        indexer = LogIndexer(self.job.id, 'pod-a')
+        for i in range(0, len(words), 65536):
+            indexer.write(words[i:i + 65536])
+
+        indexer.write(b'\nnext line\n')
+        indexer.close()
+
+        chunk = LogChunk.objects.get(job=self.job)
+        self.assertEqual(len(chunk.text.split('\n')[0]), LogIndexer.MAX_LINE_BYTES)
+        self.assertEqual(chunk.lines, 2)
+
+    def test_dense_text_is_indexed(self):
+        words = b'\n'.join(b' '.join(b'%x' % (i * 97 + j) for j in range(20)) for i in range(20000))
+        index(self.job, 'pod-a', words)
+        self.assertGreater(LogChunk.objects.filter(job=self.job).count(), 1)
+
+    def test_index_errors_do_not_raise(self):
+        with mock.patch('worlds.search.LogChunk.objects.bulk_create', side_effect=DataError('too long')):
+            index(self.job, 'pod-a', b'a\nb\n')
+
+        self.assertFalse(LogChunk.objects.exists())
+
+
+class SegmentIndexTaskTests(TempMediaMixin, TestCase):
+    def test_segment_is_indexed_by_the_task(self):
+        job = make_job(make_pipeline(), job_name='job-1', status='active')
+        log = StreamLog.objects.create(job=job, pod='pod-a')
+        segment = StreamLogSegment(log=log, index=0, start_line=10, lines=2, size=14)
+        segment.log_file.save('pod-a.00000.log', ContentFile(b'found it\nnope\n'), save=False)
+        segment.save()
+
+        index_log_segment.call_local(segment.id)
+        self.assertEqual(search_logs('found')[0]['matches'], [{'pod': 'pod-a', 'line': 10, 'text': 'found it'}])
+
+
+class SearchLogsTests(TestCase):
+    def setUp(self):
+        pipeline = make_pipeline()
+        self.old = make_job(pipeline, job_name='old', status='completed')
+        self.new = make_job(pipeline, job_name='new', status='completed')
+        self.other = make_job(make_pipeline('other'), job_name='other', status='completed')
+
+        with self.settings(LOG_SEARCH_CHUNK_LINES=1):
+            index(self.old, 'pod-a', b'disk full error\nok\n')
+            index(self.new, 'pod-a', b'disk full error\n')
+            index(self.new, 'pod-b', b'ok\ndisk full error again\n')
+            index(self.other, 'pod-a', b'disk full error\n')
+
+    def test_one_result_per_job(self):
+        results = search_logs('disk full', pipeline_id=self.new.pipeline_id)
+
+        self.assertEqual([r['job']['id'] for r in results], [self.new.id, self.old.id])
+        self.assertEqual(results[0]['matched_chunks'], 2)
+        self.assertEqual(results[0]['matches'], [
+            {'pod': 'pod-a', 'line': 0, 'text': 'disk full error'},
+            {'pod': 'pod-b', 'line': 1, 'text': 'disk full error again'},
+        ])
+
+    def test_limit_counts_jobs(self):
+        self.assertEqual(len(search_logs('disk full', limit=2)), 2)
+
+    def test_chunks_per_job(self):
+        results = search_logs('disk full', pipeline_id=self.new.pipeline_id, chunks_per_job=1)
+        self.assertEqual(len(results[0]['matches']), 1)
+        self.assertEqual(results[0]['matched_chunks'], 2)
+
+    def test_phrase_search(self):
+        self.assertEqual(search_logs('full disk'), [])
@@ -0,0 +1,39 @@
+import asyncio
+import gc
+import weakref
+
+from django.test import SimpleTestCase, override_settings
+
+from warpzone.shelix_api import AsyncStarHelixApi
+
+
+@override_settings(SHELIX_URL='http://shelix.test')
+class AsyncClientTests(SimpleTestCase):
+    def test_one_client_per_loop(self):
+        async def clients():
+            return AsyncStarHelixApi.shared_client(), AsyncStarHelixApi.shared_client()
+
+        first, again = asyncio.run(clients())
+        self.assertIs(first, again)
+
+        loop = asyncio.new_event_loop()
+        try:
+            other, _ = loop.run_until_complete(clients())
+            self.assertIsNot(other, first)
+            self.assertIs(AsyncStarHelixApi._clients[loop], other)
+
+        finally:
+            loop.close()
+
+    def test_client_goes_away_with_its_loop(self):
+        async def client():
+            return AsyncStarHelixApi.shared_client()
+
+        loop = asyncio.new_event_loop()
+        ref = weakref.ref(loop.run_until_complete(client()))
+        self.assertIn(loop, AsyncStarHelixApi._clients)
+
+        loop.close()
+        del loop
+        gc.collect()
+        self.assertIsNone(ref())
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from warpzone.shelix_api import LogNotEnded, StarHelixApi
+from worlds.models import CompletedLog
+from worlds.tasks import end_shelix_log
+from worlds.tests.utils import TempMediaMixin, make_job, make_pipeline
+
+
+def upstream(chunks, endlog=True):
+    # read_log returns (text, lastchunk, endlog) for the chunk after the given cursor
+    def read_log(log_id, after=None):
+        index = 0 if after is None else int(after) + 1
+        if index >= len(chunks):
+            return '', None, endlog
+
+        return chunks[index], str(index), endlog
+
+    return read_log
+
+
+class IterLogTests(SimpleTestCase):
+    def test_chunks_follow_the_cursor(self):
+        with mock.patch.object(StarHelixApi, 'read_log', side_effect=upstream(['a\n', 'b\n', 'c\n'])):
+            self.assertEqual(list(StarHelixApi.iter_log('log', prefetch=1)), ['a\n', 'b\n', 'c\n'])
+
+    def test_open_log_raises(self):
+        with mock.patch.object(StarHelixApi, 'read_log', side_effect=upstream(['a\n'], endlog=False)):
+            with self.assertRaises(LogNotEnded):
+                list(StarHelixApi.iter_log('log'))
+
+    def test_read_errors_reach_the_caller(self):
+        with mock.patch.object(StarHelixApi, 'read_log', side_effect=ValueError('bad response')):
+            with self.assertRaises(ValueError):
+                list(StarHelixApi.iter_log('log'))
+
+
+@override_settings(LOG_SEARCH_ENABLED=False, COMPLETED_LOG_COMPRESSION='gzip')
+class EndShelixLogTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = make_job(make_pipeline(), job_name='job-1', status='completed', shelix_log_id='log-1')
+
+    def test_log_is_archived(self):
+        chunks = [f'line {i}\n' * 100 for i in range(20)]
+        with mock.patch.object(StarHelixApi, 'read_log', side_effect=upstream(chunks)):
+            end_shelix_log.call_local(self.job.id)
+
+        log = CompletedLog.objects.get(job=self.job)
+        self.assertEqual(log.encoding, 'gzip')
+        self.assertEqual(b''.join(log.iter_content()).decode(), ''.join(chunks))
+        self.assertEqual(log.lines, 2000)
+
+    def test_open_log_is_retried_later(self):
+        with mock.patch.object(StarHelixApi, 'read_log', side_effect=upstream(['a\n'], endlog=False)), \
+                mock.patch.object(end_shelix_log, 'schedule') as schedule:
+            end_shelix_log.call_local(self.job.id)
+
+        schedule.assert_called_once_with(delay=10, args=(self.job.id,))
+        self.assertFalse(CompletedLog.objects.filter(job=self.job).exists())
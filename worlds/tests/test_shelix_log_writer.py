@@ -0,0 +1,153 @@
+import os
+import tempfile
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from warpzone import shelix_log
+from warpzone.shelix_log import ShelixLogWriter, get_log_writer
+
+
+class SpoolTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool_dir = tmp.name
+        self.writer = ShelixLogWriter(spool_dir=self.spool_dir)
+        self.posted = []
+
+        patcher = mock.patch('warpzone.shelix_log.StarHelixApi.save_log', side_effect=self.save_log)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.fail_posts = False
+
+    def save_log(self, log_id, text):
+        if self.fail_posts:
+            raise httpx.ConnectError('down')
+
+        self.posted.append((log_id, text))
+
+    def files(self):
+        return sorted(os.listdir(self.spool_dir))
+
+    def test_failed_send_is_spooled_and_replayed(self):
+        self.fail_posts = True
+        self.writer.send('log1', 'a\n', 1)
+        self.assertEqual(self.files(), [f'log1.{os.getpid()}.log'])
+
+        # later lines queue behind the spool even when the upstream is back
+        self.fail_posts = False
+        self.writer.send('log1', 'b\n', 1)
+        self.assertEqual(self.posted, [])
+
+        self.writer.flush()
+        self.assertEqual(self.posted, [('log1', 'a\nb\n')])
+        self.assertEqual(self.files(), [])
+
+    def test_append_during_replay_goes_to_new_file(self):
+        self.fail_posts = True
+        self.writer.send('log1', 'a\n', 1)
+        self.fail_posts = False
+
+        def save_log(log_id, text):
+            # a line spooled while the replay is posting must not be lost by the replay removing its file
+            self.writer.spool(log_id, 'late\n', 1)
+            self.posted.append((log_id, text))
+
+        with mock.patch('warpzone.shelix_log.StarHelixApi.save_log', side_effect=save_log):
+            self.writer.flush()
+
+        self.assertEqual(self.posted, [('log1', 'a\n')])
+        self.assertEqual(self.files(), [f'log1.{os.getpid()}.log'])
+
+        self.writer.flush()
+        self.assertEqual(self.posted[-1], ('log1', 'late\n'))
+        self.assertEqual(self.files(), [])
+
+    def test_live_process_files_are_left_alone(self):
+        other = os.path.join(self.spool_dir, 'log1.1.log')
+        with open(other, 'w') as fh:
+            fh.write('theirs\n')
+
+        with mock.patch('warpzone.shelix_log.pid_alive', return_value=True):
+            self.writer.flush()
+
+        self.assertEqual(self.posted, [])
+        self.assertTrue(os.path.exists(other))
+
+    def test_dead_process_files_are_adopted(self):
+        with open(os.path.join(self.spool_dir, 'log1.1.log'), 'w') as fh:
+            fh.write('orphan\n')
+
+        with mock.patch('warpzone.shelix_log.pid_alive', return_value=False):
+            self.writer.flush()
+
+        self.assertEqual(self.posted, [('log1', 'orphan\n')])
+        self.assertEqual(self.files(), [])
+
+    def test_replay_is_posted_in_pieces(self):
+        self.writer.REPLAY_BYTES = 10
+        self.fail_posts = True
+        self.writer.send('log1', ''.join(f'line {i}\n' for i in range(5)), 5)
+        self.fail_posts = False
+        self.writer.flush()
+
+        self.assertGreater(len(self.posted), 1)
+        self.assertTrue(all(text.endswith('\n') for _, text in self.posted))
+        self.assertEqual(''.join(text for _, text in self.posted), ''.join(f'line {i}\n' for i in range(5)))
+
+    def test_partial_replay_resumes_after_last_post(self):
+        self.writer.REPLAY_BYTES = 7
+        self.fail_posts = True
+        self.writer.send('log1', 'line 0\nline 1\n', 2)
+        self.fail_posts = False
+
+        calls = []
+
+        def save_log(log_id, text):
+            calls.append(text)
+            if len(calls) == 2:
+                raise httpx.ConnectError('down')
+
+            self.posted.append((log_id, text))
+
+        with mock.patch('warpzone.shelix_log.StarHelixApi.save_log', side_effect=save_log):
+            self.writer.flush()
+
+        with mock.patch('warpzone.shelix_log.time.monotonic', return_value=10 ** 9):
+            self.writer.flush()
+
+        self.assertEqual(self.posted, [('log1', 'line 0\n'), ('log1', 'line 1\n')])
+
+    def test_replay_backs_off_and_gives_up(self):
+        self.fail_posts = True
+        self.writer.send('log1', 'a\n', 1)
+        self.writer.flush()
+        errors = self.writer.errors
+
+        # still inside the backoff, nothing is posted
+        self.writer.flush()
+        self.assertEqual(self.writer.errors, errors)
+
+        now = 0
+        for _ in range(ShelixLogWriter.MAX_REPLAY_ATTEMPTS):
+            now += ShelixLogWriter.MAX_BACKOFF + 1
+            with mock.patch('warpzone.shelix_log.time.monotonic', return_value=10 ** 9 + now):
+                self.writer.flush()
+
+        [name] = self.files()
+        self.assertTrue(name.endswith('.replay.failed'))
+        self.assertEqual(self.writer.replays, {})
+
+
+class GetLogWriterTests(SimpleTestCase):
+    @override_settings(SHELIX_LOG_BATCH_SIZE=7)
+    def test_built_once_on_first_use(self):
+        with mock.patch.object(shelix_log, 'writer', None), \
+                mock.patch('warpzone.shelix_log.atexit.register') as register:
+            writer = get_log_writer()
+            self.assertIs(get_log_writer(), writer)
+
+        self.assertEqual(writer.batch_size, 7)
+        register.assert_called_once_with(writer.flush)
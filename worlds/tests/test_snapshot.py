@@ -0,0 +1,91 @@
+import asyncio
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase
+
+from redis.exceptions import ConnectionError
+
+from worlds.hub import Topic
+from worlds.models import CompletedLog, Job
+from worlds.tests.utils import TempMediaMixin, make_job, make_pipeline
+from worlds.websocket import read_job_upstream
+
+
+class SnapshotTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = make_job(make_pipeline(), job_name='job-1', status='completed')
+        caches['default'].delete(Job.snapshot_key(self.job.id))
+
+    def test_snapshot_stores_storage_names(self):
+        log = CompletedLog(job=self.job, pod='pod-a')
+        log.log_file.save('pod-a.log', ContentFile(b'line\n'), save=False)
+        log.save()
+
+        data = Job.snapshot(self.job.id)
+        self.assertEqual(data['log_files'], {'pod-a': log.log_file.name})
+        self.assertNotIn('log_data', data)
+
+        with mock.patch.object(CompletedLog._meta.get_field('log_file').storage, 'url', return_value='signed') as url:
+            served = Job.snapshot_json(data)
+
+        url.assert_called_once_with(log.log_file.name)
+        self.assertEqual(served['log_data'], {'pod-a': 'signed'})
+        self.assertNotIn('log_files', served)
+
+    def test_logs_without_files_are_left_out(self):
+        CompletedLog.objects.create(job=self.job, pod='pod-a')
+        data = Job.snapshot(self.job.id)
+        self.assertEqual(data['log_files'], {})
+
+        # snapshots cached before empty names were dropped
+        data['log_files'] = {'pod-a': '', 'pod-b': None}
+        self.assertEqual(Job.snapshot_json(data)['log_data'], {})
+
+    def test_status_save_drops_the_cached_snapshot(self):
+        Job.snapshot(self.job.id)
+        self.job.status = 'failed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.job.save_status()
+
+        self.assertIsNone(caches['default'].get(Job.snapshot_key(self.job.id)))
+        self.assertEqual(Job.snapshot(self.job.id)['status'], 'Failed')
+
+    def test_missing_job_is_empty(self):
+        self.assertEqual(Job.snapshot(0), {})
+        self.assertEqual(Job.snapshot_json({}), {})
+
+    def test_redis_errors_fall_back_to_the_database(self):
+        cache = mock.Mock()
+        cache.get.side_effect = ConnectionError('down')
+        cache.set.side_effect = ConnectionError('down')
+        cache.delete.side_effect = ConnectionError('down')
+
+        with mock.patch('worlds.models.caches', {'default': cache}):
+            self.assertEqual(Job.snapshot(self.job.id)['id'], self.job.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.job.save_status()
+
+
+class JobUpstreamTests(SimpleTestCase):
+    def test_deleted_job_ends_the_topic(self):
+        topic = Topic(('job', 1))
+
+        async def wait(wakeup, timeout):
+            pass
+
+        snapshots = iter([{'id': 1, 'status': 'Active'}, {}])
+        with mock.patch('worlds.websocket.get_job', side_effect=lambda jid: next(snapshots)), \
+                mock.patch('worlds.websocket.sync_to_async', side_effect=lambda func, **kwargs: in_loop(func)), \
+                mock.patch('worlds.websocket.notify.listener'), \
+                mock.patch('worlds.websocket.notify.wait', side_effect=wait):
+            asyncio.run(asyncio.wait_for(read_job_upstream(1, topic), 1))
+
+
+def in_loop(func):
+    async def call(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return call
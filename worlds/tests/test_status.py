@@ -0,0 +1,100 @@
+import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from kubernetes.client.models import V1JobStatus
+
+from worlds.models import Job
+from worlds.tests.utils import make_job, make_pipeline
+from worlds.watchers import JobWatcher
+
+
+class ApplyKubeStatusTests(SimpleTestCase):
+    def make_job(self, **kwargs):
+        kwargs.setdefault('status', 'submitted')
+        return Job(parallelism=2, **kwargs)
+
+    def test_active(self):
+        job = self.make_job()
+        self.assertTrue(job.apply_kube_status(V1JobStatus(active=2)))
+        self.assertEqual(job.status, 'active')
+        self.assertIsNotNone(job.started)
+
+    def test_completed_when_all_pods_done(self):
+        job = self.make_job(status='active')
+        self.assertTrue(job.apply_kube_status(V1JobStatus(succeeded=1, failed=1)))
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.succeeded, job.failed), (1, 1))
+        self.assertIsNotNone(job.finished)
+
+    def test_partial_progress_stays_active(self):
+        job = self.make_job(status='active')
+        self.assertTrue(job.apply_kube_status(V1JobStatus(active=1, succeeded=1)))
+        self.assertEqual(job.status, 'active')
+        self.assertIsNone(job.finished)
+
+    def test_failed_with_conditions_and_no_counts(self):
+        job = self.make_job()
+        self.assertTrue(job.apply_kube_status(V1JobStatus(conditions=[object()])))
+        self.assertEqual(job.status, 'failed')
+
+    def test_times_come_from_kubernetes(self):
+        started = timezone.now() - datetime.timedelta(minutes=5)
+        finished = started + datetime.timedelta(minutes=2)
+        job = self.make_job()
+        job.apply_kube_status(V1JobStatus(succeeded=2, start_time=started, completion_time=finished))
+        self.assertEqual((job.started, job.finished), (started, finished))
+
+    def test_job_never_seen_active_gets_started(self):
+        job = self.make_job()
+        job.apply_kube_status(V1JobStatus(failed=2))
+        self.assertEqual(job.status, 'completed')
+        self.assertIsNotNone(job.started)
+        self.assertLessEqual(job.started, job.finished)
+
+    def test_first_start_time_is_kept(self):
+        job = self.make_job(status='active')
+        job.apply_kube_status(V1JobStatus(active=2))
+        started = job.started
+        job.apply_kube_status(V1JobStatus(active=2, start_time=started - datetime.timedelta(minutes=1)))
+        self.assertEqual(job.started, started)
+
+    def test_start_time_alone_is_a_change(self):
+        job = self.make_job(status='active')
+        self.assertTrue(job.apply_kube_status(V1JobStatus(active=2, start_time=timezone.now())))
+
+    def test_unchanged(self):
+        job = self.make_job(status='active')
+        job.apply_kube_status(V1JobStatus(active=2))
+        self.assertFalse(job.apply_kube_status(V1JobStatus(active=2)))
+
+
+@mock.patch('worlds.watchers.update_job_status')
+class JobWatcherTests(TestCase):
+    def setUp(self):
+        self.job = make_job(make_pipeline(), job_name='job-1', status='submitted', parallelism=1)
+        self.watcher = JobWatcher(self.job.pipeline.cluster)
+
+    def kjob(self, **status):
+        return SimpleNamespace(metadata=SimpleNamespace(name='job-1'), status=V1JobStatus(**status))
+
+    def test_status_change_is_saved(self, update_job_status):
+        self.watcher.handle('MODIFIED', self.kjob(active=1))
+        self.assertEqual(Job.objects.get(id=self.job.id).status, 'active')
+        update_job_status.assert_called_once_with(self.job.id)
+
+    def test_unchanged_status_is_ignored(self, update_job_status):
+        self.watcher.handle('MODIFIED', self.kjob())
+        update_job_status.assert_not_called()
+
+    def test_deleted_job_is_checked(self, update_job_status):
+        self.watcher.handle('DELETED', self.kjob())
+        update_job_status.assert_called_once_with(self.job.id)
+
+    def test_other_cluster_is_ignored(self, update_job_status):
+        other = JobWatcher(make_pipeline('other').cluster)
+        other.handle('MODIFIED', self.kjob(active=1))
+        update_job_status.assert_not_called()
@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.http import QueryDict
+from django.test import TestCase
+
+from worlds.models import CompletedLog, Job, StreamLog
+from worlds.tests.utils import TempMediaMixin, make_job, make_pipeline
+
+
+class QueryParamTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('tester', password='x')
+        self.client.force_login(user)
+        self.job = make_job(make_pipeline(), job_name='job-1', status='completed')
+        StreamLog.objects.create(job=self.job, pod='pod-a')
+
+    def test_non_numeric_params_are_bad_requests(self):
+        urls = [
+            '/worlds/jobs/api/?limit=abc',
+            '/worlds/jobs/api/?pipeline=abc',
+            '/worlds/logs/search/?q=error&days=abc',
+            '/worlds/logs/search/?q=error&limit=1e3',
+            '/worlds/jobs/archive/?limit=',
+            f'/worlds/job/{self.job.id}/pod-a.lines?tail=x',
+            f'/worlds/job/{self.job.id}/pod-a.lines?start=x',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_out_of_range_params_are_clamped(self):
+        response = self.client.get('/worlds/jobs/api/?limit=-5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['jobs']), 1)
+
+
+class JobListTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('tester', password='x')
+        self.client.force_login(user)
+        self.job = make_job(make_pipeline(), job_name='job-1', status='completed', envs='A=1 2\n')
+
+    def test_list_does_not_decrypt_envs(self):
+        field = Job._meta.get_field('envs')
+        with mock.patch.object(field, 'decrypt') as decrypt:
+            response = self.client.get('/worlds/jobs/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'/worlds/job/{self.job.id}/restart/')
+        decrypt.assert_not_called()
+
+    def test_restart_prefills_the_start_form(self):
+        response = self.client.get(f'/worlds/job/{self.job.id}/restart/')
+        query = QueryDict(response['Location'].split('?', 1)[1])
+
+        self.assertEqual(query['envs'], 'A=1 2\n')
+        self.assertEqual(query['image'], 'busybox')
+        self.assertEqual(query['pipeline'], str(self.job.pipeline_id))
+        self.assertEqual(query['job_type'], '')
+
+
+class ShelixLogTests(TempMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = make_job(make_pipeline(), job_name='job-1', status='active', shelix_log_id='log-1')
+        self.url = f'/worlds/job/{self.job.id}/shelix-logs/'
+
+    def login(self):
+        self.client.force_login(get_user_model().objects.create_user('tester', password='x'))
+
+    def test_login_is_required(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response['Location'])
+
+    def test_completed_log_is_served_before_the_job_is_done(self):
+        self.login()
+        log = CompletedLog(job=self.job, pod='pod-a')
+        log.log_file.save('pod-a.log', ContentFile(b'line\n'), save=False)
+        log.save()
+
+        with mock.patch('worlds.views.chunkcache.read_log') as read_log:
+            data = self.client.get(self.url).json()
+
+        self.assertEqual(data['url'], log.log_file.url)
+        read_log.assert_not_called()
+
+    def test_only_matching_etags_are_not_modified(self):
+        self.login()
+        with mock.patch('worlds.views.chunkcache.read_log', new=mock.AsyncMock(return_value=('text', 'chunk-1', ''))):
+            etag = self.client.get(self.url)['ETag']
+            matching = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+            malformed = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'{etag}-stale')
+
+        self.assertEqual(matching.status_code, 304)
+        self.assertEqual(malformed.status_code, 200)
@@ -0,0 +1,178 @@
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from redis.exceptions import ConnectionError
+
+from worlds.logstream import redis_client
+from worlds.models import Job
+from worlds.tests.utils import make_job, make_pipeline
+from worlds.watchers import InformerRegistry, PodIndex, PodInformer, assign_pod
+
+
+def make_pod(name, uid='uid-1', job_name='job-1'):
+    return SimpleNamespace(metadata=SimpleNamespace(
+        name=name, labels={'controller-uid': uid, 'job-name': job_name}, resource_version='1'))
+
+
+def test_cluster(test):
+    # a cluster id no real cluster uses, its shared index is removed after the test
+    cluster = SimpleNamespace(id=900001, slug='test', name='test')
+    index = PodIndex(cluster.id)
+    test.addCleanup(redis_client(write=True).delete, index.key, index.synced_key)
+    return cluster
+
+
+class PodInformerTests(SimpleTestCase):
+    def make_informer(self, on_added=None):
+        return PodInformer(test_cluster(self), on_added=on_added)
+
+    def test_index_follows_events(self):
+        added = mock.Mock()
+        informer = self.make_informer(added)
+        informer.relisted([make_pod('a')])
+        informer.handle('ADDED', make_pod('b'))
+        informer.handle('MODIFIED', make_pod('b'))
+
+        self.assertEqual(informer.pods_for('uid-1'), ['a', 'b'])
+        self.assertEqual([c.args[1].metadata.name for c in added.call_args_list], ['a', 'b'])
+
+        self.assertEqual(informer.shared.pods_for('uid-1'), ['a', 'b'])
+
+        informer.handle('DELETED', make_pod('a'))
+        informer.handle('DELETED', make_pod('b'))
+        self.assertEqual(informer.pods_for('uid-1'), [])
+        self.assertEqual(informer.shared.pods_for('uid-1'), [])
+
+    def test_relist_only_reports_new_pods(self):
+        added = mock.Mock()
+        informer = self.make_informer(added)
+        informer.relisted([make_pod('a')])
+        informer.relisted([make_pod('a'), make_pod('b')])
+        self.assertEqual([c.args[1].metadata.name for c in added.call_args_list], ['a', 'b'])
+
+    def test_watch_error_clears_synced(self):
+        informer = self.make_informer()
+        informer.relisted([])
+        self.assertTrue(informer.synced.is_set())
+
+        def fail(resource_version):
+            informer.stopped.set()
+            raise RuntimeError('watch failed')
+
+        with mock.patch.object(informer, 'relist', return_value='1'), \
+                mock.patch.object(informer, 'watch_events', side_effect=fail):
+            informer.run()
+
+        self.assertFalse(informer.synced.is_set())
+        self.assertIsNone(informer.shared.pods_for('uid-1'))
+
+    def test_relist_replaces_the_shared_index(self):
+        informer = self.make_informer()
+        informer.relisted([make_pod('a'), make_pod('x', uid='uid-2')])
+        informer.relisted([make_pod('b')])
+
+        self.assertEqual(informer.shared.pods_for('uid-1'), ['b'])
+        self.assertEqual(informer.shared.pods_for('uid-2'), [])
+
+    def test_shared_index_goes_stale_without_heartbeats(self):
+        informer = self.make_informer()
+        with self.settings(POD_INDEX_STALE_SECONDS=1):
+            informer.relisted([make_pod('a')])
+
+        self.assertEqual(informer.shared.pods_for('uid-1'), ['a'])
+        time.sleep(1.1)
+        self.assertIsNone(informer.shared.pods_for('uid-1'))
+
+        informer.shared.heartbeat()
+        self.assertEqual(informer.shared.pods_for('uid-1'), ['a'])
+
+
+class GetPodsTests(TestCase):
+    def setUp(self):
+        self.job = make_job(make_pipeline(), job_name='job-1', status='active',
+                            job_definition={'metadata': {'labels': {'controller-uid': 'uid-1'}}})
+        index = PodIndex(self.job.pipeline.cluster_id)
+        self.addCleanup(redis_client(write=True).delete, index.key, index.synced_key)
+        self.index = index
+
+    def test_other_processes_read_the_shared_index(self):
+        self.index.publish({'uid-1': {'b', 'a'}})
+        with mock.patch('worlds.models.kube_apis.CoreV1Api') as core_v1:
+            self.assertEqual(self.job.get_pods(object()), ['a', 'b'])
+
+        core_v1.return_value.list_namespaced_pod.assert_not_called()
+
+    def test_stale_index_falls_back_to_the_api(self):
+        self.index.publish({'uid-1': {'a'}})
+        self.index.clear()
+
+        with mock.patch('worlds.models.kube_apis.CoreV1Api') as core_v1:
+            core_v1.return_value.list_namespaced_pod.return_value = SimpleNamespace(items=[make_pod('c')])
+            self.assertEqual(self.job.get_pods(object()), ['c'])
+
+    def test_redis_errors_fall_back_to_the_api(self):
+        with mock.patch('worlds.watchers.PodIndex.pods_for', side_effect=ConnectionError('down')), \
+                mock.patch('worlds.models.kube_apis.CoreV1Api') as core_v1:
+            core_v1.return_value.list_namespaced_pod.return_value = SimpleNamespace(items=[])
+            self.assertEqual(self.job.get_pods(object()), [])
+
+
+class InformerRegistryTests(SimpleTestCase):
+    def test_get_does_not_start_informers(self):
+        registry = InformerRegistry()
+        cluster = test_cluster(self)
+
+        with mock.patch.object(PodInformer, 'start') as start:
+            self.assertIsNone(registry.get(cluster))
+            start.assert_not_called()
+
+    def test_get_requires_a_synced_informer(self):
+        registry = InformerRegistry()
+        cluster = test_cluster(self)
+        informer = registry.create(cluster)
+
+        with mock.patch.object(informer, 'is_alive', return_value=True):
+            self.assertIsNone(registry.get(cluster))
+
+            informer.relisted([])
+            self.assertIs(registry.get(cluster), informer)
+
+            informer.desynced()
+            self.assertIsNone(registry.get(cluster))
+
+
+@mock.patch('worlds.models.Job.start_log_watch')
+class ClaimPodsTests(TestCase):
+    def setUp(self):
+        self.job = make_job(make_pipeline(), job_name='job-1', status='active')
+
+    def test_claims_each_pod_once(self, start_log_watch):
+        self.assertEqual(self.job.claim_pods(['a', 'b']), ['a', 'b'])
+        self.assertEqual(Job.objects.get(id=self.job.id).claim_pods(['a', 'b', 'c']), ['c'])
+        self.assertEqual([c.args[0] for c in start_log_watch.call_args_list], ['a', 'b', 'c'])
+
+    def test_stale_save_keeps_claimed_pods(self, start_log_watch):
+        stale = Job.objects.get(id=self.job.id)
+        Job.objects.get(id=self.job.id).claim_pods(['a'])
+
+        stale.status = 'completed'
+        stale.save_status()
+
+        job = Job.objects.get(id=self.job.id)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.pods, ['a'])
+        self.assertEqual(job.pod_watchers, ['a'])
+
+        # the stale instance doesn't start a second watcher for a claimed pod
+        self.assertEqual(stale.claim_pods(['a']), [])
+        self.assertEqual(start_log_watch.call_count, 1)
+
+    def test_assign_pod_matches_cluster(self, start_log_watch):
+        other = make_job(make_pipeline('other'), job_name='job-1', status='active')
+
+        assign_pod(other.pipeline.cluster_id, make_pod('a'))
+        self.assertEqual(Job.objects.get(id=other.id).pods, ['a'])
+        self.assertIsNone(Job.objects.get(id=self.job.id).pods)
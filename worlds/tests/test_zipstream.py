@@ -0,0 +1,44 @@
+import io
+import os
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from django.test import SimpleTestCase
+
+from worlds.zipstream import stream_zip
+
+
+class StreamZipTests(SimpleTestCase):
+    def entries(self):
+        yield 'a.log', [b'line 1\n', b'line 2\n']
+        yield 'dir/b.bin', [os.urandom(100000), os.urandom(100000)]
+        yield 'empty.txt', []
+
+    def read_back(self, chunks):
+        with ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+
+    def test_round_trip(self):
+        for compression in [None, ZIP_DEFLATED]:
+            with self.subTest(compression=compression):
+                args = [compression] if compression else []
+                files = self.read_back(stream_zip(self.entries(), *args))
+                self.assertEqual(files['a.log'], b'line 1\nline 2\n')
+                self.assertEqual(len(files['dir/b.bin']), 200000)
+                self.assertEqual(files['empty.txt'], b'')
+
+    def test_output_is_streamed(self):
+        consumed = []
+
+        def entries():
+            for name in ['a', 'b', 'c']:
+                consumed.append(name)
+                yield name, [b'x' * 1000]
+
+        chunks = stream_zip(entries())
+        first = next(chunks)
+        self.assertTrue(first.startswith(b'PK'))
+        self.assertEqual(consumed, ['a'])
+
+        rest = list(chunks)
+        self.assertEqual(consumed, ['a', 'b', 'c'])
+        self.assertEqual(set(self.read_back([first] + rest)), {'a', 'b', 'c'})
@@ -0,0 +1,32 @@
+import shutil
+import tempfile
+
+from worlds.models import Cluster, Job, Pipeline
+
+
+def make_cluster(slug='test'):
+    return Cluster.objects.create(name=slug, slug=slug, external_id=slug, ctype='do', config='apiVersion: v1')
+
+
+def make_pipeline(slug='test', cluster=None, **kwargs):
+    if cluster is None:
+        cluster = make_cluster(slug)
+
+    return Pipeline.objects.create(name=slug, slug=slug, worker_command='run', workers=1, cluster=cluster, **kwargs)
+
+
+def make_job(pipeline, **kwargs):
+    kwargs.setdefault('command', ['run'])
+    kwargs.setdefault('image', 'busybox')
+    return Job.objects.create(pipeline=pipeline, **kwargs)
+
+
+class TempMediaMixin:
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+
+        override = self.settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
@@ -5,11 +5,19 @@ from worlds.views import *
 urlpatterns = [
     path('pipeline/start/', start_pipeline),
     path('pipelines/', pipeline_list),
+    path('analytics/', analytics_page),
+    path('analytics/api/', analytics_api),
     path('jobs/', job_list),
+    path('jobs/api/', job_list_api),
+    path('jobs/archive/', job_archive),
+    path('logs/search/', log_search),
     path('job/<int:jid>/', job_details),
     path('job/<int:jid>/shelix-logs/', job_shelix_log),
     path('job/<int:jid>/kill/', job_kill),
+    path('job/<int:jid>/restart/', job_restart),
+    path('job/<int:jid>/artifacts/', job_artifacts),
     path('job/<int:jid>/<str:pod>.log', job_log),
+    path('job/<int:jid>/<str:pod>.lines', job_log_lines),
     path('job/<int:jid>/<str:zip>.logs.zip', all_logs),
     path('job/<int:jid>/<str:zip>.zip', job_zip),
 ]
@@ -1,30 +1,79 @@
-import os
-from io import BytesIO
-from zipfile import ZipFile, ZipInfo
+import datetime
+import functools
+import hashlib
+from zipfile import ZIP_DEFLATED, ZIP_STORED
 
 from django import http
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import BadRequest
 from django.template.response import TemplateResponse
 from django.shortcuts import get_object_or_404
 from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.cache import parse_etags
+from django.utils.http import quote_etag
 
-from warpzone.shelix_api import StarHelixApi
-from worlds.models import Pipeline, Job, CompletedLog, JobType
+from asgiref.sync import sync_to_async
+
+from worlds import analytics, chunkcache
+from worlds.archive import read_jobs
+from worlds.artifacts import fetch_artifacts
+from worlds.models import Pipeline, Job, CompletedLog, JobArtifact, JobType, StreamLog
+from worlds.pagination import KeysetPage
+from worlds.search import search_logs
+from worlds.zipstream import stream_zip
+
+
+def int_param(request, name, default, minimum=None, maximum=None):
+    try:
+        value = int(request.GET.get(name, default))
+
+    except ValueError:
+        raise BadRequest(f'{name} must be an integer')
+
+    if minimum is not None:
+        value = max(value, minimum)
+
+    if maximum is not None:
+        value = min(value, maximum)
+
+    return value
 
 
 @login_required
 def job_list(request):
-    jobs = Job.objects.all().select_related('pipeline').defer('job_definition')
-    paginator = Paginator(jobs, 50)
+    jobs = Job.objects.all().select_related('pipeline', 'job_type').defer('job_definition', 'envs')
+    page_obj = KeysetPage(jobs, 50, request.GET.get('after'), request.GET.get('before'))
 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    running = Job.objects.filter(status__in=Job.STATUS_RUNNING).values_list('pipeline_id', flat=True)
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'running_pipelines': set(running),
     }
     return TemplateResponse(request, 'worlds/job_list.html', context)
 
 
+@login_required
+def job_list_api(request):
+    jobs = Job.objects.all().select_related('pipeline').defer('job_definition', 'envs')
+
+    if request.GET.get('pipeline'):
+        jobs = jobs.filter(pipeline_id=int_param(request, 'pipeline', None))
+
+    if request.GET.get('status'):
+        jobs = jobs.filter(status=request.GET['status'])
+
+    limit = int_param(request, 'limit', 50, 1, 500)
+    page = KeysetPage(jobs, limit, request.GET.get('after'), request.GET.get('before'))
+    return http.JsonResponse({
+        'jobs': [j.list_json() for j in page],
+        'next': page.next_cursor,
+        'prev': page.prev_cursor,
+    })
+
+
 @login_required
 def job_details(request, jid):
     job = get_object_or_404(Job, id=jid)
@@ -38,50 +87,131 @@ def job_details(request, jid):
     return TemplateResponse(request, 'worlds/job_details.html', context)
 
 
-@login_required
-def job_shelix_log(request, jid):
-    job = get_object_or_404(Job, id=jid)
+def etag_response(request, data):
+    response = http.JsonResponse(data)
+    etag = quote_etag(hashlib.sha1(response.content).hexdigest())
+    # If-None-Match uses the weak comparison
+    etags = [e[2:] if e.startswith('W/') else e for e in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+    if etag in etags or '*' in etags:
+        response = http.HttpResponseNotModified()
 
-    after = request.GET.get('after', '')
+    response['ETag'] = etag
+    return response
+
+
+def async_login_required(view):
+    # login_required for async views, the session user is loaded in a thread
+    @functools.wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated, thread_sensitive=True)():
+            return redirect_to_login(request.get_full_path())
+
+        return await view(request, *args, **kwargs)
+
+    return wrapped
 
-    completed = CompletedLog.objects.filter(job=job).first()
 
-    if completed:
-        return http.JsonResponse({
-            'job': job.to_json(),
-            'url': completed.log_file.url
+def shelix_log_state(jid):
+    job_data = Job.snapshot(jid)
+    if not job_data:
+        raise http.Http404
+
+    completed = CompletedLog.objects.filter(job_id=jid).exclude(log_file='').first()
+    return Job.snapshot_json(job_data), completed.log_file.url if completed else None
+
+
+# async so polling clients don't hold a worker thread while waiting on Star Helix
+@async_login_required
+async def job_shelix_log(request, jid):
+    job_data, url = await sync_to_async(shelix_log_state, thread_sensitive=True)(jid)
+    after = request.GET.get('after', '')
+
+    if url:
+        return etag_response(request, {
+            'job': job_data,
+            'url': url
         })
 
-    text, lastchunk, endlog = StarHelixApi.read_log(job.shelix_log_id, after)
-    return http.JsonResponse({
+    # viewers of the same job share one upstream read per chunk
+    text, lastchunk, endlog = await chunkcache.read_log(job_data['shelix_log_id'], after)
+    return etag_response(request, {
         'text': text,
         'lastchunk': lastchunk,
-        'job': job.to_json(),
+        'job': job_data,
         'endlog': endlog,
     })
 
 
 @login_required
 def job_log(request, jid, pod):
-    log = get_object_or_404(CompletedLog, job_id=jid, pod=pod)
+    log = CompletedLog.objects.filter(job_id=jid, pod=pod).first()
+    if log is None:
+        # pod still running, serve the segments streamed so far
+        slog = get_object_or_404(StreamLog, job_id=jid, pod=pod)
+        response = http.StreamingHttpResponse(slog.iter_content(), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{pod}.log"'
+        return response
+
     if log.log_file:
+        # compressed logs are stored with Content-Encoding: gzip so clients that accept it can fetch them directly
+        if log.encoding and log.encoding not in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = http.StreamingHttpResponse(log.iter_content(), content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{log.file_name}"'
+            return response
+
         return http.HttpResponseRedirect(log.log_file.url)
 
     raise http.Http404
 
 
+@login_required
+def job_log_lines(request, jid, pod):
+    log = CompletedLog.objects.filter(job_id=jid, pod=pod).exclude(log_file='').first()
+    if log is None:
+        log = get_object_or_404(StreamLog, job_id=jid, pod=pod)
+
+    if 'tail' in request.GET:
+        count = int_param(request, 'tail', 100, 0, 5000)
+        start, lines = log.tail_lines(count) if count > 0 else (log.lines or 0, [])
+
+    else:
+        count = int_param(request, 'count', 100, 0, 5000)
+        start = int_param(request, 'start', 0, 0)
+        lines = log.read_lines(start, count) if count > 0 else []
+
+    return http.JsonResponse({
+        'start': start,
+        'lines': [l.rstrip('\n') for l in lines],
+        'total': log.lines or 0,
+    })
+
+
+def zip_response(entries, filename, compression=ZIP_STORED):
+    response = http.StreamingHttpResponse(stream_zip(entries, compression), content_type="application/zip")
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def all_logs(request, jid, zip):
     job = get_object_or_404(Job, id=jid)
 
-    new_zip = BytesIO()
-    with ZipFile(new_zip, 'w') as new_archive:
+    def entries():
         for log in CompletedLog.objects.filter(job=job):
             if log.log_file:
-                contents = log.log_file.open('rb').read()
-                new_archive.writestr(os.path.basename(log.log_file.name), contents)
+                yield log.file_name, log.iter_content()
+
+    return zip_response(entries(), f'{zip}.logs.zip', ZIP_DEFLATED)
 
-    return http.HttpResponse(new_zip.getvalue(), content_type="application/zip")
+
+def job_artifacts_manifest(job, base_path):
+    if job.manifest_created:
+        return JobArtifact.objects.filter(job=job).iterator()
+
+    if job.status in job.STATUS_DONE:
+        return job.build_artifact_manifest()
+
+    return job.list_artifacts(base_path)
 
 
 @login_required
@@ -89,18 +219,79 @@ def job_zip(self, jid, zip):
     job = get_object_or_404(Job, id=jid)
 
     base_path = job.pipeline.get_job_storage()
-    path = base_path / job.job_name
-    files = path.glob('**/*')
+    base_prefix = f'{base_path.key}/'.lstrip('/')
+    artifacts = job_artifacts_manifest(job, base_path)
+
+    def entries():
+        for artifact, chunks in fetch_artifacts(base_path.client.client, base_path.bucket, artifacts):
+            yield artifact.key[len(base_prefix):], chunks
+
+    return zip_response(entries(), f'{zip}.zip')
 
-    new_zip = BytesIO()
-    with ZipFile(new_zip, 'w') as new_archive:
-        for file in files:
-            contents = file.open('rb').read()
-            relpath = str(file)
-            relpath = relpath.replace(str(base_path), '')
-            new_archive.writestr(relpath, contents)
 
-    return http.HttpResponse(new_zip.getvalue(), content_type="application/zip")
+@login_required
+def job_artifacts(request, jid):
+    job = get_object_or_404(Job, id=jid)
+    if not job.manifest_created:
+        raise http.Http404
+
+    limit = int_param(request, 'limit', 100, 1, 1000)
+    qs = JobArtifact.objects.filter(job=job)
+
+    after = request.GET.get('after')
+    if after:
+        qs = qs.filter(key__gt=after)
+
+    artifacts = [a.to_json() for a in qs[:limit]]
+    return http.JsonResponse({
+        'artifacts': artifacts,
+        'next': artifacts[-1]['key'] if len(artifacts) == limit else None,
+    })
+
+
+@login_required
+def log_search(request):
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return http.HttpResponseBadRequest('q is required')
+
+    days = int_param(request, 'days', 7, 1, settings.LOG_SEARCH_RETENTION_DAYS)
+    since = timezone.now() - datetime.timedelta(days=days)
+    limit = int_param(request, 'limit', 100, 1, 1000)
+
+    pipeline = int_param(request, 'pipeline', None) if request.GET.get('pipeline') else None
+    return http.JsonResponse({'results': search_logs(query, pipeline, since, limit)})
+
+
+@login_required
+def job_archive(request):
+    limit = int_param(request, 'limit', 100, 1, 1000)
+    table = read_jobs(
+        start=request.GET.get('start'),
+        end=request.GET.get('end'),
+        pipeline=request.GET.get('pipeline'),
+        status=request.GET.get('status'),
+        limit=limit,
+    )
+    return http.JsonResponse({'jobs': table.to_pylist()})
+
+
+@login_required
+def analytics_page(request):
+    context = {
+        'windows': list(analytics.WINDOWS),
+        'pipelines': list(Pipeline.objects.order_by('name').values('slug', 'name')),
+    }
+    return TemplateResponse(request, 'worlds/analytics.html', context)
+
+
+@login_required
+def analytics_api(request):
+    window = request.GET.get('window', '24h')
+    if window not in analytics.WINDOWS:
+        return http.HttpResponseBadRequest('unknown window')
+
+    return http.JsonResponse(analytics.summary(window, request.GET.get('pipeline') or None))
 
 
 @login_required
@@ -110,6 +301,20 @@ def job_kill(request, jid):
     return http.HttpResponseRedirect("/")
 
 
+@login_required
+def job_restart(request, jid):
+    # the list links here so envs are only decrypted for the job being restarted
+    job = get_object_or_404(Job, id=jid)
+    query = http.QueryDict(mutable=True)
+    query.update({
+        'image': job.image,
+        'pipeline': job.pipeline_id,
+        'job_type': job.job_type_id or '',
+        'envs': job.envs or '',
+    })
+    return http.HttpResponseRedirect(f'/worlds/pipeline/start/?{query.urlencode()}')
+
+
 @login_required
 def pipeline_list(request):
     pipes = Pipeline.objects.all().order_by('name')
@@ -0,0 +1,343 @@
+import json
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from kubernetes import client as kube_apis
+from kubernetes import watch as kube_watch
+from kubernetes.client.exceptions import ApiException
+
+from worlds.logstream import redis_client
+from worlds.models import Cluster, Job
+from worlds.tasks import update_job_status
+
+
+class ListWatchThread(threading.Thread):
+    WATCH_TIMEOUT = 300
+    ERROR_DELAY = 5
+    LABEL_SELECTOR = None
+    KIND = 'Resource'
+
+    def __init__(self, cluster):
+        super().__init__(name=f'{self.KIND.lower()}-watcher-{cluster.slug}', daemon=True)
+        self.cluster_id = cluster.id
+        self.cluster_name = cluster.name
+        self.stopped = threading.Event()
+        self.watch = None
+
+    def stop(self):
+        self.stopped.set()
+        if self.watch:
+            self.watch.stop()
+
+    def run(self):
+        logger.info('{} Watcher Starting: {}', self.KIND, self.cluster_name)
+        resource_version = None
+
+        while not self.stopped.is_set():
+            try:
+                if resource_version is None:
+                    resource_version = self.relist()
+
+                resource_version = self.watch_events(resource_version)
+
+            except ApiException as exc:
+                if exc.status == 410:
+                    logger.info('{} Watch Expired, Relisting: {}', self.KIND, self.cluster_name)
+
+                else:
+                    logger.exception('{} Watch Error: {}', self.KIND, self.cluster_name)
+                    self.desynced()
+                    self.stopped.wait(self.ERROR_DELAY)
+
+                resource_version = None
+
+            except Exception:
+                logger.exception('{} Watch Error: {}', self.KIND, self.cluster_name)
+                self.desynced()
+                resource_version = None
+                self.stopped.wait(self.ERROR_DELAY)
+
+            finally:
+                close_old_connections()
+
+        self.desynced()
+        logger.info('{} Watcher Stopped: {}', self.KIND, self.cluster_name)
+
+    def desynced(self):
+        pass
+
+    def kube_client(self):
+        return Cluster.objects.get(id=self.cluster_id).kube_client()
+
+    def list_func(self, client):
+        raise NotImplementedError
+
+    def relisted(self, items):
+        for obj in items:
+            self.handle('ADDED', obj)
+
+    def handle(self, event_type, obj):
+        raise NotImplementedError
+
+    def relist(self):
+        response = self.list_func(self.kube_client())(namespace='default', label_selector=self.LABEL_SELECTOR)
+        self.relisted(response.items)
+        return response.metadata.resource_version
+
+    def watch_events(self, resource_version):
+        self.watch = kube_watch.Watch()
+        stream = self.watch.stream(
+            self.list_func(self.kube_client()),
+            namespace='default',
+            label_selector=self.LABEL_SELECTOR,
+            resource_version=resource_version,
+            allow_watch_bookmarks=True,
+            timeout_seconds=self.WATCH_TIMEOUT,
+        )
+
+        for event in stream:
+            if event['type'] == 'BOOKMARK':
+                resource_version = event['raw_object']['metadata']['resourceVersion']
+                continue
+
+            obj = event['object']
+            resource_version = obj.metadata.resource_version
+            self.handle(event['type'], obj)
+            close_old_connections()
+
+        return resource_version
+
+
+class JobWatcher(ListWatchThread):
+    LABEL_SELECTOR = Job.KUBE_LABEL_SELECTOR
+    KIND = 'Job'
+
+    def list_func(self, client):
+        return kube_apis.BatchV1Api(client).list_namespaced_job
+
+    def handle(self, event_type, kjob):
+        job = Job.objects.filter(
+            job_name=kjob.metadata.name,
+            pipeline__cluster_id=self.cluster_id,
+        ).exclude(status__in=Job.STATUS_DONE).first()
+
+        if job is None:
+            return
+
+        if event_type == 'DELETED':
+            # update_status handles the 404 and saves whatever logs were streamed
+            update_job_status(job.id)
+            return
+
+        if kjob.status and job.apply_kube_status(kjob.status):
+            job.save_status()
+            update_job_status(job.id)
+
+
+class PodIndex:
+    # the informer's pod index published to redis so every process can read it, the
+    # synced key expires unless the informer keeps refreshing it, readers then use the API
+    def __init__(self, cluster_id):
+        self.key = f'pod-index-{cluster_id}'
+        self.synced_key = f'{self.key}-synced'
+
+    def publish(self, index):
+        pipe = redis_client(write=True).pipeline()
+        pipe.delete(self.key)
+        if index:
+            pipe.hset(self.key, mapping={uid: json.dumps(sorted(pods)) for uid, pods in index.items()})
+
+        pipe.set(self.synced_key, 1, ex=settings.POD_INDEX_STALE_SECONDS)
+        pipe.execute()
+
+    def update(self, uid, pods):
+        if pods:
+            redis_client(write=True).hset(self.key, uid, json.dumps(sorted(pods)))
+
+        else:
+            redis_client(write=True).hdel(self.key, uid)
+
+    def heartbeat(self):
+        redis_client(write=True).set(self.synced_key, 1, ex=settings.POD_INDEX_STALE_SECONDS)
+
+    def clear(self):
+        redis_client(write=True).delete(self.synced_key)
+
+    def pods_for(self, uid):
+        pipe = redis_client().pipeline(transaction=False)
+        pipe.exists(self.synced_key)
+        pipe.hget(self.key, uid)
+        synced, pods = pipe.execute()
+        if not synced:
+            return None
+
+        return json.loads(pods) if pods else []
+
+
+class PodInformer(ListWatchThread):
+    LABEL_SELECTOR = 'controller-uid'
+    KIND = 'Pod'
+
+    def __init__(self, cluster, on_added=None):
+        super().__init__(cluster)
+        self.on_added = on_added
+        self.lock = threading.Lock()
+        self.synced = threading.Event()
+        self.index = {}
+        self.shared = PodIndex(cluster.id)
+
+    def list_func(self, client):
+        return kube_apis.CoreV1Api(client).list_namespaced_pod
+
+    def run(self):
+        threading.Thread(target=self.heartbeat, name=f'{self.name}-heartbeat', daemon=True).start()
+        super().run()
+
+    def heartbeat(self):
+        # a quiet watch can block for minutes, the shared index stays fresh while we are synced
+        while not self.stopped.wait(settings.POD_INDEX_STALE_SECONDS / 3):
+            if self.synced.is_set():
+                try:
+                    self.shared.heartbeat()
+
+                except RedisError:
+                    logger.exception('Pod Index Heartbeat Error: {}', self.cluster_name)
+
+    def pods_for(self, uid):
+        with self.lock:
+            return sorted(self.index.get(uid, ()))
+
+    def relisted(self, items):
+        index = {}
+        for pod in items:
+            index.setdefault(pod.metadata.labels['controller-uid'], set()).add(pod.metadata.name)
+
+        with self.lock:
+            added = [p for p in items if p.metadata.name not in self.index.get(p.metadata.labels['controller-uid'], ())]
+            self.index = index
+            self.shared.publish(index)
+
+        self.synced.set()
+        logger.info('Pod Informer Synced: {} pods={}', self.cluster_name, len(items))
+
+        if self.on_added:
+            for pod in added:
+                self.on_added(self.cluster_id, pod)
+
+    def desynced(self):
+        # events may be missed until the next relist, callers fall back to listing pods
+        self.synced.clear()
+        try:
+            self.shared.clear()
+
+        except RedisError:
+            logger.exception('Pod Index Clear Error: {}', self.cluster_name)
+
+    def handle(self, event_type, pod):
+        uid = pod.metadata.labels['controller-uid']
+        name = pod.metadata.name
+
+        with self.lock:
+            pods = self.index.setdefault(uid, set())
+            new = name not in pods
+
+            if event_type == 'DELETED':
+                pods.discard(name)
+                if not pods:
+                    del self.index[uid]
+
+            else:
+                pods.add(name)
+
+            # a failed write drops out through the watch loop, which desyncs and relists
+            self.shared.update(uid, pods)
+
+        if new and event_type != 'DELETED' and self.on_added:
+            self.on_added(self.cluster_id, pod)
+
+
+class InformerRegistry:
+    # informers only run inside watch_jobs, other processes read the index they publish to redis
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.informers = {}
+
+    def create(self, cluster, **kwargs):
+        informer = PodInformer(cluster, **kwargs)
+        with self.lock:
+            self.informers[cluster.id] = informer
+
+        return informer
+
+    def get(self, cluster):
+        with self.lock:
+            informer = self.informers.get(cluster.id)
+
+        if informer and informer.is_alive() and not informer.stopped.is_set() and informer.synced.is_set():
+            return informer
+
+
+pod_informers = InformerRegistry()
+
+
+def assign_pod(cluster_id, pod):
+    job_name = pod.metadata.labels.get('job-name')
+    if not job_name:
+        return
+
+    job = Job.objects.filter(
+        job_name=job_name,
+        pipeline__cluster_id=cluster_id,
+    ).exclude(status__in=Job.STATUS_DONE).only('id').first()
+
+    if job:
+        job.claim_pods([pod.metadata.name])
+
+
+def get_pods(cluster, uid):
+    # None when no informer has a fresh index for the cluster, the caller lists pods from the API
+    if not cluster:
+        return None
+
+    informer = pod_informers.get(cluster)
+    if informer:
+        return informer.pods_for(uid)
+
+    try:
+        return PodIndex(cluster.id).pods_for(uid)
+
+    except RedisError:
+        logger.exception('Pod Index Read Error: {}', cluster.id)
+        return None
+
+
+class WatcherSet:
+    def __init__(self, factory):
+        self.factory = factory
+        self.watchers = {}
+
+    def sync(self):
+        clusters = {c.id: c for c in Cluster.objects.filter(active=True).exclude(config__isnull=True)}
+
+        for cid in list(self.watchers):
+            watcher = self.watchers[cid]
+            if cid not in clusters or not watcher.is_alive():
+                watcher.stop()
+                del self.watchers[cid]
+
+        for cid, cluster in clusters.items():
+            if cid not in self.watchers:
+                watcher = self.factory(cluster)
+                watcher.start()
+                self.watchers[cid] = watcher
+
+    def stop(self):
+        for watcher in self.watchers.values():
+            watcher.stop()
+
+        self.watchers = {}
@@ -1,20 +1,22 @@
 import asyncio
+import functools
 import json
 import multiprocessing as mp
 from importlib import import_module
 
 from django import http
 from django.conf import settings
-from django.core.cache import caches
 from django.core.handlers.asgi import ASGIRequest
 from django.contrib import auth
-from django.utils import timezone
 
 from asgiref.sync import sync_to_async
 
 from loguru import logger
 
 from worlds.models import Job, StreamLog
+from worlds import notify
+from worlds.hub import hub, END, OVERFLOW
+import worlds.logstream as logstream
 
 
 def add_websocket(app):
@@ -43,101 +45,132 @@ def init_request(request):
 
 
 def get_job(jid, obj=False):
-    job = Job.objects.filter(id=jid).first()
-    if job:
-        if obj:
-            return job
+    if not obj:
+        return Job.snapshot(jid)
 
-        return job.to_json()
-
-    return {}
+    return Job.objects.filter(id=jid).first()
 
 
 def get_log(job, pod, obj=False):
     return StreamLog.objects.filter(job=job, pod=pod).first()
 
 
-async def watch_log_data(job, pod, send, log_queue):
-    lines = 0
-    wait = 0.1
-
-    while 1:
-        try:
-            await asyncio.sleep(wait)
-            wait = 3.0
+async def read_log_upstream(job, pod, topic):
+    channel = notify.log_channel(pod)
+    wakeup = notify.listener.subscribe(channel)
+    last_id = '0-0'
+    topic.position = last_id
 
+    try:
+        while 1:
             log = await sync_to_async(get_log, thread_sensitive=True)(job, pod)
             if log:
-                if log.lines != lines:
-                    lines_send = ''
-                    line_array = []
-                    for i in range(lines, log.lines):
-                        line_array.append(f'{pod}-{i}')
-
-                    if line_array:
-                        line_dict = caches['default'].get_many(line_array)
-                        msg_lines = ''
-                        for l in line_array:
-                            m = line_dict.get(l, None)
-                            if m is not None:
-                                msg_lines += m
-
-                        if msg_lines:
-                            msg = {'type': 'log', 'data': msg_lines}
-                            await send({'type': 'websocket.send', 'text': json.dumps(msg)})
-
-                    lines = log.lines
+                while 1:
+                    last_id, msg_lines = await sync_to_async(logstream.read, thread_sensitive=False)(pod, last_id)
+                    if not msg_lines:
+                        break
+
+                    topic.publish((last_id, msg_lines), position=last_id)
 
                 if log.status in ['completed', 'failed']:
                     break
 
-        except:
-            import traceback
-            traceback.print_exc()
-            raise
+            await notify.wait(wakeup, settings.NOTIFY_RESYNC_SECONDS)
 
-        try:
-            if log_queue.get_nowait():
-                log_queue.task_done()
-                caches['default'].set(f'shutdown-{pod}', 'shutdown', 60)
-                return
+    finally:
+        notify.listener.unsubscribe(channel, wakeup)
 
-        except asyncio.QueueEmpty:
-            pass
 
+async def read_job_upstream(job, topic):
+    channel = notify.job_channel(job)
+    wakeup = notify.listener.subscribe(channel)
 
-async def watch_job_data(job, send, queue):
-    jdata = await sync_to_async(get_job, thread_sensitive=True)(job)
-    last = timezone.now()
+    try:
+        jdata = await sync_to_async(get_job, thread_sensitive=True)(job)
 
-    while 1:
-        await asyncio.sleep(0.1)
-        now = timezone.now()
-        diff = now - last
-        if diff.total_seconds() > 5:
-            last = now
+        while 1:
+            await notify.wait(wakeup, settings.NOTIFY_RESYNC_SECONDS)
             new_data = await sync_to_async(get_job, thread_sensitive=True)(job)
-            if new_data['modified'] != jdata['modified']:
+            if not new_data:
+                # the job was deleted
+                break
+
+            if new_data != jdata:
                 jdata = new_data
-                msg = {'type': 'job', 'data': jdata}
                 logger.info('Sending job update: {} {}', jdata['id'], jdata['status'])
+                topic.publish(await sync_to_async(Job.snapshot_json, thread_sensitive=False)(jdata))
+
+    finally:
+        notify.listener.unsubscribe(channel, wakeup)
+
+
+async def send_log_history(pod, send, after, until):
+    while after != until:
+        after, msg_lines = await sync_to_async(logstream.read, thread_sensitive=False)(pod, after, until=until)
+        if not msg_lines:
+            break
+
+        msg = {'type': 'log', 'data': msg_lines}
+        await send({'type': 'websocket.send', 'text': json.dumps(msg)})
+
+    return after
+
+
+async def watch_log_data(job, pod, send):
+    last_id = '0-0'
+
+    while 1:
+        sub = hub.subscribe(('log', job, pod), functools.partial(read_log_upstream, job, pod))
+
+        try:
+            # anything the shared reader sent before we joined comes straight from the stream
+            if sub.position is not None:
+                last_id = await send_log_history(pod, send, last_id, sub.position)
+
+            while 1:
+                msg = await sub.get()
+                if msg is END:
+                    return
+
+                if msg is OVERFLOW:
+                    break
+
+                msg_id, msg_lines = msg
+                if logstream.parse_id(msg_id) <= logstream.parse_id(last_id):
+                    continue
+
+                last_id = msg_id
+                msg = {'type': 'log', 'data': msg_lines}
                 await send({'type': 'websocket.send', 'text': json.dumps(msg)})
 
+        finally:
+            hub.unsubscribe(sub)
+
+
+async def watch_job_data(job, send):
+    while 1:
+        sub = hub.subscribe(('job', job), functools.partial(read_job_upstream, job))
+
         try:
-            if queue.get_nowait():
-                queue.task_done()
-                return
+            while 1:
+                msg = await sub.get()
+                if msg is END:
+                    return
+
+                if msg is OVERFLOW:
+                    break
+
+                msg = {'type': 'job', 'data': msg}
+                await send({'type': 'websocket.send', 'text': json.dumps(msg)})
 
-        except asyncio.QueueEmpty:
-            pass
+        finally:
+            hub.unsubscribe(sub)
 
 
 async def logging_socket(scope, receive, send):
     request = AsyncWarpzoneRequest(scope, None)
     await sync_to_async(init_request, thread_sensitive=True)(request)
-    task = None
-    log_task = None
-    log_queue = None
+    tasks = []
     connected = False
 
     while 1:
@@ -153,29 +186,20 @@ async def logging_socket(scope, receive, send):
                 await send({'type': 'websocket.close'})
                 return
 
-            job_queue = asyncio.Queue()
-            task = asyncio.create_task(watch_job_data(job, send, job_queue))
+            tasks.append(asyncio.create_task(watch_job_data(job, send)))
 
             if pod:
-                log_queue = asyncio.Queue()
-                log_task = asyncio.create_task(watch_log_data(job, pod, send, log_queue))
+                tasks.append(asyncio.create_task(watch_log_data(job, pod, send)))
 
             await send({'type': 'websocket.accept'})
             connected = True
 
         if connected and event['type'] == 'websocket.disconnect':
             logger.info('Websocket Disconnected')
-            await job_queue.put(True)
-            await job_queue.join()
-            task.cancel()
-            await asyncio.gather(task, return_exceptions=True)
-
-            if log_queue:
-                await log_queue.put(True)
-                await log_queue.join()
-                log_task.cancel()
-                await asyncio.gather(log_task, return_exceptions=True)
+            for task in tasks:
+                task.cancel()
 
+            await asyncio.gather(*tasks, return_exceptions=True)
             return
 
         if connected and event['type'] == 'websocket.receive':
@@ -0,0 +1,41 @@
+from zipfile import ZipFile, ZIP_STORED
+
+
+class StreamBuffer:
+    # write-only, unseekable: zipfile falls back to data descriptors and never seeks back
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(entries, compression=ZIP_STORED):
+    buffer = StreamBuffer()
+
+    with ZipFile(buffer, 'w', compression=compression) as archive:
+        for name, chunks in entries:
+            with archive.open(name, 'w', force_zip64=True) as fh:
+                for data in chunks:
+                    fh.write(data)
+                    data = buffer.pop()
+                    if data:
+                        yield data
+
+            yield buffer.pop()
+
+    yield buffer.pop()